@@ -1,18 +1,18 @@
 # Importações de bibliotecas e módulos necessários
 from flask import Flask, request, jsonify  # Framework web para criação de APIs
-from tensorflow.keras.models import load_model  # Carregamento de modelos Keras
-import pandas as pd  # Manipulação de dados em DataFrames
-import joblib  # Carregamento de objetos serializados (no caso, o seletor de features)
-from utils import *  # Importação de funções auxiliares (pré-processamento)
+from config import Config  # Configurações centralizadas (backend de inferência)
+from inference import load_backend  # Backends de inferência (Keras ou NumPy)
+from preprocessing import PreprocessingPipeline, PayloadError, load_selected_features  # Pré-processamento em memória
 
 # Criação da instância do aplicativo Flask
 app = Flask(__name__)  
 
-# Carregamento do modelo Keras treinado
-model = load_model('meu_modelo.keras')  
+# Carregamento do modelo treinado (TensorFlow só é importado no backend 'keras')
+model = load_backend(path='meu_modelo.keras' if Config.INFERENCE_BACKEND == 'keras' else None)  
 
-# Carregamento do seletor de features (pré-treinado)
-selector_carregado = joblib.load('./objects/selector.joblib')  
+# Carregamento único dos scalers, encoders e índices das features selecionadas
+# (evita leitura de disco por requisição e calcula só as colunas que o modelo usa)
+preprocessamento = PreprocessingPipeline.from_objects(selected=load_selected_features())
 
 # Definição da rota '/predict' para receber requisições POST
 @app.route('/predict', methods=['POST'])  
@@ -20,22 +20,15 @@ def predict():
     # Obtém os dados JSON da requisição
     input_data = request.get_json()  
     
-    # Converte os dados em um DataFrame Pandas
-    df = pd.DataFrame(input_data)  
-
-    # Aplica escalonamento (normalização/padronização) às colunas numéricas
-    df = load_scalers(df, ['tempoprofissao', 'renda', 'idade', 'dependentes', 
-                            'valorsolicitado', 'valortotalbem', 'proporcaosolicitadototal'])  
-    
-    # Aplica codificação (one-hot encoding, label encoding, etc.) às colunas categóricas
-    df = load_encoders(df, ['profissao', 'tiporesidencia', 'escolaridade', 'score', 
-                            'estadocivil', 'produto'])  
-    
-    # Seleciona as features mais importantes
-    df = selector_carregado.transform(df)  
+    # Valida o payload e aplica escalonamento/codificação/seleção direto em arrays NumPy
+    try:
+        X, _ = preprocessamento.transform_columns(
+            input_data, scale_numeric=not model.folded_scalers)  
+    except PayloadError as e:
+        return jsonify({'error': str(e)}), 400
 
     # Realiza a previsão usando o modelo
-    predictions = model.predict(df)  
+    predictions = model.predict(X)  
 
     # Retorna as previsões como JSON
     return jsonify(predictions.tolist())  
@@ -0,0 +1,225 @@
+"""
+Variante ASGI (Starlette/uvicorn) da API de predição
+
+Mesmos endpoints e formatos do api_improved (/, /health, /predict,
+/metrics, /admin/reload), com a mesma versão ativa dos artefatos, cache, log
+e métricas. Leitura do corpo, validação e escrita da resposta rodam no
+event loop; pré-processamento e inferência rodam em um pool de threads
+limitado (ASGI_EXECUTOR_WORKERS); com ASGI_MAX_PENDING requisições já no
+pool, as seguintes recebem 503 com Retry-After em vez de enfileirar.
+Conexões lentas ou ociosas não ocupam uma thread cada.
+
+Uso:
+    python api_asgi.py
+    uvicorn api_asgi:app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import contextlib
+import hmac
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from jinja2 import Template
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, JSONResponse, Response
+from starlette.routing import Route
+from config import Config
+from logger import new_request_id
+from preprocessing import PayloadError
+from serialization import (MIMETYPES, UnsupportedFormatError, request_format, response_format,
+                           decode_request, encode_response)
+import api_improved as core
+
+logger = core.logger
+
+executor = ThreadPoolExecutor(max_workers=Config.ASGI_EXECUTOR_WORKERS, thread_name_prefix='inference')
+pendentes = asyncio.Semaphore(Config.ASGI_MAX_PENDING)
+home_template = Template(core.HOME_TEMPLATE)
+
+
+class Overloaded(Exception):
+    """ASGI_MAX_PENDING requisições já estão no pool de inferência"""
+
+
+async def run_in_executor(fn, *args):
+    """Executa fn no pool de inferência; com o limite de pendentes atingido, Overloaded sem esperar"""
+    # Sem await entre a checagem e o acquire: nenhuma outra corrotina pega a vaga no meio
+    if pendentes.locked():
+        raise Overloaded()
+    async with pendentes:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+class ModelUnavailable(Exception):
+    """Nenhuma versão dos artefatos carregada"""
+
+
+def score(input_data, request_id, inicio, timer):
+    """Pré-processamento, inferência e log (no pool de threads), na versão ativa dos artefatos"""
+    with core.artifacts.acquire() as ativos:
+        if ativos is None:
+            raise ModelUnavailable()
+        return core.score(ativos, input_data, request_id, inicio, timer)
+
+
+async def home(request):
+    """Página inicial da API"""
+    return HTMLResponse(home_template.render(
+        status='Saudável ✅' if core.artifacts.current is not None else 'Com Problemas ❌',
+        status_class='healthy' if core.artifacts.current is not None else 'unhealthy',
+        host=Config.API_HOST,
+        port=Config.API_PORT,
+        batch_endpoint=False
+    ))
+
+
+async def health_check(request):
+    """Endpoint de health check"""
+    status, code = core.health_status()
+    return JSONResponse(status, status_code=code)
+
+
+async def predict(request):
+    """Endpoint de predição (mesmos formatos de entrada e saída do api_improved)"""
+    timer = core.prediction_metrics.timer()
+    resposta = None
+    try:
+        resposta = await _predict(request, timer)
+        return resposta
+    finally:
+        core.prediction_metrics.record(timer, resposta.status_code if resposta is not None else 500)
+
+
+async def _predict(request, timer):
+    if core.artifacts.current is None:
+        logger.error("Tentativa de predição com artefatos não carregados")
+        return JSONResponse({'error': 'Modelo não disponível'}, status_code=503)
+
+    inicio = time.time()
+    request_id = request.headers.get('X-Request-ID') or new_request_id()
+
+    body = await request.body()
+    formato = request_format(request.headers.get('content-type', '').split(';')[0].strip())
+    try:
+        with timer.span('decode'):
+            if formato == 'json':
+                input_data = json.loads(body) if body else None
+            else:
+                input_data = decode_request(body, formato)
+    except UnsupportedFormatError as e:
+        return JSONResponse({'error': str(e)}, status_code=415)
+    except ValueError as e:
+        logger.warning(f"Corpo {formato} inválido: {e}")
+        return JSONResponse({'error': f'Corpo {formato} inválido'}, status_code=400)
+
+    if not input_data:
+        logger.warning("Requisição sem dados JSON")
+        return JSONResponse({'error': 'Dados JSON são obrigatórios'}, status_code=400)
+
+    logger.info(f"Nova predição solicitada ({request_id}) com {len(input_data)} features")
+
+    # Validação do payload (decode_columnar) e conversão para float32 rodam no pool, não no loop
+    try:
+        predictions = await run_in_executor(score, input_data, request_id, inicio, timer)
+    except Overloaded:
+        logger.warning(f"Pool de inferência cheio ({Config.ASGI_MAX_PENDING} pendentes), requisição recusada")
+        return JSONResponse({'error': 'Servidor sobrecarregado'}, status_code=503,
+                            headers={'Retry-After': str(Config.ASGI_RETRY_AFTER_SECONDS)})
+    except ModelUnavailable:
+        return JSONResponse({'error': 'Modelo não disponível'}, status_code=503)
+    except PayloadError as e:
+        logger.warning(f"Payload inválido: {e}")
+        return JSONResponse({'error': str(e)}, status_code=400)
+    except Exception as e:
+        logger.error(f"Erro durante predição: {e}")
+        return JSONResponse({'error': 'Erro interno do servidor'}, status_code=500)
+
+    timer.rows = len(predictions)
+    formato_resposta = response_format(_accept_mimetypes(request), formato)
+    with timer.span('serialize'):
+        if formato_resposta == 'json':
+            resposta = JSONResponse(predictions.tolist())
+        else:
+            try:
+                corpo = encode_response(predictions[:, 0], formato_resposta)
+            except UnsupportedFormatError as e:
+                return JSONResponse({'error': str(e)}, status_code=406)
+            resposta = Response(corpo, media_type=MIMETYPES[formato_resposta])
+    return resposta
+
+
+async def metrics(request):
+    """Histogramas de latência por estágio do /predict (mesmo registro do api_improved)"""
+    return Response(core.prediction_metrics.render(), media_type='text/plain; version=0.0.4')
+
+
+async def admin_reload(request):
+    """Troca a versão dos artefatos sem reiniciar (mesmas regras do api_improved)"""
+    if not Config.ADMIN_TOKEN:
+        return JSONResponse({'error': 'Endpoint não encontrado'}, status_code=404)
+    if not hmac.compare_digest(request.headers.get('x-admin-token', ''), Config.ADMIN_TOKEN):
+        return JSONResponse({'error': 'Não autorizado'}, status_code=401)
+
+    if request.query_params.get('wait', 'false').lower() == 'true':
+        trocou = await asyncio.get_running_loop().run_in_executor(None, core.artifacts.load)
+        status = core.artifacts.status()
+        status['swapped'] = trocou
+        return JSONResponse(status, status_code=500 if status['last_error'] else 200)
+
+    if not core.artifacts.reload():
+        return JSONResponse({'status': 'carga já em andamento'}, status_code=409)
+    return JSONResponse({'status': 'carregando'}, status_code=202)
+
+
+def _accept_mimetypes(request):
+    """Cabeçalho Accept como (mimetype, qualidade), na ordem de preferência"""
+    aceitos = []
+    for parte in request.headers.get('accept', '').split(','):
+        mimetype, _, parametros = parte.strip().partition(';')
+        qualidade = 1.0
+        if parametros.strip().startswith('q='):
+            try:
+                qualidade = float(parametros.strip()[2:])
+            except ValueError:
+                pass
+        if mimetype:
+            aceitos.append((mimetype, qualidade))
+    return sorted(aceitos, key=lambda item: -item[1])
+
+
+async def not_found(request, exc):
+    """Handler para erro 404"""
+    return JSONResponse({'error': 'Endpoint não encontrado'}, status_code=404)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    # Termina as inferências em andamento antes de encerrar
+    executor.shutdown(wait=True)
+
+
+app = Starlette(
+    routes=[
+        Route('/', home, methods=['GET']),
+        Route('/health', health_check, methods=['GET']),
+        Route('/predict', predict, methods=['POST']),
+        Route('/metrics', metrics, methods=['GET']),
+        Route('/admin/reload', admin_reload, methods=['POST']),
+    ],
+    exception_handlers={404: not_found},
+    lifespan=lifespan,
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    if core.artifacts.current is not None:
+        logger.info(f"🚀 API ASGI iniciando em http://{Config.API_HOST}:{Config.API_PORT}")
+        uvicorn.run(app, host=Config.API_HOST, port=Config.API_PORT,
+                    timeout_keep_alive=Config.SERVER_KEEPALIVE)
+    else:
+        logger.error("❌ Falha ao iniciar API - artefatos não carregados")
+        logger.info("💡 Execute primeiro: python modelcreation.py")
+        exit(1)
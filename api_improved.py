@@ -1,13 +1,19 @@
 # Importações de bibliotecas e módulos necessários
-from flask import Flask, request, jsonify, render_template_string
-from tensorflow.keras.models import load_model
-import pandas as pd
-import joblib
+from flask import Flask, Response, g, request, jsonify, render_template_string, stream_with_context
 import os
+import hmac
+import json
+import time
 from datetime import datetime
+from functools import wraps
 from config import Config, setup_logging
-from logger import ModelLogger, timing_decorator, error_handler
-from utils import load_scalers, load_encoders
+from logger import ModelLogger, timing_decorator, error_handler, new_request_id, row_features
+from preprocessing import PayloadError
+from cache import PredictionCache, RedisCacheBackend
+from artifacts import ArtifactManager
+from metrics import PredictionMetrics, NULL_TIMER, STAGE_BUCKETS_MS
+from serialization import (iter_ndjson_chunks, NDJSON_MIMETYPE, MIMETYPES, UnsupportedFormatError,
+                           request_format, response_format, decode_request, encode_response)
 
 # Setup de logging
 logger = setup_logging()
@@ -16,194 +22,393 @@ model_logger = ModelLogger()
 # Criação da instância do aplicativo Flask
 app = Flask(__name__)
 
-# Carregamento do modelo e seletor
-model = None
-selector_carregado = None
+# Cache de predições (compartilhado entre as versões dos artefatos)
+cache = None
+
+# Latência por estágio do /predict e contadores, expostos no /metrics
+prediction_metrics = PredictionMetrics()
+# Mesmos estágios para cada stream do /predict/batch (que dura bem mais que um /predict)
+batch_metrics = PredictionMetrics(buckets=STAGE_BUCKETS_MS + [10000, 60000, 300000])
+
+def create_cache():
+    """Cache de predições configurado (None se desligado)"""
+    if not Config.CACHE_ENABLED:
+        return None
+    shared = None
+    if Config.CACHE_REDIS_URL:
+        try:
+            shared = RedisCacheBackend(Config.CACHE_REDIS_URL, Config.CACHE_TTL_SECONDS)
+        except ImportError:
+            logger.warning("CACHE_REDIS_URL definido mas o pacote redis não está instalado")
+    return PredictionCache(Config.CACHE_MAX_ENTRIES, Config.CACHE_TTL_SECONDS, shared=shared)
+
+def on_artifacts_swap(ativos):
+    """Nova versão ativa: descarta as entradas locais da versão anterior"""
+    if cache is not None:
+        cache.invalidate()
+        logger.info(f"Cache de predições limpo (versão dos artefatos {ativos.digest})")
+
+# Versão ativa do modelo, seletor e pré-processamento; requisições usam
+# artifacts.acquire() e terminam na versão que pegaram
+artifacts = ArtifactManager(on_swap=on_artifacts_swap)
 
 def load_model_artifacts():
     """Carrega modelo e artefatos com tratamento de erro"""
-    global model, selector_carregado
+    global cache
     
-    try:
-        if os.path.exists(Config.MODEL_PATH):
-            model = load_model(Config.MODEL_PATH)
-            logger.info(f"Modelo carregado: {Config.MODEL_PATH}")
-        else:
-            logger.error(f"Modelo não encontrado: {Config.MODEL_PATH}")
-            return False
-            
-        if os.path.exists(Config.SELECTOR_PATH):
-            selector_carregado = joblib.load(Config.SELECTOR_PATH)
-            logger.info(f"Seletor carregado: {Config.SELECTOR_PATH}")
-        else:
-            logger.error(f"Seletor não encontrado: {Config.SELECTOR_PATH}")
-            return False
-            
-        return True
-    except Exception as e:
-        logger.error(f"Erro ao carregar artefatos: {e}")
-        return False
+    if cache is None:
+        cache = create_cache()
+    carregado = artifacts.load() or artifacts.current is not None
+    # Novas versões publicadas são carregadas em segundo plano
+    artifacts.watch(Config.ARTIFACT_WATCH_SECONDS)
+    return carregado
+
+def cached_inference(X, predict_fn, version):
+    """Consulta o cache de predições e executa o modelo só para as linhas faltantes
+
+    version é o digest dos artefatos adquiridos pela requisição (os de predict_fn).
+    """
+    if cache is not None:
+        return cache.predict(X, predict_fn, version)
+    return predict_fn(X)
+
+def score(ativos, input_data, request_id, inicio, timer=NULL_TIMER):
+    """Pré-processamento, inferência (com cache) e log de uma requisição em uma versão dos artefatos"""
+    # Valida as colunas e aplica pré-processamento direto em arrays NumPy
+    X, desconhecidas = ativos.preprocessamento.transform_columns(
+        input_data, scale_numeric=not ativos.model.folded_scalers, timer=timer)
+    if desconhecidas.any():
+        linhas = desconhecidas.any(axis=1).nonzero()[0].tolist()
+        logger.warning(f"Categorias desconhecidas nas linhas {linhas} (código de fallback aplicado)")
+    
+    with timer.span('infer'):
+        predictions = cached_inference(X, ativos.predict, ativos.digest)
+    
+    # Log da predição: uma entrada compacta por linha, com a versão que respondeu
+    with timer.span('log'):
+        model_logger.log_predictions(request_id, input_data, predictions[:, 0], time.time() - inicio,
+                                     model_version=ativos.version)
+    return predictions
+
+def track_stages(func):
+    """Spans da requisição em g.timer, registrados no /metrics com o status HTTP da resposta"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        g.timer = prediction_metrics.timer()
+        status = 500
+        try:
+            resposta = func(*args, **kwargs)
+            status = resposta[1] if isinstance(resposta, tuple) else resposta.status_code
+            return resposta
+        finally:
+            prediction_metrics.record(g.timer, status)
+    return wrapper
 
 # Carrega artefatos na inicialização
 artifacts_loaded = load_model_artifacts()
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Endpoint de health check"""
+def health_status():
+    """Estado do serviço e código HTTP (compartilhado com o api_asgi)"""
+    ativos = artifacts.current
     status = {
-        'status': 'healthy' if artifacts_loaded else 'unhealthy',
+        'status': 'healthy' if ativos is not None else 'unhealthy',
         'timestamp': datetime.now().isoformat(),
-        'model_loaded': model is not None,
-        'selector_loaded': selector_carregado is not None,
+        'model_loaded': ativos is not None,
+        'backend': ativos.model.name if ativos is not None else None,
+        'model_version': ativos.version if ativos is not None else None,
+        'selector_loaded': ativos is not None,
+        'artifacts': artifacts.status(),
         'version': '2.0.0'
     }
     
-    return jsonify(status), 200 if artifacts_loaded else 503
+    if ativos is not None and ativos.batcher is not None:
+        status['batching'] = ativos.batcher.stats()
+    if cache is not None:
+        status['cache'] = cache.stats()
+    status['prediction_log'] = model_logger.prediction_writer.stats()
+    
+    return status, 200 if ativos is not None else 503
 
-@app.route('/', methods=['GET'])
-def home():
-    """Página inicial da API"""
-    html_template = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>API Análise de Crédito</title>
-        <style>
-            body { font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }
-            .container { max-width: 800px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
-            h1 { color: #2c3e50; }
-            .endpoint { background: #ecf0f1; padding: 15px; border-radius: 5px; margin: 10px 0; }
-            .method { background: #3498db; color: white; padding: 3px 8px; border-radius: 3px; font-size: 12px; }
-            .status { padding: 10px; border-radius: 5px; margin: 20px 0; }
-            .healthy { background: #d5f4e6; color: #27ae60; }
-            .unhealthy { background: #fadbd8; color: #e74c3c; }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>🏦 API de Análise de Crédito v2.0</h1>
-            
-            <div class="status {{ status_class }}">
-                <strong>Status:</strong> {{ status }}
-            </div>
-            
-            <h2>📡 Endpoints Disponíveis</h2>
-            
-            <div class="endpoint">
-                <span class="method">GET</span>
-                <strong>/health</strong> - Verificação de saúde da API
-            </div>
-            
-            <div class="endpoint">
-                <span class="method">POST</span>
-                <strong>/predict</strong> - Realizar predição de crédito
-            </div>
-            
-            <h2>📊 Exemplo de Uso</h2>
-            <pre>
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Endpoint de health check"""
+    status, code = health_status()
+    return jsonify(status), code
+
+# Página inicial (também usada pelo api_asgi)
+HOME_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>API Análise de Crédito</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }
+        .container { max-width: 800px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+        h1 { color: #2c3e50; }
+        .endpoint { background: #ecf0f1; padding: 15px; border-radius: 5px; margin: 10px 0; }
+        .method { background: #3498db; color: white; padding: 3px 8px; border-radius: 3px; font-size: 12px; }
+        .status { padding: 10px; border-radius: 5px; margin: 20px 0; }
+        .healthy { background: #d5f4e6; color: #27ae60; }
+        .unhealthy { background: #fadbd8; color: #e74c3c; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>🏦 API de Análise de Crédito v2.0</h1>
+        
+        <div class="status {{ status_class }}">
+            <strong>Status:</strong> {{ status }}
+        </div>
+        
+        <h2>📡 Endpoints Disponíveis</h2>
+        
+        <div class="endpoint">
+            <span class="method">GET</span>
+            <strong>/health</strong> - Verificação de saúde da API
+        </div>
+        
+        <div class="endpoint">
+            <span class="method">POST</span>
+            <strong>/predict</strong> - Realizar predição de crédito
+            (JSON, Arrow IPC ou MessagePack via Content-Type/Accept)
+        </div>
+        
+        <div class="endpoint">
+            <span class="method">GET</span>
+            <strong>/metrics</strong> - Latência por estágio do /predict (p50/p95/p99)
+        </div>
+        
+        {% if batch_endpoint %}
+        <div class="endpoint">
+            <span class="method">POST</span>
+            <strong>/predict/batch</strong> - Reavaliação em lote (NDJSON em streaming)
+        </div>
+        {% endif %}
+        
+        <h2>📊 Exemplo de Uso</h2>
+        <pre>
 curl -X POST http://{{ host }}:{{ port }}/predict \
 -H "Content-Type: application/json" \
 -d '{
-    "profissao": ["Advogado"],
-    "tempoprofissao": [5],
-    "renda": [10000.0],
-    "tiporesidencia": ["Própria"],
-    "escolaridade": ["Superior"],
-    "score": ["Bom"],
-    "idade": [35],
-    "dependentes": [2],
-    "estadocivil": ["Casado"],
-    "produto": ["EcoPrestige"],
-    "valorsolicitado": [50000.0],
-    "valortotalbem": [100000.0],
-    "proporcaosolicitadototal": [0.5]
+"profissao": ["Advogado"],
+"tempoprofissao": [5],
+"renda": [10000.0],
+"tiporesidencia": ["Própria"],
+"escolaridade": ["Superior"],
+"score": ["Bom"],
+"idade": [35],
+"dependentes": [2],
+"estadocivil": ["Casado"],
+"produto": ["EcoPrestige"],
+"valorsolicitado": [50000.0],
+"valortotalbem": [100000.0],
+"proporcaosolicitadototal": [0.5]
 }'
-            </pre>
-            
-            <p><strong>Desenvolvido por TonFLY | 2025</strong></p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    status = 'Saudável ✅' if artifacts_loaded else 'Com Problemas ❌'
-    status_class = 'healthy' if artifacts_loaded else 'unhealthy'
+        </pre>
+        
+        <p><strong>Desenvolvido por TonFLY | 2025</strong></p>
+    </div>
+</body>
+</html>
+"""
+
+@app.route('/', methods=['GET'])
+def home():
+    """Página inicial da API"""
+    carregado = artifacts.current is not None
+    status = 'Saudável ✅' if carregado else 'Com Problemas ❌'
+    status_class = 'healthy' if carregado else 'unhealthy'
     
     return render_template_string(
-        html_template,
+        HOME_TEMPLATE,
         status=status,
         status_class=status_class,
         host=Config.API_HOST,
-        port=Config.API_PORT
+        port=Config.API_PORT,
+        batch_endpoint=True
     )
 
 @app.route('/predict', methods=['POST'])
 @error_handler
 @timing_decorator
+@track_stages
 def predict():
     """Endpoint de predição melhorado com logging"""
-    if not artifacts_loaded:
+    if artifacts.current is None:
         logger.error("Tentativa de predição com artefatos não carregados")
         return jsonify({'error': 'Modelo não disponível'}), 503
     
-    # Obtém os dados JSON da requisição
-    input_data = request.get_json()
+    inicio = time.time()
+    request_id = request.headers.get('X-Request-ID') or new_request_id()
+    
+    # Obtém os dados da requisição (JSON por padrão; Arrow IPC ou MessagePack
+    # conforme o Content-Type)
+    formato = request_format(request.mimetype)
+    with g.timer.span('decode'):
+        if formato == 'json':
+            input_data = request.get_json()
+        else:
+            try:
+                input_data = decode_request(request.get_data(), formato)
+            except UnsupportedFormatError as e:
+                return jsonify({'error': str(e)}), 415
+            except ValueError as e:
+                logger.warning(f"Corpo {formato} inválido: {e}")
+                return jsonify({'error': f'Corpo {formato} inválido'}), 400
     
     if not input_data:
         logger.warning("Requisição sem dados JSON")
         return jsonify({'error': 'Dados JSON são obrigatórios'}), 400
     
-    logger.info(f"Nova predição solicitada com {len(input_data)} features")
+    logger.info(f"Nova predição solicitada ({request_id}) com {len(input_data)} features")
     
-    # Converte os dados em um DataFrame Pandas
-    df = pd.DataFrame(input_data)
+    # A requisição termina na versão dos artefatos que pegou, mesmo com uma troca no meio
+    with artifacts.acquire() as ativos:
+        if ativos is None:
+            logger.error("Tentativa de predição com artefatos não carregados")
+            return jsonify({'error': 'Modelo não disponível'}), 503
+        try:
+            predictions = score(ativos, input_data, request_id, inicio, g.timer)
+        except PayloadError as e:
+            logger.warning(f"Payload inválido: {e}")
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            logger.error(f"Erro durante predição: {e}")
+            return jsonify({'error': 'Erro interno do servidor'}), 500
     
-    # Valida se todas as colunas necessárias estão presentes
-    required_columns = [
-        'profissao', 'tempoprofissao', 'renda', 'tiporesidencia', 
-        'escolaridade', 'score', 'idade', 'dependentes', 'estadocivil', 
-        'produto', 'valorsolicitado', 'valortotalbem', 'proporcaosolicitadototal'
-    ]
+    logger.info(f"Predição concluída. Resultado: {predictions.tolist()}")
+    g.timer.rows = len(predictions)
     
-    missing_columns = [col for col in required_columns if col not in df.columns]
-    if missing_columns:
-        logger.warning(f"Colunas ausentes: {missing_columns}")
-        return jsonify({'error': f'Colunas ausentes: {missing_columns}'}), 400
+    formato_resposta = response_format(request.accept_mimetypes, formato)
+    with g.timer.span('serialize'):
+        if formato_resposta == 'json':
+            return jsonify(predictions.tolist())
+        try:
+            corpo = encode_response(predictions[:, 0], formato_resposta)
+        except UnsupportedFormatError as e:
+            return jsonify({'error': str(e)}), 406
+        return Response(corpo, mimetype=MIMETYPES[formato_resposta])
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Predição em lote com entrada e saída NDJSON em streaming
+
+    Cada linha da entrada é um registro (um solicitante) ou um bloco colunar
+    no formato do /predict. As linhas são processadas em lotes de
+    Config.BATCH_CHUNK_SIZE e cada resultado é enviado assim que o seu lote
+    termina, com memória constante. Cada saída traz o número da linha de
+    entrada ("line", a partir de 1) e, para blocos colunares, a posição no
+    bloco ("index"); uma linha inválida gera {"line", "error"} e não afeta
+    as demais.
+
+    Cada linha da entrada vai para o log de predições com o seu próprio
+    request_id ("<X-Request-ID ou gerado>-<linha>") e a versão do modelo,
+    e o stream é registrado no /metrics com o prefixo prediction_batch.
+    """
+    if artifacts.current is None:
+        logger.error("Tentativa de predição em lote com artefatos não carregados")
+        return jsonify({'error': 'Modelo não disponível'}), 503
     
-    # Aplica pré-processamento
-    try:
-        df = load_scalers(df, ['tempoprofissao', 'renda', 'idade', 'dependentes',
-                              'valorsolicitado', 'valortotalbem', 'proporcaosolicitadototal'])
-        
-        df = load_encoders(df, ['profissao', 'tiporesidencia', 'escolaridade', 'score',
-                               'estadocivil', 'produto'])
-        
-        df = selector_carregado.transform(df)
-        
-        # Realiza a previsão
-        predictions = model.predict(df)
-        
-        # Log da predição
-        for i, pred in enumerate(predictions):
-            probability = float(pred[0])
-            classification = "Bom" if probability > 0.5 else "Ruim"
-            
-            # Log detalhado (apenas na primeira iteração para evitar spam)
-            if hasattr(predict, '_timing_info'):
-                processing_time = predict._timing_info
-                model_logger.log_prediction(
-                    input_data=input_data,
-                    prediction=classification,
-                    probability=probability,
-                    processing_time=processing_time
-                )
-        
-        logger.info(f"Predição concluída. Resultado: {predictions.tolist()}")
-        return jsonify(predictions.tolist())
+    def erro_por_linha(origens, mensagem):
+        linhas = dict.fromkeys(numero for numero, _ in origens)
+        return ''.join(json.dumps({'line': numero, 'error': mensagem}, ensure_ascii=False) + '\n'
+                       for numero in linhas)
+    
+    def log_linhas(ativos, payload, origens, probabilidades, inicio):
+        for i, ((numero, indice), p) in enumerate(zip(origens, probabilidades)):
+            model_logger.log_prediction(
+                f'{base_id}-{numero}', indice or 0, row_features(payload, i),
+                'Bom' if p > 0.5 else 'Ruim', p, time.time() - inicio, model_version=ativos.version)
+    
+    def gerar():
+        inicio = time.time()
+        total = 0
+        timer = batch_metrics.timer()
+        status = 500
+        lotes = iter_ndjson_chunks(request.stream, Config.BATCH_CHUNK_SIZE)
+        try:
+            # O stream inteiro usa a mesma versão dos artefatos
+            with artifacts.acquire() as ativos:
+                while True:
+                    with timer.span('decode'):
+                        lote = next(lotes, None)
+                    if lote is None:
+                        break
+                    payload, origens, erro = lote
+                    if erro is not None:
+                        yield erro_por_linha(origens, erro)
+                        continue
+                    inicio_lote = time.time()
+                    try:
+                        X, _ = ativos.preprocessamento.transform_columns(
+                            payload, scale_numeric=not ativos.model.folded_scalers, timer=timer)
+                        with timer.span('infer'):
+                            probabilidades = cached_inference(
+                                X, ativos.model.predict, ativos.digest)[:, 0].tolist()
+                        with timer.span('log'):
+                            log_linhas(ativos, payload, origens, probabilidades, inicio_lote)
+                    except PayloadError as e:
+                        yield erro_por_linha(origens, str(e))
+                        continue
+                    except Exception as e:
+                        logger.error(f"Erro durante predição em lote: {e}")
+                        yield json.dumps({'error': 'Erro interno do servidor'}) + '\n'
+                        return
+                    
+                    with timer.span('serialize'):
+                        saida = ''.join(
+                            f'{{"line": {numero}, "probability": {p!r}}}\n' if indice is None else
+                            f'{{"line": {numero}, "index": {indice}, "probability": {p!r}}}\n'
+                            for (numero, indice), p in zip(origens, probabilidades)
+                        )
+                    yield saida
+                    total += len(probabilidades)
+                    timer.rows = total
+            status = 200
+        finally:
+            batch_metrics.record(timer, status)
         
-    except Exception as e:
-        logger.error(f"Erro durante predição: {e}")
-        return jsonify({'error': 'Erro interno do servidor'}), 500
+        logger.info(f"Predição em lote concluída ({base_id}): {total} linhas em {time.time() - inicio:.2f}s "
+                    f"(versão {ativos.version})")
+    
+    base_id = request.headers.get('X-Request-ID') or new_request_id()
+    return Response(stream_with_context(gerar()), mimetype=NDJSON_MIMETYPE)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Histogramas de latência por estágio do /predict, p50/p95/p99 e contadores (texto)
+
+    O /predict/batch aparece com o prefixo prediction_batch (um registro por
+    stream). As métricas são do processo: com vários workers cada um responde
+    as suas.
+    """
+    texto = prediction_metrics.render() + batch_metrics.render(prefix='prediction_batch')
+    return Response(texto, mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """Carrega a versão publicada indicada no CURRENT e troca sem reiniciar
+
+    Exige o cabeçalho X-Admin-Token igual a Config.ADMIN_TOKEN (sem token
+    configurado o endpoint não existe). Com ?wait=true responde depois da
+    troca; senão a carga segue em segundo plano (202). Com vários workers,
+    cada um só recarrega ao receber a chamada: prefira publicar a versão e
+    deixar o ARTIFACT_WATCH_SECONDS propagar.
+    """
+    if not Config.ADMIN_TOKEN:
+        return jsonify({'error': 'Endpoint não encontrado'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), Config.ADMIN_TOKEN):
+        return jsonify({'error': 'Não autorizado'}), 401
+    
+    if request.args.get('wait', 'false').lower() == 'true':
+        trocou = artifacts.load()
+        status = artifacts.status()
+        status['swapped'] = trocou
+        return jsonify(status), 500 if status['last_error'] else 200
+    
+    if not artifacts.reload():
+        return jsonify({'status': 'carga já em andamento'}), 409
+    return jsonify({'status': 'carregando'}), 202
 
 @app.errorhandler(404)
 def not_found(error):
@@ -1,28 +1,55 @@
 """
 API Mock para testes - Compatível com sklearn ao invés de TensorFlow
 """
-from flask import Flask, request, jsonify, render_template_string
-import pandas as pd
+from flask import Flask, Response, request, jsonify, render_template_string
 import joblib
 import os
 import numpy as np
 from datetime import datetime
 import json
 import time
+from preprocessing import PreprocessingPipeline, PayloadError, load_selected_features
+from bundle import Bundle, load_bundle_model, PREPROCESSING_SECTION, SELECTOR_SECTION
+from forest import FOREST_BACKEND
+from config import Config
+from log_segments import SegmentRoller
+from logger import AsyncLogWriter, new_request_id, row_features, prediction_log_entry
+from metrics import PredictionMetrics
 
 app = Flask(__name__)
 
 # Variáveis globais
 model = None
-selector = None
-scalers = {}
-encoders = {}
+selected = None
+preprocessamento = None
+
+# Log de predições gravado em segundo plano (o request só enfileira)
+prediction_writer = AsyncLogWriter(
+    './logs/predictions.log',
+    roller=SegmentRoller.create('./logs/predictions.log', './logs/predictions')
+)
+
+# Latência por estágio do /predict e contadores, expostos no /metrics
+prediction_metrics = PredictionMetrics()
 
 def load_model_artifacts():
     """Carrega modelo e artefatos"""
-    global model, selector, scalers, encoders
+    global model, selected, preprocessamento
     
     try:
+        # Floresta em arrays no serving.bundle: mapeada em memória e compartilhada entre workers
+        # (FOREST_ENGINE=sklearn usa o RandomForestClassifier do joblib)
+        if Config.FOREST_ENGINE == 'flat' and os.path.exists('./objects/serving.bundle'):
+            bundle = Bundle('./objects/serving.bundle')
+            if bundle.metadata.get('model_backend') == FOREST_BACKEND:
+                model = load_bundle_model(bundle)
+                selected = bundle[SELECTOR_SECTION + 'indices']
+                preprocessamento = PreprocessingPipeline.from_arrays(
+                    bundle.section(PREPROCESSING_SECTION), selected=selected)
+                print(f"✅ Modelo carregado do serving.bundle ({model.n_estimators} árvores mapeadas, "
+                      f"{len(selected)} features, versão {bundle.version})")
+                return True
+        
         # Carrega modelo
         if os.path.exists('./objects/meu_modelo.joblib'):
             model = joblib.load('./objects/meu_modelo.joblib')
@@ -31,49 +58,27 @@ def load_model_artifacts():
             print("❌ Modelo não encontrado")
             return False
         
-        # Carrega selector
-        if os.path.exists('./objects/selector.joblib'):
-            selector = joblib.load('./objects/selector.joblib')
-            print("✅ Seletor carregado")
+        # Carrega índices do seletor (ou extrai do selector.joblib antigo)
+        if os.path.exists('./objects/selector_indices.npy') or os.path.exists('./objects/selector.joblib'):
+            selected = load_selected_features('./objects/selector_indices.npy', './objects/selector.joblib')
+            print(f"✅ Seletor carregado ({len(selected)} features)")
         else:
             print("❌ Seletor não encontrado")
             return False
         
-        # Carrega scalers
-        numeric_cols = ['tempoprofissao', 'renda', 'idade', 'dependentes', 'valorsolicitado', 'valortotalbem', 'proporcaosolicitadototal']
-        for col in numeric_cols:
-            scaler_path = f'./objects/scaler{col}.joblib'
-            if os.path.exists(scaler_path):
-                scalers[col] = joblib.load(scaler_path)
-        
-        # Carrega encoders
-        categorical_cols = ['profissao', 'tiporesidencia', 'escolaridade', 'score', 'estadocivil', 'produto']
-        for col in categorical_cols:
-            encoder_path = f'./objects/labelencoder{col}.joblib'
-            if os.path.exists(encoder_path):
-                encoders[col] = joblib.load(encoder_path)
-        
-        print(f"✅ Carregados {len(scalers)} scalers e {len(encoders)} encoders")
+        # Carrega scalers e encoders
+        preprocessamento = PreprocessingPipeline.from_objects('./objects', selected=selected)
+        print(f"✅ Carregados {len(preprocessamento.numeric_scaler.mean)} scalers e {len(preprocessamento.coders)} encoders")
         return True
         
     except Exception as e:
         print(f"❌ Erro ao carregar artefatos: {e}")
         return False
 
-def log_prediction(input_data, prediction, probability, processing_time):
-    """Log de predições"""
-    os.makedirs('./logs', exist_ok=True)
-    
-    log_entry = {
-        'timestamp': datetime.now().isoformat(),
-        'input_data': input_data,
-        'prediction': prediction,
-        'probability': float(probability),
-        'processing_time_ms': processing_time * 1000,
-    }
-    
-    with open('./logs/predictions.log', 'a', encoding='utf-8') as f:
-        f.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
+def log_prediction(request_id, row, features, prediction, probability, processing_time):
+    """Log de uma linha predita (enfileirado para o AsyncLogWriter)"""
+    prediction_writer.write(
+        prediction_log_entry(request_id, row, features, prediction, probability, processing_time))
 
 # Carrega artefatos na inicialização
 artifacts_loaded = load_model_artifacts()
@@ -85,9 +90,9 @@ def health_check():
         'status': 'healthy' if artifacts_loaded else 'unhealthy',
         'timestamp': datetime.now().isoformat(),
         'model_loaded': model is not None,
-        'selector_loaded': selector is not None,
-        'scalers_loaded': len(scalers),
-        'encoders_loaded': len(encoders),
+        'selector_loaded': selected is not None,
+        'scalers_loaded': len(preprocessamento.numeric_scaler.mean) if preprocessamento else 0,
+        'encoders_loaded': len(preprocessamento.coders) if preprocessamento else 0,
         'version': '2.0.0-mock'
     }
     
@@ -119,6 +124,7 @@ def home():
             <h2>📡 Endpoints</h2>
             <p><strong>GET /health</strong> - Health check</p>
             <p><strong>POST /predict</strong> - Fazer predição</p>
+            <p><strong>GET /metrics</strong> - Latência por estágio do /predict (p50/p95/p99)</p>
             <h2>🧪 Versão de Teste</h2>
             <p>Esta é uma versão mock para testes, usando RandomForest ao invés de TensorFlow.</p>
         </div>
@@ -134,59 +140,72 @@ def home():
 @app.route('/predict', methods=['POST'])
 def predict():
     """Endpoint de predição"""
+    timer = prediction_metrics.timer()
+    status = 500
+    try:
+        resposta = _predict(timer)
+        status = resposta[1] if isinstance(resposta, tuple) else resposta.status_code
+        return resposta
+    finally:
+        prediction_metrics.record(timer, status)
+
+def _predict(timer):
     if not artifacts_loaded:
         return jsonify({'error': 'Modelo não disponível'}), 503
     
     start_time = time.time()
+    request_id = request.headers.get('X-Request-ID') or new_request_id()
     
     try:
         # Obter dados
-        input_data = request.get_json()
+        with timer.span('decode'):
+            input_data = request.get_json()
         if not input_data:
             return jsonify({'error': 'Dados JSON necessários'}), 400
         
-        # Converter para DataFrame
-        df = pd.DataFrame(input_data)
-        
-        # Aplicar scalers
-        for col, scaler in scalers.items():
-            if col in df.columns:
-                df[col] = scaler.transform(df[[col]])
-        
-        # Aplicar encoders
-        for col, encoder in encoders.items():
-            if col in df.columns:
-                try:
-                    df[col] = encoder.transform(df[col])
-                except ValueError:
-                    # Se categoria não vista no treino, usar valor padrão
-                    df[col] = 0
-        
-        # Selecionar features
-        df_selected = selector.transform(df)
+        # Aplicar scalers, encoders e seleção direto em arrays NumPy (categoria
+        # não vista no treino recebe o código padrão apenas na linha afetada)
+        try:
+            df_selected, desconhecidas = preprocessamento.transform_columns(input_data, timer=timer)
+        except PayloadError as e:
+            return jsonify({'error': str(e)}), 400
+        if desconhecidas.any():
+            print(f"⚠️ Categorias desconhecidas em {int(desconhecidas.any(axis=1).sum())} linha(s)")
         
         # Fazer predição
-        predictions_prob = model.predict_proba(df_selected)
+        with timer.span('infer'):
+            predictions_prob = model.predict_proba(df_selected)
         
         # Extrair probabilidade da classe positiva (índice 1 = 'bom')
         if predictions_prob.shape[1] > 1:
             results = [[float(prob[1])] for prob in predictions_prob]
         else:
             results = [[0.5] for _ in range(len(predictions_prob))]
+        timer.rows = len(results)
         
         # Log
-        processing_time = time.time() - start_time
-        for i, result in enumerate(results):
-            probability = result[0]
-            classification = "Bom" if probability > 0.5 else "Ruim"
-            log_prediction(input_data, classification, probability, processing_time)
+        with timer.span('log'):
+            processing_time = time.time() - start_time
+            for i, result in enumerate(results):
+                probability = result[0]
+                classification = "Bom" if probability > 0.5 else "Ruim"
+                log_prediction(request_id, i, row_features(input_data, i), classification, probability, processing_time)
         
-        return jsonify(results)
+        with timer.span('serialize'):
+            return jsonify(results)
         
     except Exception as e:
         print(f"❌ Erro na predição: {e}")
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Histogramas de latência por estágio do /predict, p50/p95/p99 e contadores (texto)
+
+    As métricas são do processo: com vários workers cada um responde as suas.
+    """
+    return Response(prediction_metrics.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     if artifacts_loaded:
         print("🚀 API Mock iniciando em http://127.0.0.1:5000")
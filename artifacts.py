@@ -0,0 +1,342 @@
+"""
+Versões dos artefatos de serving e troca sem reiniciar a API
+
+Cada versão publicada fica em Config.ARTIFACT_VERSIONS_DIR/<versão>/ com os
+mesmos nomes de arquivo de objects/ (modelo, seletor, scalers, encoders,
+preprocessing.npz) e o arquivo CURRENT indica a versão ativa. Sem versões
+publicadas, o próprio objects/ é servido e a versão é o digest do conteúdo,
+mas só na inicialização: um treino pode estar gravando em objects/, então
+trocas a quente acontecem apenas entre versões publicadas (diretório criado
+por rename atômico e CURRENT trocado atomicamente).
+
+O ArtifactManager carrega e aquece a nova versão em segundo plano e troca
+uma única referência; cada requisição usa a versão que pegou em acquire()
+até o fim, e a versão antiga é encerrada quando a última delas termina.
+
+Uso:
+    python artifacts.py publish [--version 20250101120000] [--no-activate]
+    python artifacts.py activate <versão>
+    python artifacts.py list
+"""
+import argparse
+import contextlib
+import logging
+import os
+import shutil
+import threading
+import time
+import weakref
+from datetime import datetime
+from config import Config
+from cache import artifact_version
+from inference import load_backend, backend_artifact, warmup
+from preprocessing import PreprocessingPipeline, load_selected_features
+from batching import MicroBatcher
+from bundle import Bundle, load_bundle_model, PREPROCESSING_SECTION, SELECTOR_SECTION
+
+logger = logging.getLogger(__name__)
+
+CURRENT_NAME = 'CURRENT'
+VERSION_TIME_FORMAT = '%Y%m%d%H%M%S'
+
+
+def list_versions(versions_dir=Config.ARTIFACT_VERSIONS_DIR):
+    """Versões publicadas, da mais antiga para a mais nova"""
+    if not os.path.isdir(versions_dir):
+        return []
+    return sorted(nome for nome in os.listdir(versions_dir)
+                  if os.path.isdir(os.path.join(versions_dir, nome)) and not nome.startswith('.'))
+
+
+def current_version(versions_dir=Config.ARTIFACT_VERSIONS_DIR):
+    """Versão indicada no CURRENT (None sem versões publicadas)"""
+    try:
+        with open(os.path.join(versions_dir, CURRENT_NAME), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def activate_version(version, versions_dir=Config.ARTIFACT_VERSIONS_DIR):
+    """Aponta o CURRENT para uma versão publicada (troca atômica do arquivo)"""
+    if version not in list_versions(versions_dir):
+        raise ValueError(f"Versão de artefatos não encontrada: {version}")
+    tmp = os.path.join(versions_dir, f'.{CURRENT_NAME}.{os.getpid()}.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(version + '\n')
+    os.replace(tmp, os.path.join(versions_dir, CURRENT_NAME))
+
+
+def publish_version(source_dir=Config.OBJECTS_DIR, versions_dir=Config.ARTIFACT_VERSIONS_DIR,
+                    version=None, activate=True):
+    """Copia os artefatos de source_dir para uma nova versão e (opcionalmente) a ativa"""
+    version = version or datetime.now().strftime(VERSION_TIME_FORMAT)
+    destino = os.path.join(versions_dir, version)
+    if os.path.exists(destino):
+        raise ValueError(f"Versão de artefatos já publicada: {version}")
+
+    # Copia para um diretório temporário e renomeia: uma versão nunca é vista pela metade
+    tmp = os.path.join(versions_dir, f'.{version}.tmp')
+    os.makedirs(tmp, exist_ok=True)
+    for nome in os.listdir(source_dir):
+        origem = os.path.join(source_dir, nome)
+        if os.path.isfile(origem):
+            shutil.copy2(origem, os.path.join(tmp, nome))
+    os.replace(tmp, destino)
+
+    if activate:
+        activate_version(version, versions_dir)
+    return version
+
+
+def resolve_artifacts(objects_dir=Config.OBJECTS_DIR, versions_dir=Config.ARTIFACT_VERSIONS_DIR):
+    """(diretório, versão) a servir: a versão do CURRENT ou o próprio objects_dir"""
+    version = current_version(versions_dir)
+    if version is not None:
+        return os.path.join(versions_dir, version), version
+    return objects_dir, None
+
+
+def artifact_files(directory, backend=None):
+    """Arquivos que determinam o resultado da predição em directory"""
+    paths = [os.path.join(directory, os.path.basename(backend_artifact(backend))),
+             os.path.join(directory, os.path.basename(Config.SELECTOR_INDICES_PATH)),
+             os.path.join(directory, os.path.basename(Config.SELECTOR_PATH))]
+    paths += [os.path.join(directory, f) for f in os.listdir(directory)
+              if f.startswith(('scaler', 'labelencoder', 'preprocessing'))]
+    return paths
+
+
+class ServingArtifacts:
+    """Uma versão carregada: modelo, pré-processamento e micro-batcher
+
+    in_flight conta as requisições que pegaram esta versão; retire() espera
+    a última terminar antes de encerrar o micro-batcher.
+    """
+
+    def __init__(self, version, digest, directory, model, preprocessamento, batcher=None):
+        self.version = version
+        self.digest = digest
+        self.directory = directory
+        self.model = model
+        self.preprocessamento = preprocessamento
+        self.batcher = batcher
+        self.loaded_at = datetime.now()
+        self.in_flight = 0
+        self._idle = threading.Condition()
+
+    def predict(self, X):
+        """Executa o modelo, agrupando requisições concorrentes se o micro-batching estiver ativo"""
+        if self.batcher is not None:
+            return self.batcher.predict(X)
+        return self.model.predict(X)
+
+    def retire(self, timeout=None):
+        """Espera as requisições em andamento e libera o micro-batcher"""
+        with self._idle:
+            self._idle.wait_for(lambda: self.in_flight == 0, timeout)
+        if self.batcher is not None:
+            self.batcher.close()
+
+    def info(self):
+        return {
+            'version': self.version,
+            'digest': self.digest,
+            'backend': self.model.name,
+            'loaded_at': self.loaded_at.isoformat(),
+            'in_flight': self.in_flight,
+        }
+
+
+def load_artifacts(directory, version=None, backend=None):
+    """Carrega e aquece os artefatos de directory (exceções sobem para o chamador)"""
+    backend = backend or Config.INFERENCE_BACKEND
+    model_path = os.path.join(directory, os.path.basename(backend_artifact(backend)))
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Modelo não encontrado: {model_path}")
+
+    if backend == 'bundle':
+        # Modelo, seletor e pré-processamento saem do mesmo arquivo mapeado
+        bundle = Bundle(model_path, verify=Config.BUNDLE_VERIFY)
+        model = load_bundle_model(bundle)
+        selected = bundle[SELECTOR_SECTION + 'indices']
+        preprocessamento = PreprocessingPipeline.from_arrays(bundle.section(PREPROCESSING_SECTION),
+                                                             selected=selected)
+        digest = bundle.digest
+        version = version or bundle.version
+        logger.info(f"Bundle de serving mapeado: {model_path} (versão {bundle.version}, "
+                    f"{bundle.nbytes() / 1024:.1f} KB, modelo {bundle.metadata['model_backend']}, "
+                    f"{len(selected)} features)")
+    else:
+        model = load_backend(backend, model_path)
+        logger.info(f"Modelo carregado: {model_path} (backend {model.name})")
+
+        indices_path = os.path.join(directory, os.path.basename(Config.SELECTOR_INDICES_PATH))
+        selector_path = os.path.join(directory, os.path.basename(Config.SELECTOR_PATH))
+        if not (os.path.exists(indices_path) or os.path.exists(selector_path)):
+            raise FileNotFoundError(f"Seletor não encontrado: {indices_path}")
+        selected = load_selected_features(indices_path, selector_path)
+        logger.info(f"Seletor carregado: {len(selected)} features selecionadas")
+
+        preprocessamento = PreprocessingPipeline.from_objects(directory, selected=selected)
+        logger.info("Scalers e encoders carregados em memória")
+        digest = artifact_version(artifact_files(directory, backend))
+
+    if Config.WARMUP_ENABLED:
+        tempos = warmup(model, Config.WARMUP_BATCH_SIZES)
+        logger.info(f"Aquecimento concluído (ms por tamanho de lote): {tempos}")
+
+    batcher = None
+    if Config.BATCHING_ENABLED:
+        batcher = MicroBatcher(model.predict, max_batch_size=Config.BATCHING_MAX_SIZE,
+                               max_wait_us=Config.BATCHING_MAX_WAIT_US)
+        logger.info(f"Micro-batching ativo (lote máx. {Config.BATCHING_MAX_SIZE}, "
+                    f"espera máx. {Config.BATCHING_MAX_WAIT_US}µs)")
+
+    return ServingArtifacts(version or digest, digest, directory, model, preprocessamento, batcher)
+
+
+class ArtifactManager:
+    """Mantém a versão ativa e troca por uma nova sem interromper requisições
+
+    reload() carrega a versão apontada pelo CURRENT em uma thread e só então
+    troca a referência; watch() verifica o CURRENT periodicamente. Com uma
+    versão ativa, o objects/ sem versão publicada não é recarregado.
+    on_swap(nova) é chamado depois da troca (ex.: limpar o cache de predições).
+    """
+
+    def __init__(self, loader=load_artifacts, resolver=resolve_artifacts, on_swap=None):
+        self.loader = loader
+        self.resolver = resolver
+        self.on_swap = on_swap
+        self.current = None
+        self.last_error = None
+        self.reloads = 0
+        self._swap_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watch_interval = 0
+        self._signature = None
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """Versão ativa (ou None) mantida até o fim do bloco"""
+        with self._swap_lock:
+            ativos = self.current
+            if ativos is not None:
+                with ativos._idle:
+                    ativos.in_flight += 1
+        try:
+            yield ativos
+        finally:
+            if ativos is not None:
+                with ativos._idle:
+                    ativos.in_flight -= 1
+                    ativos._idle.notify_all()
+
+    def load(self):
+        """Carrega a versão indicada pelo resolver e a ativa; True se houve troca"""
+        with self._reload_lock:
+            directory = None
+            try:
+                directory, version = self.resolver()
+                if version is None and self.current is not None:
+                    # objects/ pode estar no meio de um treino: só versões publicadas trocam a quente
+                    logger.info("Nenhuma versão publicada: objects/ só é lido na inicialização")
+                    return False
+                novos = self.loader(directory, version)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                if directory is not None:
+                    self._signature = (directory, version)  # não tenta de novo até o CURRENT mudar
+                logger.error(f"Erro ao carregar artefatos de {directory}: {e}")
+                return False
+            assinatura = (directory, version)
+
+            atual = self.current
+            if atual is not None and atual.digest == novos.digest:
+                novos.retire()
+                self._signature = assinatura
+                return False
+
+            with self._swap_lock:
+                anteriores, self.current = self.current, novos
+            self.last_error = None
+            self._signature = assinatura
+            self.reloads += 1
+            logger.info(f"Artefatos ativos: versão {novos.version}"
+                        + (f" (anterior: {anteriores.version})" if anteriores is not None else ''))
+            if self.on_swap is not None:
+                self.on_swap(novos)
+            if anteriores is not None:
+                threading.Thread(target=anteriores.retire, name='artifact-retire', daemon=True).start()
+            return True
+
+    def reload(self):
+        """Dispara load() em segundo plano; False se já houver uma carga em andamento"""
+        if self._reload_lock.locked():
+            return False
+        threading.Thread(target=self.load, name='artifact-reload', daemon=True).start()
+        return True
+
+    def watch(self, interval):
+        """Verifica a cada interval segundos se a versão a servir mudou"""
+        if interval <= 0 or self._watch_interval:
+            return
+        self._watch_interval = interval
+        self._start_watcher()
+        if hasattr(os, 'register_at_fork'):
+            # Workers criados por fork (gunicorn com preload) não herdam a thread
+            ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: ref() is not None and ref()._start_watcher())
+
+    def _start_watcher(self):
+        threading.Thread(target=self._watch, name='artifact-watch', daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self._watch_interval)
+            try:
+                # Versões publicadas não mudam depois do rename: basta comparar o CURRENT
+                directory, version = self.resolver()
+                if version is not None and (directory, version) != self._signature:
+                    self.load()
+            except Exception as e:
+                logger.warning(f"Falha ao verificar versão dos artefatos: {e}")
+
+    def status(self):
+        """Versão ativa e estado da última carga, para o /health"""
+        return {
+            'active': self.current.info() if self.current is not None else None,
+            'reloads': self.reloads,
+            'reloading': self._reload_lock.locked(),
+            'last_error': self.last_error,
+            'watch_seconds': self._watch_interval,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Publica e ativa versões dos artefatos de serving')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    publicar = sub.add_parser('publish', help='Copia objects/ para uma nova versão')
+    publicar.add_argument('--version', default=None, help='Nome da versão (padrão: data e hora)')
+    publicar.add_argument('--source', default=Config.OBJECTS_DIR, help='Diretório com os artefatos')
+    publicar.add_argument('--no-activate', action='store_true', help='Publica sem ativar')
+    ativar = sub.add_parser('activate', help='Ativa uma versão publicada (também para rollback)')
+    ativar.add_argument('version')
+    sub.add_parser('list', help='Lista as versões publicadas')
+    args = parser.parse_args()
+
+    if args.comando == 'publish':
+        version = publish_version(args.source, version=args.version, activate=not args.no_activate)
+        print(f"✅ Versão publicada: {version}" + ('' if args.no_activate else ' (ativa)'))
+    elif args.comando == 'activate':
+        activate_version(args.version)
+        print(f"✅ Versão ativa: {args.version}")
+    else:
+        ativa = current_version()
+        for version in list_versions():
+            print(f"{'*' if version == ativa else ' '} {version}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Micro-batching dinâmico na frente do model.predict
+
+Requisições concorrentes são enfileiradas e agrupadas em um único forward
+pass (até um tamanho máximo de lote ou um tempo máximo de espera); cada
+chamador recebe apenas a sua fatia do resultado.
+"""
+import os
+import queue
+import threading
+import time
+import weakref
+import numpy as np
+from metrics import Histogram
+
+# Buckets dos histogramas: linhas por lote e espera na fila (microssegundos)
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+QUEUE_WAIT_BUCKETS_US = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000]
+
+
+class _PendingRequest:
+    """Requisição aguardando o processamento do lote"""
+
+    __slots__ = ('X', 'enqueued_at', 'done', 'result', 'error')
+
+    def __init__(self, X):
+        self.X = X
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Agrupa chamadas concorrentes de predict_fn em micro-lotes"""
+
+    _STOP = object()
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_us=2000):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_us / 1e6
+        self.batch_size_hist = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_hist = Histogram(QUEUE_WAIT_BUCKETS_US)
+        self._start()
+        if hasattr(os, 'register_at_fork'):
+            # Workers criados por fork (gunicorn com preload) não herdam a thread
+            ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: ref() is not None and ref()._start())
+
+    def _start(self):
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def predict(self, X):
+        """Enfileira X (n_linhas x n_features) e bloqueia até o resultado do lote"""
+        pendente = _PendingRequest(X)
+        self._queue.put(pendente)
+        pendente.done.wait()
+        if pendente.error is not None:
+            raise pendente.error
+        return pendente.result
+
+    def close(self):
+        """Encerra a thread depois dos lotes já enfileirados"""
+        self._queue.put(self._STOP)
+
+    def stats(self):
+        """Histogramas de tamanho de lote e espera na fila"""
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_us': int(self.max_wait * 1e6),
+            'batch_size': self.batch_size_hist.snapshot(),
+            'queue_wait_us': self.queue_wait_hist.snapshot(),
+        }
+
+    def _collect(self):
+        """Bloqueia pela primeira requisição e agrupa as que chegarem na janela"""
+        primeiro = self._queue.get()
+        if primeiro is self._STOP:
+            return None, 0
+        lote = [primeiro]
+        linhas = len(lote[0].X)
+        prazo = time.perf_counter() + self.max_wait
+        while linhas < self.max_batch_size:
+            restante = prazo - time.perf_counter()
+            if restante <= 0:
+                break
+            try:
+                pendente = self._queue.get(timeout=restante)
+            except queue.Empty:
+                break
+            if pendente is self._STOP:
+                # Processa o lote atual e encerra na próxima coleta
+                self._queue.put(pendente)
+                break
+            lote.append(pendente)
+            linhas += len(pendente.X)
+        return lote, linhas
+
+    def _run(self):
+        while True:
+            lote, linhas = self._collect()
+            if lote is None:
+                break
+            inicio = time.perf_counter()
+            for pendente in lote:
+                self.queue_wait_hist.observe((inicio - pendente.enqueued_at) * 1e6)
+            self.batch_size_hist.observe(linhas)
+
+            try:
+                X = lote[0].X if len(lote) == 1 else np.concatenate([p.X for p in lote])
+                saida = self.predict_fn(X)
+                offset = 0
+                for pendente in lote:
+                    pendente.result = saida[offset:offset + len(pendente.X)]
+                    offset += len(pendente.X)
+            except Exception as e:
+                for pendente in lote:
+                    pendente.error = e
+            finally:
+                for pendente in lote:
+                    pendente.done.set()
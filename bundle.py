@@ -0,0 +1,193 @@
+"""
+Bundle único de serving, mapeado em memória
+
+Um arquivo com tudo que a API precisa para responder: médias e escalas dos
+scalers, tabelas de categorias, índices do seletor e os pesos do modelo (ou
+as árvores da RandomForest do api_mock),
+gravados como arrays brutos alinhados, precedidos de um manifest JSON
+(versão, metadados e dtype, shape, offset e checksum de cada array).
+
+Na carga o arquivo é aberto uma vez e mapeado com mmap: cada array é uma
+view somente leitura sobre o mapeamento, sem unpickle nem cópia, e as
+páginas ficam compartilhadas entre os workers pelo page cache. Os checksums
+são conferidos sobre essas mesmas páginas, que são as usadas na inferência.
+
+Formato:
+    MAGIC (8 bytes) | tamanho do manifest (uint64 little-endian) | manifest JSON
+    | arrays, cada um começando em um offset múltiplo de ALIGNMENT
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+from datetime import datetime
+import numpy as np
+from config import Config
+
+MAGIC = b'CRDBNDL1'
+ALIGNMENT = 64
+FORMAT_VERSION = 1
+
+# Seções do bundle de serving (prefixos dos nomes dos arrays)
+PREPROCESSING_SECTION = 'preprocessing/'
+SELECTOR_SECTION = 'selector/'
+MODEL_SECTION = 'model/'
+
+# Backends cujo artefato é um .npz de arrays (podem ir para o bundle), além
+# da RandomForest do api_mock exportada por forest.export_forest
+BUNDLE_MODEL_BACKENDS = ('numpy', 'numpy-folded', 'forest')
+
+
+class BundleError(ValueError):
+    """Bundle inválido (formato desconhecido, truncado ou checksum divergente)"""
+
+
+def _checksum(buffer):
+    return hashlib.blake2b(buffer, digest_size=16).hexdigest()
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_bundle(path, arrays, metadata=None, version=None):
+    """Grava os arrays (nome -> ndarray) e os metadados em um bundle (escrita atômica)"""
+    version = version or datetime.now().strftime('%Y%m%d%H%M%S')
+    arrays = {name: np.asarray(array, order='C') for name, array in arrays.items()}
+    entradas = {}
+    offset = 0
+    for name, array in arrays.items():
+        if array.dtype.hasobject:
+            raise BundleError(f"Array {name} com dtype object não pode ser mapeado")
+        offset = _align(offset)
+        entradas[name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': offset,
+            'nbytes': array.nbytes,
+            'checksum': _checksum(array.tobytes()),
+        }
+        offset += array.nbytes
+
+    manifest = json.dumps({
+        'format': FORMAT_VERSION,
+        'version': version,
+        'created': datetime.now().isoformat(),
+        'metadata': metadata or {},
+        'arrays': entradas,
+    }, ensure_ascii=False).encode('utf-8')
+    inicio_dados = _data_start(len(manifest))
+
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(manifest)))
+        f.write(manifest)
+        for name, array in arrays.items():
+            f.write(b'\0' * (inicio_dados + entradas[name]['offset'] - f.tell()))
+            f.write(array.tobytes())
+    os.replace(tmp, path)
+    return path
+
+
+def _data_start(manifest_size):
+    """Início da seção de dados (os offsets do manifest são relativos a ele)"""
+    return _align(len(MAGIC) + 8 + manifest_size)
+
+
+class Bundle:
+    """Bundle aberto: arrays somente leitura mapeados do arquivo
+
+    bundle['model/kernel_0'] devolve a view; section('model/') devolve um
+    dict com os arrays da seção sem o prefixo. digest identifica o conteúdo
+    a partir dos checksums do manifest (sem reler os arrays).
+    """
+
+    def __init__(self, path, verify=True):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise BundleError(f"{path} não é um bundle de serving")
+        (tamanho,) = struct.unpack_from('<Q', self._mmap, len(MAGIC))
+        try:
+            manifest = json.loads(self._mmap[len(MAGIC) + 8:len(MAGIC) + 8 + tamanho].decode('utf-8'))
+        except ValueError as e:
+            raise BundleError(f"Manifest inválido em {path}: {e}")
+        if manifest.get('format') != FORMAT_VERSION:
+            raise BundleError(f"Formato de bundle não suportado: {manifest.get('format')}")
+
+        self.version = manifest['version']
+        self.created = manifest['created']
+        self.metadata = manifest['metadata']
+        self.manifest = manifest['arrays']
+        self.digest = hashlib.blake2b(
+            ''.join(e['checksum'] for e in self.manifest.values()).encode(), digest_size=8).hexdigest()
+
+        inicio_dados = _data_start(tamanho)
+        paginas = memoryview(self._mmap)
+        self.arrays = {}
+        for name, entrada in self.manifest.items():
+            offset = inicio_dados + entrada['offset']
+            fim = offset + entrada['nbytes']
+            if fim > len(self._mmap):
+                raise BundleError(f"Bundle truncado: {name} termina em {fim}, arquivo com {len(self._mmap)} bytes")
+            dtype = np.dtype(entrada['dtype'])
+            array = np.frombuffer(self._mmap, dtype=dtype, count=entrada['nbytes'] // dtype.itemsize,
+                                  offset=offset).reshape(tuple(entrada['shape']))
+            if verify and _checksum(paginas[offset:fim]) != entrada['checksum']:
+                raise BundleError(f"Checksum divergente no array {name} de {path}")
+            self.arrays[name] = array
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    def section(self, prefix):
+        """Arrays cujo nome começa com prefix, sem o prefixo"""
+        return {name[len(prefix):]: array for name, array in self.arrays.items() if name.startswith(prefix)}
+
+    def nbytes(self):
+        return len(self._mmap)
+
+
+def build_serving_bundle(objects_dir=Config.OBJECTS_DIR, model_backend=Config.BUNDLE_MODEL_BACKEND,
+                         path=None, version=None):
+    """Consolida pré-processamento, seletor e pesos do modelo de objects_dir em um bundle"""
+    from inference import BACKENDS
+    from preprocessing import preprocessing_arrays, load_selected_features
+
+    if model_backend not in BUNDLE_MODEL_BACKENDS:
+        raise ValueError(f"Backend sem formato de arrays para o bundle: {model_backend} "
+                         f"(opções: {list(BUNDLE_MODEL_BACKENDS)})")
+    arrays = {PREPROCESSING_SECTION + name: array
+              for name, array in preprocessing_arrays(objects_dir).items()}
+    arrays[SELECTOR_SECTION + 'indices'] = load_selected_features(
+        os.path.join(objects_dir, os.path.basename(Config.SELECTOR_INDICES_PATH)),
+        os.path.join(objects_dir, os.path.basename(Config.SELECTOR_PATH)))
+    if model_backend == 'forest':
+        import joblib
+        from forest import export_forest
+        floresta = joblib.load(os.path.join(objects_dir, os.path.basename(Config.FOREST_MODEL_PATH)))
+        arrays.update({MODEL_SECTION + name: array for name, array in export_forest(floresta).items()})
+    else:
+        modelo = os.path.join(objects_dir, os.path.basename(getattr(Config, BACKENDS[model_backend][1])))
+        with np.load(modelo, allow_pickle=False) as pesos:
+            for name in pesos.keys():
+                arrays[MODEL_SECTION + name] = pesos[name]
+
+    path = path or os.path.join(objects_dir, os.path.basename(Config.SERVING_BUNDLE_PATH))
+    return write_bundle(path, arrays, {'model_backend': model_backend}, version)
+
+
+def load_bundle_model(bundle):
+    """Backend de inferência sobre os pesos mapeados do bundle"""
+    from inference import NumpyBackend
+    pesos = bundle.section(MODEL_SECTION)
+    if bundle.metadata['model_backend'] == 'forest':
+        from forest import FlatForest
+        return FlatForest.from_arrays(pesos)
+    return NumpyBackend.from_arrays(pesos)
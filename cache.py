@@ -0,0 +1,177 @@
+"""
+Cache de resultados de predição por linha
+
+A chave é um hash da linha de entrada do modelo já normalizada (numéricos em
+float32, categorias codificadas, só as features selecionadas) junto com a
+versão dos artefatos que responde: perfis reenviados com o mesmo conteúdo
+reaproveitam o resultado, e cada versão tem as suas chaves. A versão é a da
+requisição (a que ela adquiriu), não um estado global do cache: uma requisição
+que termina na versão antiga depois de uma troca não grava sob a nova. Opcionalmente os
+resultados são compartilhados entre workers via Redis.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def artifact_version(paths):
+    """Digest do conteúdo dos artefatos (modelo, seletor, scalers, encoders)"""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in sorted(paths):
+        if not os.path.exists(path):
+            continue
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            for bloco in iter(lambda: f.read(1 << 20), b''):
+                digest.update(bloco)
+    return digest.hexdigest()
+
+
+class RedisCacheBackend:
+    """Camada compartilhada entre workers (redis é opcional, importado sob demanda)"""
+
+    name = 'redis'
+
+    def __init__(self, url, ttl_seconds, prefix='predcache:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def get_many(self, keys):
+        valores = self.client.mget([self.prefix + key for key in keys])
+        return [None if v is None else float(v) for v in valores]
+
+    def set_many(self, items):
+        pipe = self.client.pipeline(transaction=False)
+        for key, valor in items:
+            pipe.setex(self.prefix + key, self.ttl_seconds, repr(valor))
+        pipe.execute()
+
+
+class PredictionCache:
+    """LRU em memória com TTL na frente do predict_fn
+
+    predict(X, predict_fn) só executa o modelo para as linhas sem resultado
+    em cache. Thread-safe; contadores de acertos e falhas em stats().
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=3600, version='', shared=None,
+                 clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = version
+        self.shared = shared
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared_hits = 0
+
+    def keys(self, X, version=None):
+        """Chave de cada linha: blake2b(versão + bytes da linha float32)
+
+        version é a dos artefatos que calculam o resultado (padrão: a do construtor).
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32) + np.float32(0)  # -0.0 -> 0.0
+        prefixo = (self.version if version is None else version).encode()
+        return [hashlib.blake2b(prefixo + linha.tobytes(), digest_size=16).hexdigest() for linha in X]
+
+    def invalidate(self):
+        """Descarta as entradas locais (as chaves já separam as versões, inclusive no Redis)"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_many(self, keys):
+        agora = self.clock()
+        valores = []
+        with self._lock:
+            for key in keys:
+                entrada = self._entries.get(key)
+                if entrada is not None and entrada[0] > agora:
+                    self._entries.move_to_end(key)
+                    valores.append(entrada[1])
+                else:
+                    if entrada is not None:
+                        del self._entries[key]
+                    valores.append(None)
+        return valores
+
+    def set_many(self, items):
+        expira = self.clock() + self.ttl_seconds
+        with self._lock:
+            for key, valor in items:
+                self._entries[key] = (expira, valor)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _get_shared(self, keys):
+        try:
+            return self.shared.get_many(keys)
+        except Exception as e:
+            logger.warning(f"Cache compartilhado indisponível: {e}")
+            return [None] * len(keys)
+
+    def _set_shared(self, items):
+        try:
+            self.shared.set_many(items)
+        except Exception as e:
+            logger.warning(f"Cache compartilhado indisponível: {e}")
+
+    def predict(self, X, predict_fn, version=None):
+        """Probabilidades (n_linhas x 1) buscando no cache e executando só as faltantes
+
+        version identifica os artefatos de predict_fn (ver keys).
+        """
+        keys = self.keys(X, version)
+        valores = self.get_many(keys)
+        faltando = [i for i, v in enumerate(valores) if v is None]
+
+        if faltando and self.shared is not None:
+            compartilhados = self._get_shared([keys[i] for i in faltando])
+            encontrados = [(i, v) for i, v in zip(faltando, compartilhados) if v is not None]
+            for i, v in encontrados:
+                valores[i] = v
+            self.set_many((keys[i], v) for i, v in encontrados)
+            self.shared_hits += len(encontrados)
+            faltando = [i for i in faltando if valores[i] is None]
+
+        if faltando:
+            saida = predict_fn(X[faltando])
+            novos = [(keys[i], float(p)) for i, p in zip(faltando, saida[:, 0])]
+            for i, (_, v) in zip(faltando, novos):
+                valores[i] = v
+            self.set_many(novos)
+            if self.shared is not None:
+                self._set_shared(novos)
+
+        with self._lock:
+            self.hits += len(keys) - len(faltando)
+            self.misses += len(faltando)
+        return np.array(valores, dtype=np.float32)[:, None]
+
+    def stats(self):
+        """Contadores para o /health"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'backend': 'memory' if self.shared is None else f'memory+{self.shared.name}',
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'shared_hits': self.shared_hits,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            }
@@ -1,5 +1,4 @@
 import os
-import yaml
 from dotenv import load_dotenv
 import logging
 
@@ -24,6 +23,26 @@ class Config:
     API_DEBUG = os.getenv('API_DEBUG', 'true').lower() == 'true'
     API_URL = f"http://{API_HOST}:{API_PORT}/predict"
     
+    # Servidor de produção (serve.py / gunicorn.conf.py): workers criados por
+    # fork a partir do master com o app pré-carregado
+    SERVER_APP = os.getenv('SERVER_APP', 'api_improved:app')
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', str(os.cpu_count() or 1)))
+    SERVER_THREADS = int(os.getenv('SERVER_THREADS', '4'))
+    SERVER_TIMEOUT = int(os.getenv('SERVER_TIMEOUT', '30'))
+    SERVER_GRACEFUL_TIMEOUT = int(os.getenv('SERVER_GRACEFUL_TIMEOUT', '30'))
+    SERVER_KEEPALIVE = int(os.getenv('SERVER_KEEPALIVE', '5'))
+    SERVER_MAX_REQUESTS = int(os.getenv('SERVER_MAX_REQUESTS', '0'))
+    SERVER_PRELOAD = os.getenv('SERVER_PRELOAD', 'auto').lower()
+    SERVER_WORKER_CLASS = os.getenv('SERVER_WORKER_CLASS', 'gthread')
+    TF_INTRA_OP_THREADS = int(os.getenv('TF_INTRA_OP_THREADS', '1'))
+    TF_INTER_OP_THREADS = int(os.getenv('TF_INTER_OP_THREADS', '1'))
+    
+    # Variante ASGI (api_asgi): threads do pool de inferência e máximo de
+    # requisições no pool; acima disso, 503 com Retry-After (segundos)
+    ASGI_EXECUTOR_WORKERS = int(os.getenv('ASGI_EXECUTOR_WORKERS', str(os.cpu_count() or 1)))
+    ASGI_MAX_PENDING = int(os.getenv('ASGI_MAX_PENDING', '256'))
+    ASGI_RETRY_AFTER_SECONDS = int(os.getenv('ASGI_RETRY_AFTER_SECONDS', '1'))
+    
     # Configurações do Streamlit
     STREAMLIT_PORT = int(os.getenv('STREAMLIT_PORT', '8501'))
     
@@ -33,15 +52,85 @@ class Config:
     MODEL_BATCH_SIZE = int(os.getenv('MODEL_BATCH_SIZE', '10'))
     MODEL_LEARNING_RATE = float(os.getenv('MODEL_LEARNING_RATE', '0.001'))
     
+    # Código usado para categorias não vistas no treino (em vez de erro)
+    UNKNOWN_CATEGORY_CODE = int(os.getenv('UNKNOWN_CATEGORY_CODE', '0'))
+    
+    # Backend de inferência: 'keras' (TensorFlow), 'numpy' (bundle .npz, sem TensorFlow)
+    # 'numpy-folded' (bundle .npz com os scalers absorvidos na primeira camada),
+    # 'tflite' (interpreter TFLite + XNNPACK), 'tflite-int8' (mesmo interpreter,
+    # flatbuffer com pesos int8 por canal e ativações int8 calibradas)
+    # ou 'bundle' (serving.bundle mapeado em memória, com pré-processamento e seletor)
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'keras')
+    TFLITE_NUM_THREADS = int(os.getenv('TFLITE_NUM_THREADS', '1'))
+    KERAS_JIT_COMPILE = os.getenv('KERAS_JIT_COMPILE', 'false').lower() == 'true'
+    
+    # Bundle único de serving (INFERENCE_BACKEND=bundle): pesos de qual
+    # backend de arrays entram no arquivo e se os checksums são conferidos na carga
+    BUNDLE_MODEL_BACKEND = os.getenv('BUNDLE_MODEL_BACKEND', 'numpy')
+    BUNDLE_VERIFY = os.getenv('BUNDLE_VERIFY', 'true').lower() == 'true'
+    
+    # RandomForest do api_mock: 'flat' (árvores em arrays no serving.bundle,
+    # percurso compilado pelo numba ou, sem ele, vetorizado em NumPy) ou
+    # 'sklearn' (meu_modelo.joblib); linhas por bloco do percurso em NumPy
+    FOREST_ENGINE = os.getenv('FOREST_ENGINE', 'flat')
+    FOREST_CHUNK_ROWS = int(os.getenv('FOREST_CHUNK_ROWS', '256'))
+    
+    # Aquecimento do modelo na carga (antes do /health ficar saudável)
+    WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'true').lower() == 'true'
+    WARMUP_BATCH_SIZES = [int(n) for n in os.getenv('WARMUP_BATCH_SIZES', '1,2,4,8,16,32,64').split(',')]
+    
+    # Tamanho dos lotes processados pelo /predict/batch (NDJSON em streaming)
+    BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', '1000'))
+    
+    # Micro-batching de requisições concorrentes (api_improved)
+    BATCHING_ENABLED = os.getenv('BATCHING_ENABLED', 'false').lower() == 'true'
+    BATCHING_MAX_SIZE = int(os.getenv('BATCHING_MAX_SIZE', '64'))
+    BATCHING_MAX_WAIT_US = int(os.getenv('BATCHING_MAX_WAIT_US', '2000'))
+    
+    # Cache de predições por linha (LRU + TTL); com CACHE_REDIS_URL os
+    # resultados também são compartilhados entre workers
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '10000'))
+    CACHE_TTL_SECONDS = int(os.getenv('CACHE_TTL_SECONDS', '3600'))
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', '')
+    
+    # Versões dos artefatos (objects/versions/<versão>/ + arquivo CURRENT):
+    # a API verifica o CURRENT a cada ARTIFACT_WATCH_SECONDS (0 desliga) e
+    # troca de versão sem reiniciar; ADMIN_TOKEN habilita o POST /admin/reload
+    ARTIFACT_WATCH_SECONDS = float(os.getenv('ARTIFACT_WATCH_SECONDS', '5'))
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    
     # Configurações de Log
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FORMAT = os.getenv('LOG_FORMAT', '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     
+    # Gravação assíncrona do predictions.log: fila limitada, lotes por tamanho
+    # ou tempo e política com a fila cheia ('drop' descarta e conta, 'block' espera)
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', '256'))
+    LOG_FLUSH_INTERVAL_MS = int(os.getenv('LOG_FLUSH_INTERVAL_MS', '1000'))
+    LOG_OVERFLOW_POLICY = os.getenv('LOG_OVERFLOW_POLICY', 'drop')
+    
+    # Segmentos Parquet do log de predições: o predictions.log é convertido
+    # em um segmento comprimido a cada intervalo de LOG_SEGMENT_MINUTES
+    LOG_SEGMENTS_ENABLED = os.getenv('LOG_SEGMENTS_ENABLED', 'true').lower() == 'true'
+    LOG_SEGMENT_MINUTES = int(os.getenv('LOG_SEGMENT_MINUTES', '60'))
+    
     # Caminhos
     OBJECTS_DIR = './objects'
     LOGS_DIR = './logs'
+    LOG_SEGMENTS_DIR = f'{LOGS_DIR}/predictions'
     MODEL_PATH = f'{OBJECTS_DIR}/meu_modelo.keras'
+    NUMPY_MODEL_PATH = f'{OBJECTS_DIR}/meu_modelo.npz'
+    FOLDED_MODEL_PATH = f'{OBJECTS_DIR}/meu_modelo_folded.npz'
+    TFLITE_MODEL_PATH = f'{OBJECTS_DIR}/meu_modelo.tflite'
+    TFLITE_INT8_MODEL_PATH = f'{OBJECTS_DIR}/meu_modelo_int8.tflite'
+    FOREST_MODEL_PATH = f'{OBJECTS_DIR}/meu_modelo.joblib'
+    CALIBRATION_SAMPLE_PATH = f'{OBJECTS_DIR}/calibration_sample.npy'
     SELECTOR_PATH = f'{OBJECTS_DIR}/selector.joblib'
+    SELECTOR_INDICES_PATH = f'{OBJECTS_DIR}/selector_indices.npy'
+    SERVING_BUNDLE_PATH = f'{OBJECTS_DIR}/serving.bundle'
+    ARTIFACT_VERSIONS_DIR = f'{OBJECTS_DIR}/versions'
 
 def setup_logging():
     """Configura o sistema de logging"""
@@ -61,6 +150,7 @@ def setup_logging():
 # Compatibilidade com config.yaml existente (fallback)
 def load_legacy_config():
     """Carrega configuração do arquivo YAML (para compatibilidade)"""
+    import yaml
     try:
         with open('config.yaml', 'r') as file:
             return yaml.safe_load(file)
@@ -6,6 +6,7 @@ import json
 import os
 from datetime import datetime, timedelta
 from config import Config
+from log_segments import read_predictions, read_entries, log_summary
 import logging
 
 st.set_page_config(
@@ -14,21 +15,25 @@ st.set_page_config(
     layout="wide"
 )
 
-def load_predictions_data():
-    """Carrega dados de predições do log"""
+# Colunas do log usadas pelos gráficos (as features não são lidas)
+DASHBOARD_COLUMNS = ['timestamp', 'probability', 'processing_time_ms']
+
+def load_predictions_data(start=None, end=None):
+    """Carrega as predições do período: segmentos Parquet do manifest + log corrente"""
+    log_file = f'{Config.LOGS_DIR}/predictions.log'
     try:
-        predictions = []
-        log_file = f'{Config.LOGS_DIR}/predictions.log'
-        
-        if os.path.exists(log_file):
-            with open(log_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        predictions.append(json.loads(line.strip()))
-                    except json.JSONDecodeError:
-                        continue
-        
-        return pd.DataFrame(predictions)
+        return read_predictions(log_file, Config.LOG_SEGMENTS_DIR, start, end, DASHBOARD_COLUMNS)
+    except ImportError:
+        # Sem pyarrow: só o log em JSON Lines
+        df = pd.DataFrame(read_entries(log_file))
+        if df.empty:
+            return df
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        if start is not None:
+            df = df[df['timestamp'] >= start]
+        if end is not None:
+            df = df[df['timestamp'] < end]
+        return df
     except Exception as e:
         st.error(f"Erro ao carregar dados: {e}")
         return pd.DataFrame()
@@ -37,43 +42,43 @@ def main():
     st.title("📊 Dashboard de Análise de Crédito")
     st.sidebar.title("Navegação")
     
-    # Carrega dados
-    df = load_predictions_data()
+    # Período disponível (manifest dos segmentos + log corrente)
+    resumo = log_summary(f'{Config.LOGS_DIR}/predictions.log', Config.LOG_SEGMENTS_DIR)
     
-    if df.empty:
+    if resumo is None:
         st.warning("📊 Nenhum dado de predição encontrado. Execute algumas análises primeiro!")
         st.info("💡 Vá para a aplicação principal e faça algumas consultas de crédito.")
         return
     
-    # Converte timestamp
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df['date'] = df['timestamp'].dt.date
-    df['hour'] = df['timestamp'].dt.hour
-    
     # Sidebar com filtros
     st.sidebar.subheader("🔍 Filtros")
     
-    # Filtro de data
-    if len(df) > 0:
-        min_date = df['date'].min()
-        max_date = df['date'].max()
-        
-        date_range = st.sidebar.date_input(
-            "Período",
-            value=(min_date, max_date),
-            min_value=min_date,
-            max_value=max_date
-        )
-        
-        if len(date_range) == 2:
-            df_filtered = df[
-                (df['date'] >= date_range[0]) & 
-                (df['date'] <= date_range[1])
-            ]
-        else:
-            df_filtered = df
-    else:
-        df_filtered = df
+    # Filtro de data (aplicado na leitura dos segmentos)
+    min_date = resumo['start'].date()
+    max_date = resumo['end'].date()
+    
+    date_range = st.sidebar.date_input(
+        "Período",
+        value=(min_date, max_date),
+        min_value=min_date,
+        max_value=max_date
+    )
+    if len(date_range) != 2:
+        date_range = (min_date, max_date)
+    
+    df_filtered = load_predictions_data(
+        datetime.combine(date_range[0], datetime.min.time()),
+        datetime.combine(date_range[1] + timedelta(days=1), datetime.min.time())
+    )
+    
+    if df_filtered.empty:
+        st.warning("📊 Nenhuma predição no período selecionado.")
+        return
+    
+    # Converte timestamp
+    df_filtered['timestamp'] = pd.to_datetime(df_filtered['timestamp'])
+    df_filtered['date'] = df_filtered['timestamp'].dt.date
+    df_filtered['hour'] = df_filtered['timestamp'].dt.hour
     
     # Métricas principais
     st.header("📈 Métricas Gerais")
@@ -84,7 +89,7 @@ def main():
         st.metric(
             "Total de Predições",
             len(df_filtered),
-            delta=len(df_filtered) - len(df) + len(df_filtered) if len(df) > len(df_filtered) else None
+            delta=len(df_filtered) - resumo['rows'] + len(df_filtered) if resumo['rows'] > len(df_filtered) else None
         )
     
     with col2:
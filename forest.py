@@ -0,0 +1,252 @@
+"""
+RandomForest em arrays contíguos, mapeáveis e compartilhados entre workers
+
+O joblib.load(..., mmap_mode='r') não compartilha um RandomForestClassifier:
+cada sklearn Tree copia os nós para um buffer próprio ao ser carregada, e
+cada worker fica com a sua cópia privada do modelo. Aqui as árvores são
+exportadas para arrays planos (todos os nós de todas as árvores em sequência)
+gravados no serving.bundle; os workers mapeiam o mesmo arquivo e usam as
+mesmas páginas físicas.
+
+Arrays (índices de nó globais):
+    feature, threshold   teste do nó interno: X[:, feature] <= threshold vai para a esquerda
+    children             (nós x 2) com os filhos esquerdo e direito; uma folha aponta para si mesma
+    missing_left         1 se um NaN no nó vai para a esquerda (missing_go_to_left do sklearn)
+    value                probabilidades por classe na folha (já normalizadas)
+    roots, depths        nó raiz e profundidade máxima de cada árvore
+
+O threshold é o maior float32 <= limiar float64 do sklearn: como a entrada é
+convertida para float32 (igual ao sklearn), x <= threshold dá o mesmo
+resultado da comparação original e o percurso fica todo em float32.
+
+Com o numba instalado, predict_proba usa um percurso compilado (árvore por
+árvore sobre todas as linhas, direto nos arrays mapeados); sem ele, o
+percurso vetorizado em NumPy. Os dois dão as mesmas probabilidades.
+"""
+import numpy as np
+from config import Config
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+FOREST_BACKEND = 'forest'
+
+# A partir desta profundidade, os pares (linha, árvore) que já chegaram na
+# folha saem do percurso a cada COMPACT_EVERY níveis
+COMPACT_FROM = 8
+COMPACT_EVERY = 4
+
+
+def _predict_proba_kernel(X, feature, threshold, filhos, missing_left, value, roots, out):
+    """Soma em out as probabilidades da folha de cada linha, árvore por árvore
+
+    A soma segue a ordem das árvores, como o RandomForestClassifier. Os índices
+    são uint32 para o numba não gerar a checagem de índice negativo a cada nó.
+    """
+    n_features = X.shape[1]
+    valores = X.reshape(-1)
+    for arvore in range(roots.shape[0]):
+        raiz = roots[arvore]
+        for linha in range(X.shape[0]):
+            base = np.uint64(linha * n_features)
+            no = raiz
+            while filhos[2 * no] != no:
+                x = valores[base + feature[no]]
+                if x <= threshold[no] or (x != x and missing_left[no]):
+                    no = filhos[2 * no]
+                else:
+                    no = filhos[2 * no + 1]
+            for classe in range(value.shape[1]):
+                out[linha, classe] += value[no, classe]
+
+
+# nogil: threads do mesmo worker percorrem a floresta em paralelo; cache: a
+# compilação fica em __pycache__ e não se repete a cada processo
+compiled_kernel = njit(nogil=True, cache=True, error_model='numpy')(_predict_proba_kernel) if njit else None
+
+
+def float32_floor(threshold):
+    """Maior float32 menor ou igual a cada limiar float64"""
+    threshold = np.asarray(threshold, dtype=np.float64)
+    arredondado = threshold.astype(np.float32)
+    acima = arredondado.astype(np.float64) > threshold
+    arredondado[acima] = np.nextafter(arredondado[acima], np.float32(-np.inf))
+    return arredondado
+
+
+def export_forest(model):
+    """Arrays planos de um RandomForestClassifier ajustado (uma saída)"""
+    if getattr(model, 'n_outputs_', 1) != 1:
+        raise ValueError("Apenas florestas com uma saída são exportadas")
+
+    feature, threshold, children, missing_left, value, roots, depths = [], [], [], [], [], [], []
+    inicio = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        folha = tree.children_left == -1
+        indices = np.arange(inicio, inicio + n_nodes)
+
+        feature.append(np.where(folha, 0, tree.feature))
+        threshold.append(np.where(folha, 0.0, tree.threshold))
+        children.append(np.column_stack([np.where(folha, indices, tree.children_left + inicio),
+                                         np.where(folha, indices, tree.children_right + inicio)]))
+        missing_left.append(getattr(tree, 'missing_go_to_left', np.zeros(n_nodes, dtype=np.uint8)))
+
+        # Mesma normalização de DecisionTreeClassifier.predict_proba
+        proba = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+        normalizer = proba.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        value.append(proba / normalizer)
+
+        roots.append(inicio)
+        depths.append(tree.max_depth)
+        inicio += n_nodes
+
+    return {
+        'feature': np.concatenate(feature).astype(np.int32),
+        'threshold': float32_floor(np.concatenate(threshold)),
+        'children': np.concatenate(children).astype(np.int32),
+        'missing_left': np.concatenate(missing_left).astype(np.uint8),
+        'value': np.concatenate(value),
+        'roots': np.array(roots, dtype=np.int32),
+        'depths': np.array(depths, dtype=np.int32),
+        'classes': np.asarray(model.classes_),
+        'n_features': np.array(model.n_features_in_, dtype=np.int32),
+    }
+
+
+class FlatForest:
+    """Inferência da floresta sobre os arrays exportados (mapeados ou em memória)
+
+    predict_proba reproduz RandomForestClassifier.predict_proba bit a bit:
+    mesma comparação em float32 e soma das probabilidades das folhas na ordem
+    das árvores, dividida pelo número de árvores.
+
+    Com compiled (padrão: se o numba estiver instalado) predict_proba usa o
+    percurso compilado, que é compilado ou lido do cache já no construtor
+    (com preload, no master antes do fork). Sem ele, o percurso é vetorizado
+    sobre todos os pares (linha, árvore) de um bloco de chunk_rows linhas: a
+    cada nível cada par desce um nó, e os pares que já estão na folha são
+    descartados periodicamente. apply usa sempre o percurso em NumPy.
+    Nenhum array derivado do tamanho da floresta é criado (o kernel recebe
+    views uint32), para que os nós continuem apenas nas páginas mapeadas do
+    bundle.
+    """
+
+    name = FOREST_BACKEND
+    folded_scalers = False
+
+    def __init__(self, arrays, chunk_rows=None, compiled=None):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.children = arrays['children']
+        self.missing_left = arrays['missing_left']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.depths = arrays['depths']
+        self.classes_ = arrays['classes']
+        self.n_features = int(arrays['n_features'])
+        self.chunk_rows = chunk_rows or Config.FOREST_CHUNK_ROWS
+        # [esquerdo, direito] intercalados: o filho de no é _filhos[2 * no + vai_para_direita]
+        self._filhos = self.children.reshape(-1)
+        self._raizes = self.roots.astype(np.intp)
+        self._max_depth = int(self.depths.max(initial=0))
+
+        self.compiled = compiled_kernel is not None if compiled is None else compiled
+        if self.compiled:
+            if compiled_kernel is None:
+                raise ImportError("O percurso compilado da floresta requer o pacote numba")
+            self._kernel_arrays = (self.feature.view(np.uint32), self.threshold, self._filhos.view(np.uint32),
+                                   self.missing_left, self.value, self.roots.view(np.uint32))
+            self.predict_proba(np.zeros((1, self.n_features), dtype=np.float32))
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays)
+
+    @property
+    def left(self):
+        return self.children[:, 0]
+
+    @property
+    def right(self):
+        return self.children[:, 1]
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def _validate(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Esperadas {self.n_features} features, recebido shape {X.shape}")
+        return X
+
+    def _descend(self, X):
+        """Nó folha de cada linha de X em cada árvore (n_árvores x n_linhas)"""
+        valores = X.reshape(-1)
+        no = np.repeat(self._raizes, len(X))
+        base = np.tile(np.arange(len(X), dtype=np.intp) * self.n_features, self.n_estimators)
+        com_nan = bool(np.isnan(valores).any())
+        folhas = np.empty(len(no), dtype=np.intp)
+        pares = None
+
+        # take(mode='clip') evita a checagem de limites da indexação: os
+        # índices vêm dos próprios arrays da floresta e são sempre válidos
+        for nivel in range(1, self._max_depth + 1):
+            x = valores.take(self.feature.take(no, mode='clip') + base, mode='clip')
+            direita = x > self.threshold.take(no, mode='clip')
+            if com_nan:
+                direita |= np.isnan(x) & (self.missing_left.take(no, mode='clip') == 0)
+            no += no
+            no += direita
+            no = self._filhos.take(no, mode='clip')
+
+            if nivel >= COMPACT_FROM and nivel % COMPACT_EVERY == 0 and nivel < self._max_depth:
+                vivos = self._filhos.take(2 * no, mode='clip') != no
+                if pares is None:
+                    folhas[:] = no
+                    pares = np.flatnonzero(vivos)
+                else:
+                    folhas[pares] = no
+                    pares = pares[vivos]
+                no, base = no[vivos], base[vivos]
+
+        if pares is None:
+            folhas[:] = no
+        else:
+            folhas[pares] = no
+        return folhas.reshape(self.n_estimators, len(X))
+
+    def apply(self, X):
+        """Folha alcançada por cada linha em cada árvore (n_linhas x n_árvores, índice global)"""
+        X = self._validate(X)
+        folhas = np.empty((len(X), self.n_estimators), dtype=np.intp)
+        for inicio in range(0, len(X), self.chunk_rows):
+            folhas[inicio:inicio + self.chunk_rows] = self._descend(X[inicio:inicio + self.chunk_rows]).T
+        return folhas
+
+    def predict_proba(self, X):
+        X = self._validate(X)
+        if self.compiled:
+            proba = np.zeros((len(X), self.value.shape[1]))
+            compiled_kernel(X, *self._kernel_arrays, proba)
+            proba /= self.n_estimators
+            return proba
+
+        proba = np.empty((len(X), self.value.shape[1]))
+        for inicio in range(0, len(X), self.chunk_rows):
+            bloco = X[inicio:inicio + self.chunk_rows]
+            # Redução no eixo das árvores: soma sequencial na ordem das árvores, como o sklearn
+            folhas = self._descend(bloco)
+            np.add.reduce(self.value.take(folhas, axis=0, mode='clip'), axis=0,
+                          out=proba[inicio:inicio + len(bloco)])
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X):
+        """Probabilidade da classe de índice 1 (n_linhas x 1), como os demais backends"""
+        return self.predict_proba(X)[:, 1:2].astype(np.float32)
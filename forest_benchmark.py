@@ -0,0 +1,96 @@
+"""
+Benchmark da RandomForest do api_mock: sklearn x FlatForest (arrays planos)
+
+Mede a latência de uma linha (mediana de várias chamadas) e o tempo de um
+lote grande no sklearn e nos dois percursos da FlatForest (compilado pelo
+numba, se instalado, e em NumPy), e confere que as probabilidades são
+idênticas.
+
+Uso:
+    python forest_benchmark.py [--model objects/meu_modelo.joblib] [--rows 100000] [--repeat 200]
+
+Sem o modelo salvo (rode model_mock.py antes), --synthetic treina uma
+floresta de 100 árvores em dados aleatórios do mesmo porte.
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from config import Config
+from forest import FlatForest, compiled_kernel, export_forest
+
+
+def synthetic_forest(n_features=10, n_samples=800, seed=Config.MODEL_RANDOM_SEED):
+    from sklearn.ensemble import RandomForestClassifier
+    rng = np.random.RandomState(seed)
+    X = rng.normal(size=(n_samples, n_features)).astype(np.float32)
+    y = (X[:, 0] + rng.normal(size=n_samples) > 0).astype(int)
+    return RandomForestClassifier(n_estimators=100, random_state=seed).fit(X, y)
+
+
+def single_row_ms(predict_proba, X, repeat):
+    """Mediana em ms de predict_proba sobre uma linha"""
+    predict_proba(X[:1])
+    tempos = []
+    for i in range(repeat):
+        linha = X[i % len(X):i % len(X) + 1]
+        inicio = time.perf_counter()
+        predict_proba(linha)
+        tempos.append(time.perf_counter() - inicio)
+    return float(np.median(tempos)) * 1000
+
+
+def batch_seconds(predict_proba, X):
+    inicio = time.perf_counter()
+    proba = predict_proba(X)
+    return time.perf_counter() - inicio, proba
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sklearn x FlatForest')
+    parser.add_argument('--model', default=Config.FOREST_MODEL_PATH, help='RandomForestClassifier salvo com joblib')
+    parser.add_argument('--synthetic', action='store_true', help='Treina uma floresta sintética em vez de carregar')
+    parser.add_argument('--rows', type=int, default=100_000, help='Linhas do lote grande')
+    parser.add_argument('--repeat', type=int, default=200, help='Chamadas de uma linha')
+    parser.add_argument('--chunk-rows', type=int, default=Config.FOREST_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        modelo = synthetic_forest()
+    elif os.path.exists(args.model):
+        import joblib
+        modelo = joblib.load(args.model)
+    else:
+        print(f"❌ Modelo não encontrado em {args.model} (rode model_mock.py ou use --synthetic)")
+        sys.exit(1)
+
+    arrays = export_forest(modelo)
+    floresta = FlatForest(arrays, chunk_rows=args.chunk_rows, compiled=False)
+    motores = [('sklearn', modelo.predict_proba), ('flat-numpy', floresta.predict_proba)]
+    if compiled_kernel is not None:
+        motores.append(('flat-numba', FlatForest(arrays, compiled=True).predict_proba))
+    nos = len(floresta.feature)
+    print(f"🌲 {floresta.n_estimators} árvores, {nos} nós, profundidade máx. {floresta.depths.max()}, "
+          f"{floresta.n_features} features\n")
+
+    X = np.random.RandomState(0).normal(size=(args.rows, floresta.n_features)).astype(np.float32)
+    print(f"{'motor':<12} {'1 linha (ms)':>14} {f'{args.rows} linhas (s)':>18}")
+    resultados = {}
+    for nome, predict_proba in motores:
+        linha = single_row_ms(predict_proba, X, args.repeat)
+        lote, resultados[nome] = batch_seconds(predict_proba, X)
+        print(f"{nome:<12} {linha:>14.3f} {lote:>18.3f}")
+
+    divergentes = [nome for nome in resultados if not np.array_equal(resultados['sklearn'], resultados[nome])]
+    if not divergentes:
+        print("\n✅ predict_proba idêntico ao sklearn")
+    else:
+        for nome in divergentes:
+            print(f"\n❌ {nome}: predict_proba divergente "
+                  f"(máx. {np.abs(resultados['sklearn'] - resultados[nome]).max():.3e})")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
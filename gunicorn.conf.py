@@ -0,0 +1,74 @@
+"""
+Configuração do gunicorn para a API em produção (lida de Config / .env)
+
+O app é carregado uma vez no processo master (preload_app) e os workers são
+criados por fork, compartilhando modelo, scalers e seletor em copy-on-write.
+O runtime do TensorFlow não sobrevive a um fork depois de inicializado, então
+com os backends 'keras' e 'tflite'/'tflite-int8' o preload é desligado e cada worker carrega
+o próprio modelo (SERVER_PRELOAD=auto; 'true'/'false' forçam, ex.: api_mock,
+que não usa TensorFlow).
+
+Reinício sem perder requisições: SIGTERM encerra os workers depois das
+requisições em andamento (até SERVER_GRACEFUL_TIMEOUT); SIGHUP recria os
+workers da mesma forma. Artefatos novos não exigem reinício: publicados com
+`python artifacts.py publish`, cada worker carrega a versão em segundo plano
+(ARTIFACT_WATCH_SECONDS). Código novo exige SIGUSR2 (novo master) seguido de
+SIGTERM no master antigo.
+"""
+import gc
+import os
+from config import Config
+
+# Threads por worker do TensorFlow e do BLAS do NumPy (precisam estar no
+# ambiente antes de qualquer import pesado, no master e nos workers)
+os.environ.setdefault('TF_NUM_INTRAOP_THREADS', str(Config.TF_INTRA_OP_THREADS))
+os.environ.setdefault('TF_NUM_INTEROP_THREADS', str(Config.TF_INTER_OP_THREADS))
+os.environ.setdefault('OMP_NUM_THREADS', str(Config.TF_INTRA_OP_THREADS))
+os.environ.setdefault('OPENBLAS_NUM_THREADS', str(Config.TF_INTRA_OP_THREADS))
+
+# Backends cujo runtime não pode ser herdado por fork
+FORK_UNSAFE_BACKENDS = ('keras', 'tflite', 'tflite-int8')
+
+bind = f'{Config.API_HOST}:{Config.API_PORT}'
+workers = Config.SERVER_WORKERS
+threads = Config.SERVER_THREADS
+worker_class = Config.SERVER_WORKER_CLASS  # api_asgi: uvicorn.workers.UvicornWorker
+timeout = Config.SERVER_TIMEOUT
+graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT
+keepalive = Config.SERVER_KEEPALIVE
+max_requests = Config.SERVER_MAX_REQUESTS
+max_requests_jitter = Config.SERVER_MAX_REQUESTS // 10
+if Config.SERVER_PRELOAD == 'auto':
+    preload_app = Config.INFERENCE_BACKEND not in FORK_UNSAFE_BACKENDS
+else:
+    preload_app = Config.SERVER_PRELOAD == 'true'
+accesslog = '-'
+errorlog = '-'
+loglevel = Config.LOG_LEVEL.lower()
+
+
+def when_ready(server):
+    """Depois do preload e antes do fork: congela os objetos já carregados
+
+    gc.freeze() tira modelo e artefatos das gerações do coletor, que de outra
+    forma escreveria nos cabeçalhos desses objetos e copiaria as páginas
+    compartilhadas em cada worker.
+    """
+    if preload_app:
+        gc.collect()
+        gc.freeze()
+    server.log.info(f"Master pronto: {workers} workers x {threads} threads "
+                    f"(backend {Config.INFERENCE_BACKEND}, preload={'sim' if preload_app else 'não'})")
+
+
+def post_fork(server, worker):
+    """Aplica os limites de threads do TensorFlow no worker, se ele já foi importado"""
+    import sys
+    if 'tensorflow' in sys.modules:
+        tf = sys.modules['tensorflow']
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(Config.TF_INTRA_OP_THREADS)
+            tf.config.threading.set_inter_op_parallelism_threads(Config.TF_INTER_OP_THREADS)
+        except RuntimeError:
+            # Runtime já inicializado: valem as variáveis TF_NUM_*_THREADS
+            pass
@@ -0,0 +1,69 @@
+"""
+Perfil do tempo de importação dos módulos do serviço (cold start)
+
+Executa `python -X importtime -c "import <módulo>"` em um processo novo e
+soma o tempo próprio de cada pacote de primeiro nível, para que bibliotecas
+pesadas puxadas por engano (TensorFlow, sklearn, pandas...) fiquem visíveis.
+
+Uso:
+    python import_profile.py [api_improved] [--top 20] [--budget-ms 2000]
+
+Com --budget-ms, termina com código 1 se a importação passar do limite.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+# Pacotes que não deveriam aparecer no serving com os backends NumPy
+HEAVY_PACKAGES = ('tensorflow', 'keras', 'sklearn', 'scipy', 'pandas', 'fuzzywuzzy', 'psycopg2', 'torch')
+
+
+def profile_imports(module, env=None):
+    """Retorna ({pacote: tempo próprio em ms}, tempo total em ms) da importação de module"""
+    resultado = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {module}:\n{resultado.stderr[-2000:]}")
+
+    por_pacote = defaultdict(float)
+    total = 0.0
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, cumulativo, nome = linha[len('import time:'):].split('|')
+        nome = nome.strip()
+        por_pacote[nome.split('.')[0]] += int(proprio) / 1000
+        if nome == module:
+            total = int(cumulativo) / 1000
+    return dict(por_pacote), total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Perfil do tempo de importação de um módulo')
+    parser.add_argument('module', nargs='?', default='api_improved')
+    parser.add_argument('--top', type=int, default=20, help='Pacotes mostrados')
+    parser.add_argument('--budget-ms', type=float, default=None, help='Limite do tempo total de importação')
+    args = parser.parse_args()
+
+    por_pacote, total = profile_imports(args.module)
+    print(f"⏱️  import {args.module}: {total:.0f} ms\n")
+    print(f"{'pacote':<30} {'ms':>10}")
+    for pacote, ms in sorted(por_pacote.items(), key=lambda item: -item[1])[:args.top]:
+        alerta = '  ⚠️' if pacote in HEAVY_PACKAGES else ''
+        print(f"{pacote:<30} {ms:>10.1f}{alerta}")
+
+    pesados = [p for p in HEAVY_PACKAGES if p in por_pacote]
+    if pesados:
+        print(f"\n⚠️  Pacotes pesados importados: {', '.join(pesados)}")
+
+    if args.budget_ms is not None and total > args.budget_ms:
+        print(f"\n❌ Importação acima do limite: {total:.0f} ms > {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
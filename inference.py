@@ -0,0 +1,230 @@
+"""
+Backends de inferência para o serviço de predição
+
+Todos expõem predict(X) -> array (n_linhas x 1) de probabilidades float32,
+recebendo a matriz já pré-processada e com as features selecionadas.
+O TensorFlow só é importado quando o backend 'keras' é escolhido (ou no
+'tflite'/'tflite-int8', se nem o LiteRT nem o tflite_runtime estiverem
+instalados).
+"""
+import threading
+import time
+import numpy as np
+from config import Config
+
+
+def _relu(h):
+    return np.maximum(h, 0, out=h)
+
+
+def _sigmoid(h):
+    np.negative(h, out=h)
+    np.exp(h, out=h)
+    h += 1
+    return np.reciprocal(h, out=h)
+
+
+def _linear(h):
+    return h
+
+
+ACTIVATIONS = {'relu': _relu, 'sigmoid': _sigmoid, 'linear': _linear}
+
+
+class KerasBackend:
+    """Modelo Keras servido por uma tf.function com assinatura fixa
+
+    A assinatura tem dimensão de lote dinâmica (None x n_features, float32),
+    então lotes de tamanhos novos não geram retracing. Com jit_compile (XLA),
+    que compila um programa por formato, as linhas são completadas até a
+    próxima potência de 2 para limitar o número de compilações.
+    """
+
+    name = 'keras'
+    folded_scalers = False
+
+    def __init__(self, model_path=Config.MODEL_PATH, jit_compile=Config.KERAS_JIT_COMPILE):
+        import tensorflow as tf
+        from tensorflow.keras.models import load_model
+        self.model = load_model(model_path)
+        self.n_features = int(self.model.inputs[0].shape[-1])
+        self.jit_compile = jit_compile
+        self._serve = tf.function(
+            lambda X: self.model(X, training=False),
+            input_signature=[tf.TensorSpec([None, self.n_features], tf.float32)],
+            jit_compile=jit_compile,
+        )
+
+    def predict(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_linhas = len(X)
+        if self.jit_compile:
+            tamanho = 1 << max(n_linhas - 1, 0).bit_length()
+            if tamanho != n_linhas:
+                X = np.concatenate([X, np.zeros((tamanho - n_linhas, self.n_features), dtype=np.float32)])
+        return self._serve(X).numpy()[:n_linhas]
+
+
+class NumpyBackend:
+    """Forward pass da rede densa em NumPy puro, a partir do bundle .npz exportado
+
+    O bundle guarda kernel_i, bias_i e a ativação de cada camada Dense; as
+    camadas de Dropout são removidas na exportação (são identidade na inferência).
+    """
+
+    name = 'numpy'
+
+    def __init__(self, layers, metadata=None):
+        self.layers = [
+            (np.ascontiguousarray(kernel, dtype=np.float32),
+             np.ascontiguousarray(bias, dtype=np.float32),
+             activation)
+            for kernel, bias, activation in layers
+        ]
+        self.metadata = metadata or {}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Constrói a partir de activations, kernel_i, bias_i e meta_* (arrays mapeados não são copiados)"""
+        activations = [str(a) for a in arrays['activations']]
+        layers = [
+            (arrays[f'kernel_{i}'], arrays[f'bias_{i}'], activations[i])
+            for i in range(len(activations))
+        ]
+        metadata = {
+            key[len('meta_'):]: arrays[key]
+            for key in arrays.keys() if key.startswith('meta_')
+        }
+        return cls(layers, metadata)
+
+    @classmethod
+    def from_bundle(cls, path=Config.NUMPY_MODEL_PATH):
+        """Carrega o bundle .npz gerado por model_export.export_dense_bundle"""
+        with np.load(path, allow_pickle=False) as bundle:
+            return cls.from_arrays(bundle)
+
+    @property
+    def n_features(self):
+        return self.layers[0][0].shape[0]
+
+    @property
+    def folded_scalers(self):
+        """True se os StandardScaler foram absorvidos na primeira camada (entrada crua)"""
+        return bool(self.metadata.get('folded_scalers', False))
+
+    def predict(self, X):
+        h = np.asarray(X, dtype=np.float32)
+        for kernel, bias, activation in self.layers:
+            h = h @ kernel
+            h += bias
+            h = ACTIVATIONS[activation](h)
+        return h
+
+
+def _tflite_interpreter_class():
+    """Interpreter do LiteRT/tflite_runtime, com fallback para o TensorFlow completo"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteBackend:
+    """Flatbuffer TFLite executado pelo interpreter (delegate XNNPACK na CPU)
+
+    O tensor de entrada é alocado uma vez para o tamanho de lote corrente e
+    só é redimensionado quando chega um lote de outro tamanho. O interpreter
+    não é thread-safe, então as chamadas são serializadas por um lock.
+    """
+
+    name = 'tflite'
+    folded_scalers = False
+
+    def __init__(self, model_path=Config.TFLITE_MODEL_PATH, num_threads=Config.TFLITE_NUM_THREADS):
+        Interpreter = _tflite_interpreter_class()
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.n_features = int(self.interpreter.get_input_details()[0]['shape'][-1])
+        self._lock = threading.Lock()
+        self._batch_size = None
+        self._resize(1)
+
+    def _resize(self, batch_size):
+        self.interpreter.resize_tensor_input(self.input_index, [batch_size, self.n_features])
+        self.interpreter.allocate_tensors()
+        self._batch_size = batch_size
+
+    def predict(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        with self._lock:
+            if len(X) != self._batch_size:
+                self._resize(len(X))
+            self.interpreter.set_tensor(self.input_index, X)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output_index).copy()
+
+
+class TFLiteInt8Backend(TFLiteBackend):
+    """Flatbuffer TFLite quantizado em int8 (export_tflite com amostra de calibração)
+
+    Pesos int8 por canal e ativações int8 calibradas no treino; as camadas
+    densas rodam em aritmética inteira e só a entrada e a saída são float32.
+    """
+
+    name = 'tflite-int8'
+
+    def __init__(self, model_path=Config.TFLITE_INT8_MODEL_PATH, num_threads=Config.TFLITE_NUM_THREADS):
+        super().__init__(model_path, num_threads)
+
+
+def _bundle_backend(path):
+    """Modelo do serving.bundle (pesos mapeados em memória, sem cópia)"""
+    from bundle import Bundle, load_bundle_model
+    return load_bundle_model(Bundle(path, verify=Config.BUNDLE_VERIFY))
+
+
+# Nome do backend -> (construtor a partir do artefato, atributo de Config com o caminho padrão)
+BACKENDS = {
+    'keras': (KerasBackend, 'MODEL_PATH'),
+    'numpy': (NumpyBackend.from_bundle, 'NUMPY_MODEL_PATH'),
+    'numpy-folded': (NumpyBackend.from_bundle, 'FOLDED_MODEL_PATH'),
+    'tflite': (TFLiteBackend, 'TFLITE_MODEL_PATH'),
+    'tflite-int8': (TFLiteInt8Backend, 'TFLITE_INT8_MODEL_PATH'),
+    'bundle': (_bundle_backend, 'SERVING_BUNDLE_PATH'),
+}
+
+
+def backend_artifact(name=None):
+    """Caminho padrão do artefato usado pelo backend"""
+    name = name or Config.INFERENCE_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de inferência desconhecido: {name} (opções: {sorted(BACKENDS)})")
+    return getattr(Config, BACKENDS[name][1])
+
+
+def load_backend(name=None, path=None):
+    """Instancia o backend configurado em Config.INFERENCE_BACKEND"""
+    name = name or Config.INFERENCE_BACKEND
+    path = path or backend_artifact(name)
+    factory, _ = BACKENDS[name]
+    return factory(path)
+
+
+def warmup(backend, batch_sizes=Config.WARMUP_BATCH_SIZES):
+    """Executa o backend uma vez por tamanho de lote (tracing, compilação, alocação)
+
+    Retorna o tempo em ms de cada tamanho, para o log de inicialização.
+    """
+    tempos = {}
+    for tamanho in batch_sizes:
+        X = np.zeros((tamanho, backend.n_features), dtype=np.float32)
+        inicio = time.perf_counter()
+        backend.predict(X)
+        tempos[tamanho] = round((time.perf_counter() - inicio) * 1000, 2)
+    return tempos
@@ -0,0 +1,296 @@
+"""
+Segmentos colunares (Parquet) do log de predições
+
+O predictions.log (JSON Lines) guarda apenas o intervalo de tempo corrente.
+Quando o intervalo vira, o arquivo é convertido em um segmento Parquet
+comprimido no diretório de segmentos e o manifest.json (intervalo de tempo e
+número de linhas de cada segmento) é reconstruído. O dashboard lê do
+manifest só os segmentos do período pedido, só as colunas que usa e filtra
+por timestamp na leitura. pyarrow é opcional: sem ele o log continua
+apenas em JSON Lines.
+"""
+import glob
+import importlib.util
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from config import Config
+from preprocessing import FEATURE_COLUMNS, NUMERIC_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+SEGMENT_TIME_FORMAT = '%Y%m%dT%H%M%S'
+ENTRY_COLUMNS = ['timestamp', 'request_id', 'model_version', 'row', 'prediction', 'probability', 'processing_time_ms']
+
+
+def bucket_start(timestamp, bucket_seconds):
+    """Início do intervalo de tempo que contém timestamp"""
+    epoch = timestamp.timestamp()
+    return datetime.fromtimestamp(epoch - epoch % bucket_seconds)
+
+
+def segment_schema():
+    import pyarrow as pa
+    fields = [
+        ('timestamp', pa.timestamp('us')),
+        ('request_id', pa.string()),
+        ('model_version', pa.string()),
+        ('row', pa.int32()),
+        ('prediction', pa.string()),
+        ('probability', pa.float64()),
+        ('processing_time_ms', pa.float64()),
+    ]
+    fields += [(col, pa.float64() if col in NUMERIC_COLUMNS else pa.string()) for col in FEATURE_COLUMNS]
+    return pa.schema(fields)
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def entries_to_table(entries):
+    """Entradas do predictions.log -> tabela Arrow (uma coluna por feature)"""
+    import pyarrow as pa
+    schema = segment_schema()
+    colunas = {name: [] for name in schema.names}
+    for entry in entries:
+        colunas['timestamp'].append(datetime.fromisoformat(entry['timestamp']))
+        for col in ENTRY_COLUMNS[1:]:
+            colunas[col].append(entry.get(col))
+        features = entry.get('features') or [None] * len(FEATURE_COLUMNS)
+        for col, valor in zip(FEATURE_COLUMNS, features):
+            if col in NUMERIC_COLUMNS:
+                colunas[col].append(_as_float(valor))
+            else:
+                colunas[col].append(None if valor is None else str(valor))
+    return pa.table(colunas, schema=schema)
+
+
+def read_entries(path):
+    """Lê as entradas de um arquivo JSON Lines (linhas inválidas são puladas; [] se não existir)"""
+    entries = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(entry, dict) and 'timestamp' in entry:
+                    entries.append(entry)
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _process_alive(pid):
+    """True se o processo pid existe (no Windows não há workers em outros processos)"""
+    if os.name == 'nt':
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def write_manifest(segments_dir):
+    """Reconstrói o manifest a partir dos segmentos presentes no diretório
+
+    O intervalo de tempo vem do nome do arquivo, então vários processos
+    podem rolar segmentos sem perder entradas do manifest.
+    """
+    import pyarrow.parquet as pq
+    segmentos = []
+    for path in sorted(glob.glob(os.path.join(segments_dir, 'predictions_*.parquet'))):
+        _, inicio, fim, _ = os.path.basename(path).split('_', 3)
+        segmentos.append({
+            'file': os.path.basename(path),
+            'start': datetime.strptime(inicio, SEGMENT_TIME_FORMAT).isoformat(),
+            'end': datetime.strptime(fim, SEGMENT_TIME_FORMAT).isoformat(),
+            'rows': pq.read_metadata(path).num_rows,
+        })
+    tmp = os.path.join(segments_dir, f'.{MANIFEST_NAME}.{os.getpid()}.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'segments': segmentos}, f, indent=2)
+    os.replace(tmp, os.path.join(segments_dir, MANIFEST_NAME))
+    return segmentos
+
+
+def read_manifest(segments_dir=Config.LOG_SEGMENTS_DIR):
+    """Segmentos listados no manifest ([] se ainda não houver nenhum)"""
+    try:
+        with open(os.path.join(segments_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)['segments']
+    except FileNotFoundError:
+        return []
+
+
+class SegmentRoller:
+    """Converte o predictions.log em segmento Parquet quando o intervalo de tempo vira"""
+
+    def __init__(self, hot_path, segments_dir=Config.LOG_SEGMENTS_DIR,
+                 bucket_seconds=Config.LOG_SEGMENT_MINUTES * 60, compression='zstd'):
+        self.hot_path = hot_path
+        self.segments_dir = segments_dir
+        self.bucket_seconds = bucket_seconds
+        self.compression = compression
+        self._checked = None
+
+    @classmethod
+    def create(cls, hot_path, segments_dir=Config.LOG_SEGMENTS_DIR, **kwargs):
+        """Roller configurado, ou None se os segmentos estiverem desligados ou sem pyarrow"""
+        if not Config.LOG_SEGMENTS_ENABLED:
+            return None
+        # Só verifica a presença: o pyarrow é importado na primeira rolagem
+        if importlib.util.find_spec('pyarrow') is None:
+            logger.warning("pyarrow não instalado: log de predições mantido só em JSON Lines")
+            return None
+        return cls(hot_path, segments_dir, **kwargs)
+
+    def _hot_bucket(self):
+        """Intervalo da primeira entrada do arquivo corrente"""
+        try:
+            with open(self.hot_path, 'r', encoding='utf-8') as f:
+                primeira = f.readline()
+            return bucket_start(datetime.fromisoformat(json.loads(primeira)['timestamp']), self.bucket_seconds)
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def maybe_roll(self, now=None):
+        """Rola o arquivo corrente se ele pertence a um intervalo anterior"""
+        atual = bucket_start(now or datetime.now(), self.bucket_seconds)
+        if atual == self._checked:
+            return None
+        hot = self._hot_bucket()
+        self._checked = atual
+        if hot is not None and hot < atual:
+            return self.roll()
+        return None
+
+    def _claim(self, path):
+        """Renomeia path para um .rolling deste processo (None se outro processo já o tomou)"""
+        proprio = f'{self.hot_path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.rolling'
+        try:
+            os.replace(path, proprio)
+        except FileNotFoundError:
+            return None
+        return proprio
+
+    def _owner(self, path):
+        """pid do processo que tomou um arquivo .rolling (None se o nome não segue o formato)"""
+        try:
+            return int(os.path.basename(path)[len(os.path.basename(self.hot_path)) + 1:].split('.')[0])
+        except ValueError:
+            return None
+
+    def roll(self):
+        """Converte o predictions.log corrente (e sobras de rolagens interrompidas) em segmentos
+
+        Cada arquivo é tomado por um rename atômico para um nome com o pid
+        deste processo antes de ser lido, então com vários workers rolando
+        ao mesmo tempo cada entrada vai para um único segmento. Arquivos
+        .rolling de outro processo só são tomados se ele não existe mais.
+        """
+        arquivos = []
+        corrente = self._claim(self.hot_path)
+        if corrente is not None:
+            arquivos.append(corrente)
+        for path in sorted(glob.glob(f'{self.hot_path}.*.rolling')):
+            if path == corrente:
+                continue
+            dono = self._owner(path)
+            if dono == os.getpid():
+                arquivos.append(path)
+            elif dono is None or not _process_alive(dono):
+                sobra = self._claim(path)
+                if sobra is not None:
+                    arquivos.append(sobra)
+
+        os.makedirs(self.segments_dir, exist_ok=True)
+        escritos = []
+        for path in arquivos:
+            entries = read_entries(path)
+            if entries:
+                escritos.append(self._write_segment(entries))
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        if escritos:
+            write_manifest(self.segments_dir)
+        return escritos
+
+    def _write_segment(self, entries):
+        import pyarrow.parquet as pq
+        table = entries_to_table(entries)
+        timestamps = table.column('timestamp')
+        inicio = min(timestamps.to_pylist())
+        fim = max(timestamps.to_pylist())
+        nome = (f'predictions_{inicio:{SEGMENT_TIME_FORMAT}}_{fim:{SEGMENT_TIME_FORMAT}}'
+                f'_{uuid.uuid4().hex[:8]}.parquet')
+        path = os.path.join(self.segments_dir, nome)
+        pq.write_table(table.sort_by('timestamp'), path + '.tmp', compression=self.compression)
+        os.replace(path + '.tmp', path)
+        logger.info(f"Segmento do log de predições gravado: {nome} ({table.num_rows} linhas)")
+        return path
+
+
+def log_summary(hot_path, segments_dir=Config.LOG_SEGMENTS_DIR):
+    """Primeiro e último timestamp e total de linhas do log (manifest + arquivo corrente)"""
+    limites = []
+    linhas = 0
+    for segmento in read_manifest(segments_dir):
+        limites += [datetime.fromisoformat(segmento['start']), datetime.fromisoformat(segmento['end'])]
+        linhas += segmento['rows']
+    entries = read_entries(hot_path)
+    limites += [datetime.fromisoformat(e['timestamp']) for e in entries]
+    if not limites:
+        return None
+    return {'start': min(limites), 'end': max(limites), 'rows': linhas + len(entries)}
+
+
+def read_predictions(hot_path, segments_dir=Config.LOG_SEGMENTS_DIR, start=None, end=None, columns=None):
+    """DataFrame com as predições em [start, end), lendo só os segmentos e colunas necessários"""
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    paths = [
+        os.path.join(segments_dir, segmento['file'])
+        for segmento in read_manifest(segments_dir)
+        if (end is None or datetime.fromisoformat(segmento['start']) < end)
+        # o fim no nome do segmento é truncado para o segundo
+        and (start is None or datetime.fromisoformat(segmento['end']) + timedelta(seconds=1) > start)
+    ]
+
+    filtro = None
+    if start is not None:
+        filtro = ds.field('timestamp') >= pa.scalar(start, type=pa.timestamp('us'))
+    if end is not None:
+        ate = ds.field('timestamp') < pa.scalar(end, type=pa.timestamp('us'))
+        filtro = ate if filtro is None else filtro & ate
+
+    tabelas = []
+    if paths:
+        tabelas.append(ds.dataset(paths, format='parquet', schema=segment_schema())
+                       .to_table(columns=columns, filter=filtro))
+
+    entries = read_entries(hot_path)
+    if entries:
+        corrente = entries_to_table(entries)
+        if filtro is not None:
+            corrente = ds.dataset(corrente).to_table(filter=filtro)
+        tabelas.append(corrente.select(columns) if columns else corrente)
+
+    if not tabelas:
+        return pd.DataFrame(columns=columns or segment_schema().names)
+    return pa.concat_tables(tabelas).to_pandas()
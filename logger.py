@@ -1,10 +1,169 @@
+import atexit
 import logging
+import queue
+import threading
 import time
+import weakref
 import json
 import os
+import uuid
 from datetime import datetime
 from functools import wraps
+import numpy as np
 from config import Config
+from preprocessing import FEATURE_COLUMNS
+from log_segments import SegmentRoller
+
+# Ordem dos valores em 'features' no predictions.log (os nomes das colunas
+# não são repetidos em cada linha)
+PREDICTION_LOG_FEATURES = FEATURE_COLUMNS
+
+def new_request_id():
+    """Identificador de uma requisição de predição"""
+    return uuid.uuid4().hex
+
+def row_features(payload, row):
+    """Valores de uma linha do payload colunar na ordem de PREDICTION_LOG_FEATURES"""
+    valores = []
+    for col in PREDICTION_LOG_FEATURES:
+        valor = payload[col][row]
+        valores.append(valor.item() if isinstance(valor, np.generic) else valor)
+    return valores
+
+def prediction_log_entry(request_id, row, features, prediction, probability, processing_time,
+                         model_version=None):
+    """Entrada do predictions.log para uma linha (só os valores dessa linha)"""
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'request_id': request_id,
+        'model_version': model_version,
+        'row': row,
+        'features': features,
+        'prediction': prediction,
+        'probability': float(probability),
+        'processing_time_ms': processing_time * 1000,
+    }
+
+class AsyncLogWriter:
+    """Grava entradas JSON Lines em segundo plano, em lotes
+    
+    write() só enfileira (fila limitada); uma thread agrupa as entradas até
+    batch_size ou flush_interval segundos e faz uma única escrita por lote.
+    Com a fila cheia, overflow='drop' descarta a entrada (contada em
+    stats()['dropped']) e overflow='block' espera por espaço. As pendentes
+    são gravadas no close(), chamado também na saída do processo. Com um
+    roller (log_segments.SegmentRoller), o arquivo é convertido em segmento
+    Parquet antes da primeira escrita de um novo intervalo de tempo.
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, path, max_queue=10000, batch_size=256, flush_interval=1.0, overflow='drop',
+                 roller=None):
+        if overflow not in ('drop', 'block'):
+            raise ValueError(f"Política de overflow inválida: {overflow} (use 'drop' ou 'block')")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.roller = roller
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self._max_queue = max_queue
+        self._closed = False
+        self._start()
+        atexit.register(self.close)
+        if hasattr(os, 'register_at_fork'):
+            # Workers criados por fork (gunicorn com preload) não herdam a thread
+            ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: ref() is not None and ref()._start())
+    
+    def _start(self):
+        self._queue = queue.Queue(maxsize=self._max_queue)
+        self._worker = threading.Thread(target=self._run, name='async-log-writer', daemon=True)
+        self._worker.start()
+    
+    def write(self, entry):
+        """Enfileira uma entrada (dict serializável em JSON)"""
+        if self._closed:
+            return
+        if self.overflow == 'block':
+            self._queue.put(entry)
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+    
+    def flush(self):
+        """Bloqueia até todas as entradas enfileiradas serem gravadas"""
+        self._queue.join()
+    
+    def close(self, timeout=5.0):
+        """Grava as pendentes e encerra a thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._worker.join(timeout)
+    
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'overflow': self.overflow,
+        }
+    
+    def _collect(self):
+        """Bloqueia pela primeira entrada e agrupa as que chegarem na janela"""
+        lote = []
+        item = self._queue.get()
+        if item is self._STOP:
+            return lote, True
+        lote.append(item)
+        prazo = time.monotonic() + self.flush_interval
+        while len(lote) < self.batch_size:
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=restante)
+            except queue.Empty:
+                break
+            if item is self._STOP:
+                return lote, True
+            lote.append(item)
+        return lote, False
+    
+    def _write_batch(self, lote):
+        if self.roller is not None:
+            try:
+                self.roller.maybe_roll()
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Falha ao rolar o segmento de {self.path}: {e}")
+        try:
+            linhas = ''.join(json.dumps(entry, ensure_ascii=False, default=str) + '\n' for entry in lote)
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(linhas)
+            self.written += len(lote)
+        except Exception as e:
+            self.errors += len(lote)
+            logging.getLogger(__name__).error(f"Falha ao gravar {len(lote)} entradas em {self.path}: {e}")
+    
+    def _run(self):
+        while True:
+            lote, parar = self._collect()
+            if lote:
+                self._write_batch(lote)
+            # STOP também conta como item da fila
+            for _ in range(len(lote) + parar):
+                self._queue.task_done()
+            if parar:
+                break
 
 class ModelLogger:
     """Logger especializado para operações de ML"""
@@ -13,19 +172,31 @@ class ModelLogger:
         self.logger = logging.getLogger('model_logger')
         self.predictions_log = f'{Config.LOGS_DIR}/predictions.log'
         self.performance_log = f'{Config.LOGS_DIR}/performance.log'
+        self.prediction_writer = AsyncLogWriter(
+            self.predictions_log,
+            max_queue=Config.LOG_QUEUE_SIZE,
+            batch_size=Config.LOG_BATCH_SIZE,
+            flush_interval=Config.LOG_FLUSH_INTERVAL_MS / 1000,
+            overflow=Config.LOG_OVERFLOW_POLICY,
+            roller=SegmentRoller.create(self.predictions_log)
+        )
         
-    def log_prediction(self, input_data, prediction, probability, processing_time):
-        """Log de predições individuais"""
-        log_entry = {
-            'timestamp': datetime.now().isoformat(),
-            'input_data': input_data,
-            'prediction': prediction,
-            'probability': float(probability),
-            'processing_time_ms': processing_time * 1000,
-        }
-        
-        with open(self.predictions_log, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
+    def log_prediction(self, request_id, row, features, prediction, probability, processing_time,
+                       model_version=None):
+        """Log de uma linha predita (enfileirado; gravado em segundo plano)"""
+        self.prediction_writer.write(prediction_log_entry(
+            request_id, row, features, prediction, probability, processing_time, model_version))
+    
+    def log_predictions(self, request_id, payload, probabilities, processing_time, threshold=0.5,
+                        model_version=None):
+        """Log de todas as linhas de uma requisição, uma entrada por linha"""
+        for row, probability in enumerate(probabilities):
+            probability = float(probability)
+            self.log_prediction(
+                request_id, row, row_features(payload, row),
+                'Bom' if probability > threshold else 'Ruim',
+                probability, processing_time, model_version
+            )
             
     def log_model_performance(self, metrics):
         """Log de métricas do modelo"""
@@ -38,17 +209,16 @@ class ModelLogger:
             f.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
 
 def timing_decorator(func):
-    """Decorator para medir tempo de execução"""
+    """Decorator para medir tempo de execução (só loga; o retorno de func não muda)"""
     @wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        execution_time = time.time() - start_time
-        
-        logger = logging.getLogger(__name__)
-        logger.info(f"{func.__name__} executado em {execution_time:.4f}s")
-        
-        return result, execution_time
+        start_time = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            execution_time = time.perf_counter() - start_time
+            logger = logging.getLogger(__name__)
+            logger.info(f"{func.__name__} executado em {execution_time:.4f}s")
     return wrapper
 
 def error_handler(func):
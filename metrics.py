@@ -0,0 +1,180 @@
+"""
+Métricas em memória (histogramas de buckets fixos) para o serviço de predição
+
+Além dos histogramas, spans por estágio de cada /predict (StageTimer) e o
+registro agregado exposto em texto no /metrics (PredictionMetrics).
+"""
+import bisect
+import contextlib
+import threading
+import time
+
+
+class Histogram:
+    """Histograma thread-safe com buckets fixos (limites superiores inclusivos)"""
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # último bucket = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Registra uma observação"""
+        indice = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[indice] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q):
+        """Estimativa do quantil q pelo limite superior do bucket que o contém"""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return None
+        alvo = q * total
+        acumulado = 0
+        for limite, n in zip(self.buckets + [float('inf')], counts):
+            acumulado += n
+            if acumulado >= alvo:
+                return limite
+        return float('inf')
+
+    def snapshot(self):
+        """Resumo serializável em JSON"""
+        with self._lock:
+            counts, total, soma = list(self.counts), self.count, self.sum
+        return {
+            'count': total,
+            'sum': soma,
+            'mean': soma / total if total else None,
+            'buckets': {str(limite): n for limite, n in zip(self.buckets + ['+Inf'], counts)},
+        }
+
+
+class Counter:
+    """Contador thread-safe por rótulo (ex.: status HTTP)"""
+
+    def __init__(self):
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label, n=1):
+        with self._lock:
+            self.values[label] = self.values.get(label, 0) + n
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.values)
+
+
+class _Span:
+    """Context manager que soma o tempo do bloco no estágio do StageTimer"""
+
+    __slots__ = ('timer', 'stage', 'inicio')
+
+    def __init__(self, timer, stage):
+        self.timer = timer
+        self.stage = stage
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duracao = (time.perf_counter() - self.inicio) * 1000
+        self.timer.stages[self.stage] = self.timer.stages.get(self.stage, 0.0) + duracao
+        return False
+
+
+class StageTimer:
+    """Spans de uma requisição: tempo em ms de cada estágio, total desde a criação e linhas preditas"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.rows = 0
+
+    def span(self, stage):
+        return _Span(self, stage)
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+class _NullTimer:
+    """StageTimer que não mede nada (chamadas sem métricas)"""
+
+    def span(self, stage):
+        return contextlib.nullcontext()
+
+
+NULL_TIMER = _NullTimer()
+
+# Estágios do /predict, na ordem em que acontecem
+PREDICT_STAGES = ('decode', 'scale', 'encode', 'select', 'infer', 'serialize', 'log')
+STAGE_BUCKETS_MS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class PredictionMetrics:
+    """Histogramas de latência por estágio, total e contadores de requisições e linhas"""
+
+    def __init__(self, stages=PREDICT_STAGES, buckets=STAGE_BUCKETS_MS):
+        self.stages = {stage: Histogram(buckets) for stage in stages}
+        self.total = Histogram(buckets)
+        self.requests = Counter()
+        self.rows = Counter()
+
+    def timer(self):
+        return StageTimer()
+
+    def record(self, timer, status):
+        """Registra os spans, o tempo total e as linhas de uma requisição terminada com o status HTTP"""
+        for stage, duracao in timer.stages.items():
+            if stage in self.stages:
+                self.stages[stage].observe(duracao)
+        self.total.observe(timer.elapsed_ms())
+        self.requests.inc(str(status))
+        if timer.rows:
+            self.rows.inc('predicted', timer.rows)
+
+    def render(self, prefix='prediction'):
+        """Métricas em texto (formato de exposição do Prometheus, com p50/p95/p99)"""
+        linhas = [f'# HELP {prefix}_stage_ms Latência de cada estágio do /predict em ms',
+                  f'# TYPE {prefix}_stage_ms histogram']
+        for stage, hist in self.stages.items():
+            linhas += _render_histogram(f'{prefix}_stage_ms', hist, f'stage="{stage}"')
+        linhas += [f'# HELP {prefix}_request_ms Latência total do /predict em ms',
+                   f'# TYPE {prefix}_request_ms histogram']
+        linhas += _render_histogram(f'{prefix}_request_ms', self.total)
+
+        linhas += [f'# TYPE {prefix}_stage_ms_quantile gauge']
+        for stage, hist in list(self.stages.items()) + [('total', self.total)]:
+            for q in QUANTILES:
+                valor = hist.quantile(q)
+                if valor is not None:
+                    linhas.append(f'{prefix}_stage_ms_quantile{{stage="{stage}",quantile="{q}"}} {valor}')
+
+        linhas += [f'# TYPE {prefix}_requests_total counter']
+        for status, n in sorted(self.requests.snapshot().items()):
+            linhas.append(f'{prefix}_requests_total{{status="{status}"}} {n}')
+        linhas += [f'# TYPE {prefix}_rows_total counter',
+                   f'{prefix}_rows_total {self.rows.snapshot().get("predicted", 0)}']
+        return '\n'.join(linhas) + '\n'
+
+
+def _render_histogram(nome, hist, rotulos=''):
+    snapshot = hist.snapshot()
+    separador = ',' if rotulos else ''
+    linhas = []
+    acumulado = 0
+    for limite, n in snapshot['buckets'].items():
+        acumulado += n
+        linhas.append(f'{nome}_bucket{{{rotulos}{separador}le="{limite}"}} {acumulado}')
+    sufixo = f'{{{rotulos}}}' if rotulos else ''
+    linhas.append(f'{nome}_sum{sufixo} {snapshot["sum"]:.6f}')
+    linhas.append(f'{nome}_count{sufixo} {snapshot["count"]}')
+    return linhas
@@ -0,0 +1,208 @@
+"""
+Exportação do modelo Keras treinado para formatos de serving
+
+Uso:
+    python model_export.py numpy [--model ./objects/meu_modelo.keras] [--output ./objects/meu_modelo.npz]
+    python model_export.py folded [--model ...] [--output ./objects/meu_modelo_folded.npz]
+    python model_export.py mask [--output ./objects/selector_indices.npy]
+    python model_export.py preprocessing [--output ./objects/preprocessing.npz]
+    python model_export.py bundle [--bundle-backend numpy|numpy-folded] [--output ./objects/serving.bundle]
+    python model_export.py tflite [--model ...] [--output ./objects/meu_modelo.tflite]
+    python model_export.py tflite --quantize [--calibration ...] [--output ./objects/meu_modelo_int8.tflite]
+"""
+import argparse
+import numpy as np
+from config import Config
+from inference import NumpyBackend
+from preprocessing import NUMERIC_COLUMNS, CATEGORICAL_COLUMNS
+
+# Camadas sem efeito na inferência (removidas na exportação)
+INFERENCE_NOOP_LAYERS = ('Dropout',)
+
+
+def dense_layers(model):
+    """Extrai (kernel, bias, ativação) de cada camada Dense do Sequential"""
+    layers = []
+    for layer in model.layers:
+        tipo = type(layer).__name__
+        if tipo in INFERENCE_NOOP_LAYERS:
+            continue
+        if tipo != 'Dense':
+            raise ValueError(f"Camada não suportada na exportação: {layer.name} ({tipo})")
+        kernel, bias = layer.get_weights()
+        layers.append((kernel, bias, layer.get_config()['activation']))
+    return layers
+
+
+def save_dense_bundle(layers, path, **metadata):
+    """Salva as camadas densas (e metadados opcionais meta_*) em um .npz"""
+    arrays = {'activations': np.array([activation for _, _, activation in layers])}
+    for i, (kernel, bias, _) in enumerate(layers):
+        arrays[f'kernel_{i}'] = np.asarray(kernel, dtype=np.float32)
+        arrays[f'bias_{i}'] = np.asarray(bias, dtype=np.float32)
+    for key, value in metadata.items():
+        arrays[f'meta_{key}'] = np.asarray(value)
+    np.savez(path, **arrays)
+
+
+def export_dense_bundle(model, path=Config.NUMPY_MODEL_PATH):
+    """Exporta o modelo Keras para o bundle .npz lido por inference.NumpyBackend"""
+    layers = dense_layers(model)
+    save_dense_bundle(layers, path)
+    return layers
+
+
+def fold_standardization(layers, mean, scale):
+    """Absorve a padronização (x - mean) / scale nos pesos da primeira camada densa
+
+    Como Dense(x) = x @ W + b, substituir x por (x - mean) / scale dá
+    W' = W / scale (por linha) e b' = b - (mean / scale) @ W.
+    """
+    kernel, bias, activation = layers[0]
+    kernel = np.asarray(kernel, dtype=np.float64)
+    bias = np.asarray(bias, dtype=np.float64)
+    mean = np.asarray(mean, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+
+    folded_kernel = kernel / scale[:, None]
+    folded_bias = bias - (mean / scale) @ kernel
+    return [(folded_kernel, folded_bias, activation)] + list(layers[1:])
+
+
+def synthetic_payload(pipeline, n_samples=1000, seed=42):
+    """Amostra crua no formato do /predict gerada a partir dos próprios scalers e encoders
+
+    Numéricos vêm de mean + scale * N(0, 1) e categóricas são sorteadas entre
+    as classes do treino. Usada na checagem da dobra quando não há uma
+    amostra separada do treino.
+    """
+    rng = np.random.RandomState(seed)
+    payload = {}
+    for col, mean, scale in zip(NUMERIC_COLUMNS, pipeline.numeric_scaler.mean, pipeline.numeric_scaler.scale):
+        payload[col] = (mean + scale * rng.normal(size=n_samples)).tolist()
+    for col in CATEGORICAL_COLUMNS:
+        classes = pipeline.coders[col].classes
+        payload[col] = [classes[i] for i in rng.randint(len(classes), size=n_samples)]
+    return payload
+
+
+def check_fold_parity(pipeline, support, folded_layers, sample, reference, tolerance=1e-4):
+    """Compara o modelo dobrado com o caminho original de serving em uma amostra crua
+
+    Referência: PreprocessingPipeline completo (scalers e encoders) seguido do
+    modelo float (reference(X) -> probabilidades, ex.: o modelo Keras). O
+    dobrado recebe os mesmos valores sem padronização. sample é um payload
+    coluna -> valores crus, de preferência separado do treino; support
+    escolhe, entre as colunas do pipeline, as que chegam ao modelo. Levanta
+    ValueError acima da tolerância e retorna a maior diferença absoluta de
+    probabilidade.
+    """
+    colunas = slice(None) if support is None else support
+    X_padronizado, _ = pipeline.transform_columns(sample)
+    X_cru, _ = pipeline.transform_columns(sample, scale_numeric=False)
+    original = np.asarray(reference(X_padronizado[:, colunas]), dtype=np.float32).reshape(-1, 1)
+    folded = NumpyBackend(folded_layers).predict(X_cru[:, colunas])
+
+    diferenca = float(np.max(np.abs(original - folded)))
+    if diferenca > tolerance:
+        raise ValueError(f"Modelo dobrado diverge do original: {diferenca:.2e} > {tolerance:.0e}")
+    return diferenca
+
+
+def export_folded_bundle(layers, pipeline, support, path=Config.FOLDED_MODEL_PATH, tolerance=1e-4,
+                         sample=None, reference=None):
+    """Exporta o bundle com os StandardScaler absorvidos na primeira camada
+
+    support é a máscara do seletor de features: só as colunas que chegam
+    ao modelo entram na dobra. A checagem (check_fold_parity) usa sample
+    (padrão: synthetic_payload) e reference (padrão: o forward float das
+    camadas originais). Retorna a diferença máxima medida.
+    """
+    mean, scale = pipeline.input_standardization(support)
+    folded = fold_standardization(layers, mean, scale)
+    sample = synthetic_payload(pipeline) if sample is None else sample
+    reference = NumpyBackend(layers).predict if reference is None else reference
+    diferenca = check_fold_parity(pipeline, support, folded, sample, reference, tolerance)
+    save_dense_bundle(folded, path, folded_scalers=True)
+    return diferenca
+
+
+def export_tflite(model, path=Config.TFLITE_MODEL_PATH, calibration=None):
+    """Converte o modelo Keras em um flatbuffer TFLite
+
+    Com uma amostra de calibração, aplica a quantização int8 do conversor:
+    pesos por canal e ativações com faixas medidas na amostra (entrada e
+    saída continuam float32). O resultado é o artefato do backend tflite-int8.
+    """
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if calibration is not None:
+        amostra = np.asarray(calibration, dtype=np.float32)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([linha[None, :]] for linha in amostra)
+
+    flatbuffer = converter.convert()
+    with open(path, 'wb') as f:
+        f.write(flatbuffer)
+    return len(flatbuffer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exporta o modelo treinado para formatos de serving')
+    parser.add_argument('formato', choices=['numpy', 'folded', 'mask', 'preprocessing', 'bundle', 'tflite'])
+    parser.add_argument('--model', default=Config.MODEL_PATH, help='Modelo Keras de origem')
+    parser.add_argument('--output', default=None, help='Arquivo de saída')
+    parser.add_argument('--calibration', default=Config.CALIBRATION_SAMPLE_PATH,
+                        help='Amostra pré-processada do treino para calibrar a quantização do TFLite')
+    parser.add_argument('--quantize', action='store_true', help='Quantiza o flatbuffer TFLite em int8')
+    parser.add_argument('--bundle-backend', default=Config.BUNDLE_MODEL_BACKEND,
+                        help='Backend cujos pesos (já exportados) entram no serving.bundle')
+    args = parser.parse_args()
+
+    if args.formato == 'mask':
+        import joblib
+        from preprocessing import save_selected_features
+        output = args.output or Config.SELECTOR_INDICES_PATH
+        indices = save_selected_features(joblib.load(Config.SELECTOR_PATH), output)
+        print(f"✅ Índices do seletor salvos em {output}: {indices.tolist()}")
+        return
+
+    if args.formato == 'preprocessing':
+        from preprocessing import save_preprocessing_bundle
+        output = save_preprocessing_bundle(Config.OBJECTS_DIR, args.output)
+        print(f"✅ Scalers e encoders exportados para {output}")
+        return
+
+    if args.formato == 'bundle':
+        from bundle import build_serving_bundle, Bundle
+        output = build_serving_bundle(Config.OBJECTS_DIR, args.bundle_backend, args.output)
+        bundle = Bundle(output)
+        print(f"✅ Bundle de serving salvo em {output} (versão {bundle.version}, "
+              f"{len(bundle.arrays)} arrays, {bundle.nbytes() / 1024:.1f} KB)")
+        return
+
+    from tensorflow.keras.models import load_model
+    model = load_model(args.model)
+
+    if args.formato == 'numpy':
+        output = args.output or Config.NUMPY_MODEL_PATH
+        layers = export_dense_bundle(model, output)
+        print(f"✅ Bundle NumPy salvo em {output} ({len(layers)} camadas densas)")
+
+    elif args.formato == 'folded':
+        from preprocessing import PreprocessingPipeline, load_selected_features
+        pipeline = PreprocessingPipeline.from_objects(Config.OBJECTS_DIR, selected=load_selected_features())
+        output = args.output or Config.FOLDED_MODEL_PATH
+        diferenca = export_folded_bundle(dense_layers(model), pipeline, None, output,
+                                         reference=lambda X: model.predict(X, verbose=0))
+        print(f"✅ Bundle com scalers dobrados salvo em {output} (diferença máx. {diferenca:.2e})")
+
+    elif args.formato == 'tflite':
+        output = args.output or (Config.TFLITE_INT8_MODEL_PATH if args.quantize else Config.TFLITE_MODEL_PATH)
+        calibration = np.load(args.calibration) if args.quantize else None
+        tamanho = export_tflite(model, output, calibration)
+        print(f"✅ Flatbuffer TFLite salvo em {output} ({tamanho / 1024:.1f} KB)")
+
+
+if __name__ == '__main__':
+    main()
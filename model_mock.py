@@ -11,6 +11,8 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.feature_selection import RFE
+from preprocessing import save_selected_features, save_preprocessing_bundle
+from bundle import build_serving_bundle
 import random
 
 # Configuração
@@ -93,6 +95,9 @@ for col in categorical_cols:
     X_test[col] = encoder.transform(X_test[col])
     joblib.dump(encoder, f'./objects/labelencoder{col}.joblib')
 
+# Médias, escalas e classes em um único arquivo para o serving (sem sklearn)
+save_preprocessing_bundle('./objects')
+
 # Target encoding
 label_encoder_y = LabelEncoder()
 y_train_encoded = label_encoder_y.fit_transform(y_train)
@@ -105,6 +110,7 @@ selector = RFE(rf, n_features_to_select=10, step=1)
 X_train_selected = selector.fit_transform(X_train, y_train_encoded)
 X_test_selected = selector.transform(X_test)
 joblib.dump(selector, './objects/selector.joblib')
+save_selected_features(selector, './objects/selector_indices.npy')
 
 # Treinar modelo final
 print("🤖 Treinando modelo RandomForest...")
@@ -118,6 +124,9 @@ joblib.dump(model, './objects/meu_modelo.joblib')
 with open('./objects/meu_modelo.keras', 'w') as f:
     f.write('# Mock model file for testing')
 
+# Árvores em arrays contíguos no serving.bundle (mapeado e compartilhado pelos workers do api_mock)
+build_serving_bundle('./objects', 'forest')
+
 print("💾 Modelo salvo!")
 
 # Avaliação
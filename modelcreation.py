@@ -7,12 +7,17 @@ import joblib                       # Serialização de objetos Python (para sal
 
 from sklearn.preprocessing import StandardScaler, LabelEncoder  # Pré-processamento
 from sklearn.model_selection import train_test_split           # Divisão dos dados
-from sklearn.metrics import classification_report, confusion_matrix  # Avaliação do modelo
+from sklearn.metrics import classification_report, confusion_matrix, accuracy_score  # Avaliação do modelo
 from sklearn.ensemble import RandomForestClassifier             # Modelo Random Forest
 from sklearn.feature_selection import RFE                       # Seleção de características
 import tensorflow as tf                                       # Framework de Deep Learning
 
 from utils import *                 # Funções auxiliares personalizadas
+from model_export import export_dense_bundle, export_folded_bundle, export_tflite  # Exportação para os backends
+from preprocessing import (PreprocessingPipeline, save_selected_features, save_preprocessing_bundle,  # Artefatos de serving
+                           FEATURE_COLUMNS)
+from bundle import build_serving_bundle  # Bundle único mapeado em memória (INFERENCE_BACKEND=bundle)
+from inference import TFLiteInt8Backend  # Modelo quantizado, para o relatório de acurácia
 import const                       # Constantes (provavelmente a consulta SQL)
 
 # Reprodutibilidade (garantindo que os resultados sejam consistentes)
@@ -48,6 +53,7 @@ df['proporcaosolicitadototal'] = df['proporcaosolicitadototal'].astype(float)
 X = df.drop('classe', axis=1)  # Características (entradas)
 y = df['classe']              # Rótulos (saídas)
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=seed)
+X_test_bruto = X_test.copy()  # Teste antes do pré-processamento (checagem do modelo dobrado)
 
 # Normalização (escalonamento) das características numéricas
 X_test = save_scalers(X_test, ['tempoprofissao', 'renda', 'idade', 'dependentes', 'valorsolicitado', 'valortotalbem', 'proporcaosolicitadototal'])
@@ -61,6 +67,7 @@ y_test = np.array([mapeamento[item] for item in y_test])
 # Codificação das características categóricas
 X_train = save_encoders(X_train, ['profissao', 'tiporesidencia', 'escolaridade', 'score', 'estadocivil', 'produto'])
 X_test = save_encoders(X_test, ['profissao', 'tiporesidencia', 'escolaridade', 'score', 'estadocivil', 'produto'])
+save_preprocessing_bundle('./objects')  # Médias, escalas e classes para o serving (sem sklearn)
 
 # Seleção de Atributos (usando Recursive Feature Elimination)
 model = RandomForestClassifier()
@@ -69,6 +76,7 @@ selector = selector.fit(X_train, y_train)
 X_train = selector.transform(X_train)
 X_test = selector.transform(X_test)
 joblib.dump(selector, './objects/selector.joblib')  # Salva o seletor para uso posterior
+save_selected_features(selector, './objects/selector_indices.npy')  # Índices compactos usados pela API
 
 # Criação do modelo de rede neural (Keras)
 model = tf.keras.Sequential([
@@ -91,6 +99,16 @@ model.fit(X_train, y_train, validation_split=0.3, epochs=500, batch_size=10, ver
 # Salvando o modelo treinado
 model.save('meu_modelo.keras')
 
+# Exporta os pesos densos para inferência sem TensorFlow (INFERENCE_BACKEND=numpy)
+layers = export_dense_bundle(model, './objects/meu_modelo.npz')
+
+# Variante com os scalers absorvidos na primeira camada (INFERENCE_BACKEND=numpy-folded),
+# conferida contra pré-processamento + modelo Keras nos dados de teste crus
+export_folded_bundle(layers, PreprocessingPipeline.from_objects(), selector.get_support(),
+                     './objects/meu_modelo_folded.npz',
+                     sample={col: X_test_bruto[col].tolist() for col in FEATURE_COLUMNS},
+                     reference=lambda X: model.predict(X, verbose=0))
+
 # Previsões nos dados de teste
 y_pred = model.predict(X_test)
 y_pred = (y_pred > 0.5).astype(int)  # Convertendo probabilidades em classes (0 ou 1)
@@ -102,3 +120,27 @@ model.evaluate(X_test, y_test)
 # Métricas de classificação (precisão, recall, f1-score, etc.)
 print("\nRelatório de Classificação:")
 print(classification_report(y_test, y_pred))
+
+# Amostra do treino para calibrar a quantização do TFLite (model_export.py tflite --quantize)
+amostra = np.random.RandomState(seed).choice(len(X_train), size=min(500, len(X_train)), replace=False)
+calibracao = X_train[amostra].astype(np.float32)
+np.save('./objects/calibration_sample.npy', calibracao)
+
+# Bundle único de serving: scalers, classes, seletor e pesos densos em um arquivo mapeável
+build_serving_bundle('./objects', 'numpy')
+
+# Flatbuffer TFLite para o backend com interpreter + XNNPACK (INFERENCE_BACKEND=tflite)
+tamanho_float = export_tflite(model, './objects/meu_modelo.tflite')
+
+# Variante quantizada em int8, calibrada na amostra do treino (INFERENCE_BACKEND=tflite-int8)
+tamanho_int8 = export_tflite(model, './objects/meu_modelo_int8.tflite', calibration=calibracao)
+y_pred_int8 = (TFLiteInt8Backend('./objects/meu_modelo_int8.tflite').predict(X_test) > 0.5).astype(int)
+
+# Diferença de acurácia do modelo quantizado em relação ao float nos dados de teste
+acuracia_float = accuracy_score(y_test, y_pred)
+acuracia_int8 = accuracy_score(y_test, y_pred_int8)
+print(f"\nTFLite int8: {tamanho_int8 / 1024:.1f} KB (float: {tamanho_float / 1024:.1f} KB)")
+print(f"Acurácia float: {acuracia_float:.4f} | int8: {acuracia_int8:.4f} | "
+      f"diferença: {acuracia_int8 - acuracia_float:+.4f}")
+print("\nRelatório de Classificação (int8):")
+print(classification_report(y_test, y_pred_int8))
@@ -16,6 +16,7 @@ from tensorflow.keras.layers import Dropout
 from tensorflow.keras.callbacks import EarlyStopping
 
 from utils import *
+from preprocessing import save_selected_features, save_preprocessing_bundle
 
 seed = 41
 np.random.seed(seed)
@@ -56,6 +57,7 @@ y_test = np.array([mapeamento[item] for item in y_test])
 
 X_train = save_encoders(X_train, ['profissao', 'tiporesidencia', 'escolaridade','score','estadocivil','produto'])
 X_test = save_encoders(X_test, ['profissao', 'tiporesidencia', 'escolaridade','score','estadocivil','produto'])
+save_preprocessing_bundle('./objects')
 
 model = RandomForestClassifier()
 selector = RFE(model, n_features_to_select=10, step=1)
@@ -64,6 +66,7 @@ X_train = selector.transform(X_train)
 X_test = selector.transform(X_test)
 
 joblib.dump(selector, 'selector.joblib')
+save_selected_features(selector, 'selector_indices.npy')
 
 model = tf.keras.Sequential([
     tf.keras.layers.Dense(128, activation='relu', kernel_regularizer=l2(0.01), input_shape=(X_train.shape[1],)),
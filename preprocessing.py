@@ -0,0 +1,330 @@
+"""
+Pipeline de pré-processamento em memória para o serviço de predição
+
+Os scalers e encoders salvos em ./objects são carregados uma única vez na
+inicialização e reaplicados a cada requisição sem acesso ao disco. Com o
+preprocessing.npz (save_preprocessing_bundle) o serving não importa sklearn
+nem joblib.
+"""
+import os
+import numpy as np
+from config import Config
+from metrics import NULL_TIMER
+
+# Colunas numéricas (StandardScaler) e categóricas (LabelEncoder)
+NUMERIC_COLUMNS = ['tempoprofissao', 'renda', 'idade', 'dependentes',
+                   'valorsolicitado', 'valortotalbem', 'proporcaosolicitadototal']
+CATEGORICAL_COLUMNS = ['profissao', 'tiporesidencia', 'escolaridade', 'score',
+                       'estadocivil', 'produto']
+
+# Ordem das colunas usada no treino (e esperada pelo seletor de features)
+FEATURE_COLUMNS = [
+    'profissao', 'tempoprofissao', 'renda', 'tiporesidencia',
+    'escolaridade', 'score', 'idade', 'dependentes', 'estadocivil',
+    'produto', 'valorsolicitado', 'valortotalbem', 'proporcaosolicitadototal'
+]
+
+# Colunas obrigatórias no payload de /predict
+REQUIRED_COLUMNS = FEATURE_COLUMNS
+
+# Posição de cada coluna numérica/categórica na matriz de entrada do modelo
+NUMERIC_POSITIONS = [FEATURE_COLUMNS.index(col) for col in NUMERIC_COLUMNS]
+CATEGORICAL_POSITIONS = [FEATURE_COLUMNS.index(col) for col in CATEGORICAL_COLUMNS]
+
+# Artefato de serving com médias, escalas e classes (dispensa sklearn/joblib)
+PREPROCESSING_BUNDLE_NAME = 'preprocessing.npz'
+
+
+class PayloadError(ValueError):
+    """Payload de predição inválido (colunas ausentes, tamanhos ou tipos incorretos)"""
+
+
+def decode_columnar(payload, required_columns=REQUIRED_COLUMNS):
+    """Valida um payload coluna -> lista de valores e retorna o número de linhas
+
+    Colunas numéricas só aceitam valores finitos (nulo, NaN e infinito dão
+    PayloadError) e categóricas só valores escalares. Único validador do
+    /predict e, linha a linha, do /predict/batch.
+    """
+    if not isinstance(payload, dict):
+        raise PayloadError('Esperado um objeto JSON no formato {coluna: [valores]}')
+
+    missing_columns = [col for col in required_columns if col not in payload]
+    if missing_columns:
+        raise PayloadError(f'Colunas ausentes: {missing_columns}')
+
+    tamanhos = set()
+    for col in required_columns:
+        if not isinstance(payload[col], (list, tuple, np.ndarray)):
+            raise PayloadError(f"Coluna '{col}' deve ser uma lista de valores")
+        tamanhos.add(len(payload[col]))
+    if len(tamanhos) != 1:
+        raise PayloadError('Todas as colunas devem ter o mesmo número de valores')
+
+    n_linhas = tamanhos.pop()
+    if n_linhas == 0:
+        raise PayloadError('Payload sem linhas para predição')
+
+    # Nulo vira NaN no float32 do modelo (e NaN na resposta): rejeitado aqui,
+    # junto com infinitos e valores fora da faixa do float32
+    for col in NUMERIC_COLUMNS:
+        if col not in required_columns:
+            continue
+        try:
+            with np.errstate(over='ignore'):
+                valores = np.asarray(payload[col], dtype=np.float32)
+        except (TypeError, ValueError):
+            raise PayloadError(f"Coluna '{col}' contém valores não numéricos")
+        if valores.ndim != 1:
+            raise PayloadError(f"Coluna '{col}' contém valores não numéricos")
+        if not np.isfinite(valores).all():
+            raise PayloadError(f"Coluna '{col}' contém valores nulos ou não finitos")
+
+    # Valor não hashable (lista, objeto) não pode ser buscado na tabela do CategoricalCoder
+    for col in CATEGORICAL_COLUMNS:
+        if col not in required_columns:
+            continue
+        try:
+            set(payload[col])
+        except TypeError:
+            raise PayloadError(f"Coluna '{col}' contém valores que não são categorias")
+    return n_linhas
+
+
+class FusedStandardScaler:
+    """Padronização de todas as colunas numéricas em uma única operação vetorizada
+
+    Os mean_/scale_ dos StandardScaler de cada coluna são empilhados em dois
+    vetores float32, e o bloco numérico (n_linhas x n_colunas) é padronizado
+    por broadcasting, sem uma chamada de transform por coluna.
+    """
+
+    def __init__(self, mean, scale):
+        self.mean = np.ascontiguousarray(mean, dtype=np.float32)
+        self.scale = np.ascontiguousarray(scale, dtype=np.float32)
+
+    @classmethod
+    def from_scalers(cls, scalers, columns=NUMERIC_COLUMNS):
+        """Constrói a partir de um StandardScaler (de uma coluna) por coluna"""
+        mean = [scalers[col].mean_[0] for col in columns]
+        scale = [scalers[col].scale_[0] for col in columns]
+        return cls(mean, scale)
+
+    def transform(self, block):
+        """Padroniza in-place um bloco float32 contíguo e o retorna"""
+        np.subtract(block, self.mean, out=block)
+        np.divide(block, self.scale, out=block)
+        return block
+
+
+class CategoricalCoder:
+    """Codificação de uma coluna categórica por tabela hash pré-computada
+
+    Substitui LabelEncoder.transform (busca ordenada por valor, exceção em
+    categoria desconhecida): cada valor vira um dict.get, e valores não vistos
+    no treino recebem unknown_code e são sinalizados linha a linha.
+    """
+
+    def __init__(self, classes, unknown_code=0):
+        self.classes = list(classes)
+        self.lookup = {valor: codigo for codigo, valor in enumerate(self.classes)}
+        self.unknown_code = unknown_code
+
+    @classmethod
+    def from_encoder(cls, encoder, unknown_code=0):
+        """Constrói a partir de um LabelEncoder ajustado (mesmos códigos)"""
+        return cls(encoder.classes_.tolist(), unknown_code)
+
+    def transform(self, values):
+        """Retorna (códigos int32, máscara booleana de valores desconhecidos)"""
+        get = self.lookup.get
+        codes = np.fromiter((get(v, -1) for v in values), dtype=np.int32, count=len(values))
+        unknown = codes < 0
+        codes[unknown] = self.unknown_code
+        return codes, unknown
+
+
+class PreprocessingPipeline:
+    """Scalers e encoders mantidos em memória e aplicados sem I/O
+
+    selected são os índices (em FEATURE_COLUMNS) das colunas mantidas pelo
+    seletor de features: transform_columns calcula apenas essas colunas e já
+    as escreve na ordem de entrada do modelo, sem etapa separada de seleção.
+    """
+
+    def __init__(self, scalers, encoders, unknown_code=Config.UNKNOWN_CATEGORY_CODE, selected=None):
+        self.scalers = scalers
+        self.encoders = encoders
+        classes = {col: encoders[col].classes_.tolist() for col in CATEGORICAL_COLUMNS}
+        self._setup(FusedStandardScaler.from_scalers(scalers), classes, unknown_code, selected)
+
+    def _setup(self, numeric_scaler, classes, unknown_code, selected):
+        self.numeric_scaler = numeric_scaler
+        self.coders = {
+            col: CategoricalCoder(classes[col], unknown_code)
+            for col in CATEGORICAL_COLUMNS
+        }
+
+        if selected is None:
+            selected = np.arange(len(FEATURE_COLUMNS))
+        self.selected = np.asarray(selected, dtype=np.intp)
+        colunas = [FEATURE_COLUMNS[i] for i in self.selected]
+        self.selected_numeric = [(col, pos) for pos, col in enumerate(colunas) if col in NUMERIC_COLUMNS]
+        self.selected_categorical = [(col, pos) for pos, col in enumerate(colunas) if col in CATEGORICAL_COLUMNS]
+        indices = [NUMERIC_COLUMNS.index(col) for col, _ in self.selected_numeric]
+        self.selected_scaler = FusedStandardScaler(numeric_scaler.mean[indices], numeric_scaler.scale[indices])
+
+    @classmethod
+    def from_arrays(cls, arrays, unknown_code=Config.UNKNOWN_CATEGORY_CODE, selected=None):
+        """Constrói a partir de mean, scale e classes_<coluna> (sem sklearn nem joblib)"""
+        numeric_scaler = FusedStandardScaler(arrays['mean'], arrays['scale'])
+        classes = {col: arrays[f'classes_{col}'].tolist() for col in CATEGORICAL_COLUMNS}
+        pipeline = cls.__new__(cls)
+        pipeline.scalers = None
+        pipeline.encoders = None
+        pipeline._setup(numeric_scaler, classes, unknown_code, selected)
+        return pipeline
+
+    @classmethod
+    def from_bundle(cls, path, unknown_code=Config.UNKNOWN_CATEGORY_CODE, selected=None):
+        """Carrega o preprocessing.npz (médias, escalas e classes)"""
+        with np.load(path, allow_pickle=False) as bundle:
+            return cls.from_arrays(bundle, unknown_code, selected)
+
+    @classmethod
+    def from_objects(cls, objects_dir=Config.OBJECTS_DIR, **kwargs):
+        """Carrega os artefatos de pré-processamento de objects_dir
+
+        Usa o preprocessing.npz quando ele existe e não é mais antigo que os
+        scalers/encoders; senão, os .joblib salvos por save_scalers/save_encoders.
+        """
+        bundle = os.path.join(objects_dir, PREPROCESSING_BUNDLE_NAME)
+        if os.path.exists(bundle):
+            mtime = os.path.getmtime(bundle)
+            if all(os.path.getmtime(path) <= mtime for path in _sklearn_object_paths(objects_dir)
+                   if os.path.exists(path)):
+                return cls.from_bundle(bundle, **kwargs)
+        return cls(*_load_sklearn_objects(objects_dir), **kwargs)
+
+    def transform(self, df, return_unknown=False):
+        """Aplica scalers e encoders (mesma saída de load_scalers + load_encoders)
+
+        Categorias não vistas no treino não geram exceção: recebem o código
+        de fallback e, com return_unknown=True, a máscara (n_linhas x
+        n_categóricas) das células afetadas é retornada junto com o DataFrame.
+        """
+        block = np.array(df[NUMERIC_COLUMNS], dtype=np.float32, order='C')
+        df[NUMERIC_COLUMNS] = self.numeric_scaler.transform(block)
+
+        unknown = np.zeros((len(df), len(CATEGORICAL_COLUMNS)), dtype=bool)
+        for j, col in enumerate(CATEGORICAL_COLUMNS):
+            df[col], unknown[:, j] = self.coders[col].transform(df[col].tolist())
+
+        if return_unknown:
+            return df, unknown
+        return df
+
+    def input_standardization(self, support=None):
+        """Vetores (mean, scale) por coluna da entrada do modelo
+
+        Colunas categóricas recebem mean=0 e scale=1 (identidade). support
+        (máscara ou índices do seletor) define as colunas que chegam ao
+        modelo; por padrão, as colunas selecionadas do próprio pipeline.
+        """
+        mean = np.zeros(len(FEATURE_COLUMNS), dtype=np.float64)
+        scale = np.ones(len(FEATURE_COLUMNS), dtype=np.float64)
+        mean[NUMERIC_POSITIONS] = self.numeric_scaler.mean
+        scale[NUMERIC_POSITIONS] = self.numeric_scaler.scale
+        support = self.selected if support is None else support
+        return mean[support], scale[support]
+
+    def transform_columns(self, payload, scale_numeric=True, timer=NULL_TIMER):
+        """Pré-processa um payload coluna -> lista direto em arrays NumPy, sem pandas
+
+        Só as colunas selecionadas são calculadas: os numéricos vão para um
+        buffer float32 padronizado de uma vez e as categóricas viram códigos,
+        depois os dois são posicionados na matriz de entrada do modelo
+        (n x len(selected)). Retorna a matriz e a máscara de categorias
+        desconhecidas. Com scale_numeric=False os numéricos seguem crus
+        (modelo com scalers já absorvidos na 1ª camada). timer recebe os
+        spans decode, scale, encode e select.
+        """
+        with timer.span('decode'):
+            n_linhas = decode_columnar(payload)
+
+        with timer.span('scale'):
+            numeric = np.empty((n_linhas, len(self.selected_numeric)), dtype=np.float32)
+            try:
+                for j, (col, _) in enumerate(self.selected_numeric):
+                    numeric[:, j] = payload[col]
+            except (TypeError, ValueError):
+                raise PayloadError(f"Coluna '{col}' contém valores não numéricos")
+            if scale_numeric:
+                self.selected_scaler.transform(numeric)
+
+        with timer.span('encode'):
+            codigos = np.empty((n_linhas, len(self.selected_categorical)), dtype=np.float32)
+            unknown = np.empty((n_linhas, len(self.selected_categorical)), dtype=bool)
+            for j, (col, _) in enumerate(self.selected_categorical):
+                codigos[:, j], unknown[:, j] = self.coders[col].transform(payload[col])
+
+        with timer.span('select'):
+            X = np.empty((n_linhas, len(self.selected)), dtype=np.float32)
+            X[:, [pos for _, pos in self.selected_numeric]] = numeric
+            X[:, [pos for _, pos in self.selected_categorical]] = codigos
+        return X, unknown
+
+
+def _sklearn_object_paths(objects_dir):
+    return ([os.path.join(objects_dir, f'scaler{col}.joblib') for col in NUMERIC_COLUMNS]
+            + [os.path.join(objects_dir, f'labelencoder{col}.joblib') for col in CATEGORICAL_COLUMNS])
+
+
+def _load_sklearn_objects(objects_dir):
+    """StandardScaler e LabelEncoder salvos por save_scalers/save_encoders"""
+    import joblib
+    scalers = {
+        col: joblib.load(os.path.join(objects_dir, f'scaler{col}.joblib'))
+        for col in NUMERIC_COLUMNS
+    }
+    encoders = {
+        col: joblib.load(os.path.join(objects_dir, f'labelencoder{col}.joblib'))
+        for col in CATEGORICAL_COLUMNS
+    }
+    return scalers, encoders
+
+
+def preprocessing_arrays(objects_dir=Config.OBJECTS_DIR):
+    """mean, scale e classes_<coluna> dos scalers e encoders salvos em objects_dir"""
+    scalers, encoders = _load_sklearn_objects(objects_dir)
+    numeric_scaler = FusedStandardScaler.from_scalers(scalers)
+    arrays = {'mean': numeric_scaler.mean, 'scale': numeric_scaler.scale}
+    for col in CATEGORICAL_COLUMNS:
+        arrays[f'classes_{col}'] = np.array([str(c) for c in encoders[col].classes_])
+    return arrays
+
+
+def save_preprocessing_bundle(objects_dir=Config.OBJECTS_DIR, path=None):
+    """Exporta scalers e encoders para o preprocessing.npz lido no serving"""
+    path = path or os.path.join(objects_dir, PREPROCESSING_BUNDLE_NAME)
+    np.savez(path, **preprocessing_arrays(objects_dir))
+    return path
+
+
+def save_selected_features(selector, path=Config.SELECTOR_INDICES_PATH):
+    """Salva os índices das colunas mantidas pelo seletor (substitui o RFE pickled no serving)"""
+    indices = np.flatnonzero(selector.get_support()).astype(np.int16)
+    np.save(path, indices)
+    return indices
+
+
+def load_selected_features(indices_path=Config.SELECTOR_INDICES_PATH, selector_path=Config.SELECTOR_PATH):
+    """Carrega os índices das colunas selecionadas
+
+    Sem o artefato compacto (objetos gerados antes dele), cai para o
+    selector.joblib completo e extrai a máscara do RFE.
+    """
+    if os.path.exists(indices_path):
+        return np.load(indices_path)
+    import joblib
+    return np.flatnonzero(joblib.load(selector_path).get_support())
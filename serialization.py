@@ -0,0 +1,185 @@
+"""
+Formatos de entrada e saída do serviço de predição além do JSON simples
+
+pyarrow (Arrow IPC) e msgpack (MessagePack) são opcionais e só importados
+quando um cliente usa o formato correspondente.
+"""
+import json
+import numpy as np
+from preprocessing import REQUIRED_COLUMNS, NUMERIC_COLUMNS, PayloadError, decode_columnar
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+ARROW_FILE_MIMETYPE = 'application/vnd.apache.arrow.file'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+JSON_MIMETYPE = 'application/json'
+
+# Content-Type/Accept aceitos -> formato
+FORMATS = {
+    JSON_MIMETYPE: 'json',
+    ARROW_MIMETYPE: 'arrow',
+    ARROW_FILE_MIMETYPE: 'arrow_file',
+    MSGPACK_MIMETYPE: 'msgpack',
+    'application/msgpack': 'msgpack',
+}
+MIMETYPES = {'json': JSON_MIMETYPE, 'arrow': ARROW_MIMETYPE, 'arrow_file': ARROW_FILE_MIMETYPE,
+             'msgpack': MSGPACK_MIMETYPE}
+
+
+class UnsupportedFormatError(ValueError):
+    """Formato binário sem a biblioteca opcional instalada"""
+
+
+def request_format(mimetype):
+    """Formato do corpo da requisição (JSON quando o Content-Type não é binário)"""
+    return FORMATS.get(mimetype, 'json')
+
+
+def response_format(accept_mimetypes, formato_requisicao):
+    """Formato da resposta: o Accept explícito, senão o mesmo da requisição"""
+    for mimetype, _ in accept_mimetypes:
+        if mimetype in FORMATS:
+            return FORMATS[mimetype]
+    return formato_requisicao
+
+
+def decode_request(body, formato):
+    """Decodifica um corpo Arrow IPC (stream ou file) ou MessagePack em coluna -> valores
+
+    Colunas numéricas viram arrays NumPy sem cópia (views sobre o buffer
+    recebido), copiados uma única vez para a matriz de entrada do modelo.
+    No MessagePack, uma coluna numérica pode vir como lista ou como bytes
+    de float32 little-endian.
+    """
+    if formato in ('arrow', 'arrow_file'):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise UnsupportedFormatError('Formato Arrow requer o pacote pyarrow')
+        abrir = pa.ipc.open_stream if formato == 'arrow' else pa.ipc.open_file
+        table = abrir(body).read_all()
+        payload = {}
+        for col in table.column_names:
+            coluna = table.column(col)
+            if col in NUMERIC_COLUMNS and coluna.null_count == 0:
+                payload[col] = coluna.combine_chunks().to_numpy(zero_copy_only=False)
+            else:
+                payload[col] = coluna.to_pylist()
+        return payload
+
+    if formato == 'msgpack':
+        try:
+            import msgpack
+        except ImportError:
+            raise UnsupportedFormatError('Formato MessagePack requer o pacote msgpack')
+        payload = msgpack.unpackb(body, raw=False)
+        if isinstance(payload, dict):
+            for col in NUMERIC_COLUMNS:
+                if isinstance(payload.get(col), bytes):
+                    payload[col] = np.frombuffer(payload[col], dtype='<f4')
+        return payload
+
+    raise ValueError(f'Formato desconhecido: {formato}')
+
+
+def encode_response(probabilities, formato):
+    """Codifica o vetor float32 de probabilidades no formato pedido"""
+    probabilities = np.asarray(probabilities, dtype=np.float32).ravel()
+
+    if formato in ('arrow', 'arrow_file'):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise UnsupportedFormatError('Formato Arrow requer o pacote pyarrow')
+        table = pa.table({'probability': probabilities})
+        sink = pa.BufferOutputStream()
+        novo = pa.ipc.new_stream if formato == 'arrow' else pa.ipc.new_file
+        with novo(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    if formato == 'msgpack':
+        try:
+            import msgpack
+        except ImportError:
+            raise UnsupportedFormatError('Formato MessagePack requer o pacote msgpack')
+        return msgpack.packb({'probability': probabilities.tolist()}, use_single_float=True)
+
+    raise ValueError(f'Formato desconhecido: {formato}')
+
+
+def _is_columnar(obj):
+    """True para um bloco coluna -> lista de valores (em vez de um registro)"""
+    return isinstance(obj, dict) and any(isinstance(v, list) for v in obj.values())
+
+
+def coerce_record(obj):
+    """Valida um registro do NDJSON (um solicitante) e converte os numéricos para float
+
+    A validação é a mesma do /predict (decode_columnar sobre o registro
+    como payload de uma linha), então um valor aceito ou recusado em um
+    endpoint tem o mesmo resultado no outro.
+    """
+    if not isinstance(obj, dict):
+        raise PayloadError('Esperado um objeto JSON')
+    decode_columnar({col: [valor] for col, valor in obj.items()})
+    return {col: float(obj[col]) if col in NUMERIC_COLUMNS else obj[col] for col in REQUIRED_COLUMNS}
+
+
+def iter_ndjson_chunks(lines, chunk_size):
+    """Agrupa um fluxo NDJSON em lotes coluna -> lista de até chunk_size linhas
+
+    Cada linha pode ser um registro (um solicitante, valores escalares) ou
+    um bloco colunar (mesmo formato do /predict). Registros são validados
+    um a um (coerce_record) e acumulados até chunk_size; blocos colunares
+    são fatiados em pedaços de chunk_size.
+
+    Gera (payload, origens, None) para cada lote, com origens[i] =
+    (número da linha de entrada, posição no bloco colunar ou None) da linha
+    i do payload, ou (None, [(número, None)], mensagem) para uma linha
+    inválida, que é pulada sem interromper o fluxo.
+    """
+    buffer = {col: [] for col in REQUIRED_COLUMNS}
+    origens = []
+
+    def esvaziar():
+        nonlocal buffer, origens
+        lote = (buffer, origens, None)
+        buffer = {col: [] for col in REQUIRED_COLUMNS}
+        origens = []
+        return lote
+
+    for numero, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            yield None, [(numero, None)], 'JSON inválido'
+            continue
+
+        if _is_columnar(obj):
+            if origens:
+                yield esvaziar()
+            tamanho = max(len(v) for v in obj.values() if isinstance(v, list))
+            for inicio in range(0, tamanho, chunk_size):
+                fatia = {col: (v[inicio:inicio + chunk_size] if isinstance(v, list) else v)
+                         for col, v in obj.items()}
+                yield fatia, [(numero, i) for i in range(inicio, min(inicio + chunk_size, tamanho))], None
+            continue
+
+        try:
+            registro = coerce_record(obj)
+        except PayloadError as e:
+            yield None, [(numero, None)], str(e)
+            continue
+
+        for col in REQUIRED_COLUMNS:
+            buffer[col].append(registro[col])
+        origens.append((numero, None))
+        if len(origens) >= chunk_size:
+            yield esvaziar()
+
+    if origens:
+        yield esvaziar()
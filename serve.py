@@ -0,0 +1,41 @@
+"""
+Ponto de entrada da API em produção (gunicorn com workers pré-forkados)
+
+Uso:
+    python serve.py [api_improved:app | api_mock:app | api:app] [--workers N] [--threads N]
+
+As demais opções vêm de gunicorn.conf.py (lido de Config / .env). Equivale a
+gunicorn -c gunicorn.conf.py <app>.
+"""
+import argparse
+import os
+import sys
+from config import Config
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inicia a API de predição com gunicorn')
+    parser.add_argument('app', nargs='?', default=Config.SERVER_APP, help='Módulo:aplicação WSGI')
+    parser.add_argument('--workers', type=int, default=None, help='Número de workers (padrão: SERVER_WORKERS)')
+    parser.add_argument('--threads', type=int, default=None, help='Threads por worker (padrão: SERVER_THREADS)')
+    args = parser.parse_args()
+
+    try:
+        from gunicorn.app.wsgiapp import run
+    except ImportError:
+        print("❌ gunicorn não instalado (pip install gunicorn); para desenvolvimento use python api_improved.py")
+        sys.exit(1)
+
+    argv = ['gunicorn', '-c', CONFIG_FILE]
+    if args.workers:
+        argv += ['--workers', str(args.workers)]
+    if args.threads:
+        argv += ['--threads', str(args.threads)]
+    sys.argv = argv + [args.app]
+    run()
+
+
+if __name__ == '__main__':
+    main()
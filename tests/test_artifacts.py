@@ -0,0 +1,146 @@
+import unittest
+import tempfile
+import threading
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from artifacts import (ArtifactManager, ServingArtifacts, load_artifacts, publish_version,
+                       activate_version, resolve_artifacts, list_versions)
+from config import Config
+from model_export import save_dense_bundle
+from preprocessing import FEATURE_COLUMNS
+from test_preprocessing import criar_dados, criar_artefatos
+
+
+class ModeloFalso:
+    name = 'falso'
+    folded_scalers = False
+
+    def __init__(self, valor):
+        self.valor = valor
+
+    def predict(self, X):
+        return np.full((len(X), 1), self.valor, dtype=np.float32)
+
+
+class TestVersoes(unittest.TestCase):
+    """Testes para a publicação e ativação de versões dos artefatos"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.objects = os.path.join(self.tmpdir.name, 'objects')
+        self.versions = os.path.join(self.objects, 'versions')
+        os.makedirs(self.objects)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_publicar_ativar_e_voltar(self):
+        """CURRENT aponta para a última publicada; activate volta para uma anterior"""
+        self.assertEqual(resolve_artifacts(self.objects, self.versions), (self.objects, None))
+
+        with open(os.path.join(self.objects, 'meu_modelo.npz'), 'w') as f:
+            f.write('v1')
+        publish_version(self.objects, self.versions, version='v1')
+        with open(os.path.join(self.objects, 'meu_modelo.npz'), 'w') as f:
+            f.write('v2')
+        publish_version(self.objects, self.versions, version='v2')
+
+        self.assertEqual(list_versions(self.versions), ['v1', 'v2'])
+        self.assertEqual(resolve_artifacts(self.objects, self.versions)[1], 'v2')
+        with open(os.path.join(self.versions, 'v1', 'meu_modelo.npz')) as f:
+            self.assertEqual(f.read(), 'v1')
+
+        activate_version('v1', self.versions)
+        self.assertEqual(resolve_artifacts(self.objects, self.versions),
+                         (os.path.join(self.versions, 'v1'), 'v1'))
+        with self.assertRaises(ValueError):
+            publish_version(self.objects, self.versions, version='v1')
+        with self.assertRaises(ValueError):
+            activate_version('v3', self.versions)
+
+    def test_carga_de_uma_versao(self):
+        """load_artifacts lê modelo, seletor e pré-processamento do diretório da versão"""
+        df = criar_dados()
+        criar_artefatos(self.objects, df)
+        selected = np.arange(len(FEATURE_COLUMNS))
+        np.save(os.path.join(self.objects, os.path.basename(Config.SELECTOR_INDICES_PATH)), selected)
+        rng = np.random.RandomState(0)
+        layers = [(rng.normal(size=(len(selected), 1)), np.zeros(1), 'sigmoid')]
+        save_dense_bundle(layers, os.path.join(self.objects, os.path.basename(Config.NUMPY_MODEL_PATH)))
+        version = publish_version(self.objects, self.versions)
+
+        ativos = load_artifacts(*resolve_artifacts(self.objects, self.versions), backend='numpy')
+        self.assertEqual(ativos.version, version)
+        X, _ = ativos.preprocessamento.transform_columns({col: df[col].tolist()[:3] for col in FEATURE_COLUMNS})
+        self.assertEqual(ativos.predict(X).shape, (3, 1))
+
+
+class TestArtifactManager(unittest.TestCase):
+    """Testes para a troca da versão ativa"""
+
+    def setUp(self):
+        self.alvo = ['v1']
+        self.trocas = []
+
+        def loader(directory, version):
+            return ServingArtifacts(version, f'digest-{version}', directory,
+                                    ModeloFalso(float(version[1:])), preprocessamento=None)
+
+        self.manager = ArtifactManager(loader=loader, resolver=lambda: ('dir', self.alvo[0]),
+                                       on_swap=self.trocas.append)
+
+    def test_requisicao_em_andamento_termina_na_versao_antiga(self):
+        """A troca não afeta quem já pegou a versão; a antiga só é encerrada depois"""
+        self.assertTrue(self.manager.load())
+        with self.manager.acquire() as antigos:
+            self.alvo[0] = 'v2'
+            self.assertTrue(self.manager.load())
+            self.assertEqual(self.manager.current.version, 'v2')
+            self.assertEqual(antigos.predict(np.zeros((1, 2)))[0, 0], 1.0)
+            self.assertEqual(antigos.in_flight, 1)
+
+            encerrada = threading.Event()
+            threading.Thread(target=lambda: (antigos.retire(), encerrada.set())).start()
+            self.assertFalse(encerrada.wait(0.05))
+        self.assertTrue(encerrada.wait(1))
+        self.assertEqual([a.version for a in self.trocas], ['v1', 'v2'])
+
+    def test_mesma_versao_ou_erro_mantem_a_ativa(self):
+        """Recarregar o mesmo conteúdo não troca; falha na carga mantém a versão e registra o erro"""
+        self.manager.load()
+        self.assertFalse(self.manager.load())
+
+        self.alvo[0] = 'quebrada'
+        self.assertFalse(self.manager.load())
+        self.assertEqual(self.manager.current.version, 'v1')
+        self.assertIn('ValueError', self.manager.status()['last_error'])
+
+
+    def test_objects_sem_versao_so_na_inicializacao(self):
+        """Sem versão publicada o objects/ é servido, mas nunca trocado a quente"""
+        self.alvo[0] = None
+        self.manager.loader = lambda directory, version: ServingArtifacts(
+            'objects', 'digest-objects', directory, ModeloFalso(0.0), preprocessamento=None)
+        self.assertTrue(self.manager.load())
+
+        self.manager.loader = lambda directory, version: self.fail('objects/ recarregado a quente')
+        self.assertFalse(self.manager.load())
+        self.assertEqual(self.manager.current.version, 'objects')
+
+    def test_erro_ao_resolver_a_versao(self):
+        """Falha ao ler o CURRENT no meio de uma gravação não escapa do load (nem do watcher)"""
+        self.manager.load()
+
+        def resolver():
+            raise FileNotFoundError('CURRENT sendo gravado')
+        self.manager.resolver = resolver
+        self.assertFalse(self.manager.load())
+        self.assertEqual(self.manager.current.version, 'v1')
+        self.assertIn('FileNotFoundError', self.manager.status()['last_error'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,55 @@
+import unittest
+import threading
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batching import MicroBatcher
+
+
+class TestMicroBatcher(unittest.TestCase):
+    """Testes para o agrupamento de requisições concorrentes"""
+
+    def setUp(self):
+        self.chamadas = []
+
+        def predict_fn(X):
+            self.chamadas.append(len(X))
+            return X.sum(axis=1, keepdims=True)
+
+        self.predict_fn = predict_fn
+
+    def test_cada_chamador_recebe_sua_fatia(self):
+        """Requisições concorrentes são agrupadas e o resultado é repartido"""
+        batcher = MicroBatcher(self.predict_fn, max_batch_size=64, max_wait_us=200000)
+        entradas = [np.full((i % 3 + 1, 4), i, dtype=np.float32) for i in range(10)]
+        resultados = [None] * len(entradas)
+
+        def chamar(i):
+            resultados[i] = batcher.predict(entradas[i])
+
+        threads = [threading.Thread(target=chamar, args=(i,)) for i in range(len(entradas))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for X, resultado in zip(entradas, resultados):
+            np.testing.assert_array_equal(resultado, X.sum(axis=1, keepdims=True))
+        self.assertLess(len(self.chamadas), len(entradas))
+        self.assertEqual(sum(self.chamadas), sum(len(X) for X in entradas))
+        self.assertEqual(batcher.stats()['batch_size']['count'], len(self.chamadas))
+
+    def test_erro_propagado_ao_chamador(self):
+        """Exceções do modelo chegam a quem fez a requisição"""
+        def falha(X):
+            raise RuntimeError('falha no modelo')
+
+        batcher = MicroBatcher(falha, max_wait_us=0)
+        with self.assertRaisesRegex(RuntimeError, 'falha no modelo'):
+            batcher.predict(np.zeros((1, 4), dtype=np.float32))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
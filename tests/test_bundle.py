@@ -0,0 +1,94 @@
+import unittest
+import tempfile
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bundle import Bundle, BundleError, ALIGNMENT, write_bundle, build_serving_bundle
+from artifacts import load_artifacts
+from config import Config
+from model_export import save_dense_bundle
+from preprocessing import FEATURE_COLUMNS
+from test_preprocessing import criar_dados, criar_artefatos
+
+
+class TestBundle(unittest.TestCase):
+    """Testes para o formato do bundle mapeado em memória"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'teste.bundle')
+        self.arrays = {
+            'kernel': np.random.RandomState(0).normal(size=(13, 5)).astype(np.float32),
+            'indices': np.array([0, 2, 5], dtype=np.int16),
+            'classes': np.array(['Advogado', 'Médico', 'Programador']),
+            'escala': np.array(0.25, dtype=np.float32),
+            'vazio': np.zeros(0, dtype=np.float64),
+        }
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_arrays_mapeados_sem_copia(self):
+        """Arrays voltam iguais, alinhados e somente leitura (views sobre o arquivo)"""
+        write_bundle(self.path, self.arrays, {'origem': 'teste'}, version='v1')
+        bundle = Bundle(self.path)
+
+        self.assertEqual((bundle.version, bundle.metadata), ('v1', {'origem': 'teste'}))
+        for name, esperado in self.arrays.items():
+            np.testing.assert_array_equal(bundle[name], esperado)
+            self.assertEqual((bundle[name].dtype, bundle[name].shape), (esperado.dtype, esperado.shape))
+            self.assertFalse(bundle[name].flags.writeable)
+        self.assertEqual(bundle['kernel'].ctypes.data % ALIGNMENT, 0)
+        self.assertEqual(bundle.section('ind'), {'ices': bundle['indices']})
+
+    def test_checksum_divergente(self):
+        """Um byte alterado nos dados é detectado na carga (verify=False carrega mesmo assim)"""
+        write_bundle(self.path, self.arrays)
+        digest = Bundle(self.path).digest
+        with open(self.path, 'r+b') as f:
+            posicao = f.read().index(self.arrays['kernel'].tobytes())
+            f.seek(posicao)
+            f.write(bytes([self.arrays['kernel'].tobytes()[0] ^ 0xFF]))
+
+        with self.assertRaises(BundleError):
+            Bundle(self.path)
+        self.assertEqual(Bundle(self.path, verify=False).digest, digest)
+
+    def test_arquivo_que_nao_e_bundle(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'nao sou um bundle')
+        with self.assertRaises(BundleError):
+            Bundle(self.path)
+
+
+class TestServingBundle(unittest.TestCase):
+    """Testes para o bundle com pré-processamento, seletor e modelo"""
+
+    def test_mesmas_predicoes_dos_artefatos_separados(self):
+        with tempfile.TemporaryDirectory() as objects:
+            df = criar_dados()
+            criar_artefatos(objects, df)
+            selected = np.array([0, 1, 2, 4, 5, 6, 8, 10, 11, 12], dtype=np.int16)
+            np.save(os.path.join(objects, os.path.basename(Config.SELECTOR_INDICES_PATH)), selected)
+            rng = np.random.RandomState(1)
+            layers = [(rng.normal(size=(len(selected), 8)), rng.normal(size=8), 'relu'),
+                      (rng.normal(size=(8, 1)), rng.normal(size=1), 'sigmoid')]
+            save_dense_bundle(layers, os.path.join(objects, os.path.basename(Config.NUMPY_MODEL_PATH)))
+            build_serving_bundle(objects, 'numpy', version='v7')
+
+            separados = load_artifacts(objects, backend='numpy')
+            consolidado = load_artifacts(objects, backend='bundle')
+            self.assertEqual(consolidado.version, 'v7')
+            np.testing.assert_array_equal(consolidado.preprocessamento.selected, selected)
+
+            payload = {col: df[col].tolist() for col in FEATURE_COLUMNS}
+            X, _ = consolidado.preprocessamento.transform_columns(payload)
+            X_ref, _ = separados.preprocessamento.transform_columns(payload)
+            np.testing.assert_array_equal(X, X_ref)
+            np.testing.assert_array_equal(consolidado.predict(X), separados.predict(X_ref))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
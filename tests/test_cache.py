@@ -0,0 +1,90 @@
+import unittest
+import threading
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import PredictionCache
+
+
+class TestPredictionCache(unittest.TestCase):
+    """Testes para o cache de predições por linha"""
+
+    def setUp(self):
+        self.agora = 0.0
+        self.chamadas = []
+
+        def predict_fn(X):
+            self.chamadas.append(len(X))
+            return X.sum(axis=1, keepdims=True)
+
+        self.predict_fn = predict_fn
+        self.cache = PredictionCache(max_entries=3, ttl_seconds=10, version='v1',
+                                     clock=lambda: self.agora)
+
+    def test_so_linhas_faltantes_vao_ao_modelo(self):
+        """Linhas repetidas são servidas do cache, na ordem original"""
+        X = np.array([[1, 2], [3, 4]], dtype=np.float32)
+        self.cache.predict(X, self.predict_fn)
+
+        Y = np.array([[3, 4], [5, 6], [1, 2]], dtype=np.float32)
+        resultado = self.cache.predict(Y, self.predict_fn)
+
+        np.testing.assert_array_equal(resultado, Y.sum(axis=1, keepdims=True))
+        self.assertEqual(self.chamadas, [2, 1])
+        self.assertEqual(self.cache.stats()['hits'], 2)
+        self.assertEqual(self.cache.stats()['misses'], 3)
+
+    def test_lru_e_ttl(self):
+        """A entrada menos usada sai primeiro e entradas expiradas são recalculadas"""
+        linhas = [np.array([[i, 0]], dtype=np.float32) for i in range(4)]
+        for linha in linhas[:3]:
+            self.cache.predict(linha, self.predict_fn)
+        self.cache.predict(linhas[0], self.predict_fn)  # [0] passa a ser o mais recente
+        self.cache.predict(linhas[3], self.predict_fn)  # expulsa [1]
+
+        self.assertEqual(self.cache.get_many(self.cache.keys(linhas[1])), [None])
+        self.assertIsNotNone(self.cache.get_many(self.cache.keys(linhas[0]))[0])
+
+        self.agora = 11.0
+        self.assertEqual(self.cache.get_many(self.cache.keys(linhas[0])), [None])
+
+    def test_invalidacao_por_versao(self):
+        """Cada versão tem as suas chaves; invalidate só descarta as entradas"""
+        X = np.array([[1, 2]], dtype=np.float32)
+        chave_v1 = self.cache.keys(X, 'v1')
+        self.cache.predict(X, self.predict_fn, 'v1')
+
+        self.cache.invalidate()
+        self.assertEqual(self.cache.stats()['entries'], 0)
+        self.assertNotEqual(self.cache.keys(X, 'v2'), chave_v1)
+        self.assertEqual(self.cache.keys(X, 'v1'), chave_v1)
+
+    def test_troca_de_versao_com_requisicao_em_andamento(self):
+        """Requisição na versão antiga que termina depois da troca não contamina a nova"""
+        X = np.array([[1, 2]], dtype=np.float32)
+        iniciou, liberar = threading.Event(), threading.Event()
+
+        def modelo_antigo(X):
+            iniciou.set()
+            liberar.wait(5)
+            return np.full((len(X), 1), 0.1, dtype=np.float32)
+
+        def modelo_novo(X):
+            return np.full((len(X), 1), 0.9, dtype=np.float32)
+
+        resultado = {}
+        antiga = threading.Thread(
+            target=lambda: resultado.setdefault('v1', self.cache.predict(X, modelo_antigo, 'v1')))
+        antiga.start()
+        iniciou.wait(5)
+        self.cache.invalidate()  # troca para v2 com a requisição v1 no meio do modelo
+        liberar.set()
+        antiga.join(5)
+
+        np.testing.assert_array_equal(resultado['v1'], [[np.float32(0.1)]])
+        np.testing.assert_array_equal(self.cache.predict(X, modelo_novo, 'v2'), [[np.float32(0.9)]])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
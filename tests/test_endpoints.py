@@ -0,0 +1,194 @@
+import unittest
+import tempfile
+import json
+import joblib
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.ensemble import RandomForestClassifier
+from config import Config
+from model_export import save_dense_bundle
+from preprocessing import FEATURE_COLUMNS
+from test_preprocessing import criar_dados, criar_artefatos
+
+# As APIs usam ./objects e ./logs relativos: os testes rodam em um diretório temporário
+tmpdir = None
+diretorio_original = None
+api = None
+api_mock = None
+
+
+def setUpModule():
+    global tmpdir, diretorio_original, api, api_mock
+    tmpdir = tempfile.TemporaryDirectory()
+    diretorio_original = os.getcwd()
+    os.chdir(tmpdir.name)
+
+    objects = os.path.basename(Config.OBJECTS_DIR)
+    os.makedirs(objects)
+    criar_artefatos(objects, criar_dados())
+    selected = np.arange(len(FEATURE_COLUMNS))
+    np.save(os.path.join(objects, os.path.basename(Config.SELECTOR_INDICES_PATH)), selected)
+    rng = np.random.RandomState(0)
+    layers = [(rng.normal(size=(len(selected), 1)), np.zeros(1), 'sigmoid')]
+    save_dense_bundle(layers, os.path.join(objects, os.path.basename(Config.NUMPY_MODEL_PATH)))
+    floresta = RandomForestClassifier(n_estimators=5, random_state=0).fit(
+        rng.normal(size=(100, len(selected))), rng.randint(0, 2, 100))
+    joblib.dump(floresta, os.path.join(objects, os.path.basename(Config.FOREST_MODEL_PATH)))
+
+    Config.INFERENCE_BACKEND = 'numpy'
+    Config.ARTIFACT_WATCH_SECONDS = 0
+    Config.LOG_SEGMENTS_ENABLED = False
+    import api_improved
+    import api_mock as modulo_mock
+    api = api_improved
+    api_mock = modulo_mock
+
+
+def tearDownModule():
+    api.model_logger.prediction_writer.flush()
+    api_mock.prediction_writer.flush()
+    os.chdir(diretorio_original)
+    tmpdir.cleanup()
+
+
+class TestPredictBatch(unittest.TestCase):
+    """Testes para o /predict/batch do api_improved"""
+
+    def setUp(self):
+        self.client = api.app.test_client()
+        df = criar_dados(n_samples=6)
+        self.registros = [{col: (v.item() if isinstance(v, np.generic) else v) for col, v in linha.items()}
+                          for linha in df.to_dict(orient='records')]
+        self.chunk_size = Config.BATCH_CHUNK_SIZE
+        Config.BATCH_CHUNK_SIZE = 2
+
+    def tearDown(self):
+        Config.BATCH_CHUNK_SIZE = self.chunk_size
+
+    def post_batch(self, linhas):
+        resposta = self.client.post('/predict/batch', data='\n'.join(linhas) + '\n',
+                                    content_type='application/x-ndjson')
+        self.assertEqual(resposta.status_code, 200)
+        return [json.loads(linha) for linha in resposta.get_data(as_text=True).splitlines()]
+
+    def test_valor_invalido_afeta_so_a_sua_linha(self):
+        """Um valor inválido na linha 3 gera erro só para ela; as demais mantêm o número da entrada"""
+        linhas = [json.dumps(registro) for registro in self.registros]
+        linhas[2] = json.dumps(dict(self.registros[2], renda='abc'))
+        saidas = self.post_batch(linhas)
+
+        self.assertEqual([saida['line'] for saida in saidas], [1, 2, 3, 4, 5, 6])
+        self.assertIn("'renda'", saidas[2]['error'])
+        for saida in saidas[:2] + saidas[3:]:
+            self.assertIn('probability', saida)
+
+        # A mesma linha, isolada, tem a mesma probabilidade
+        sozinha = self.post_batch([linhas[4]])
+        self.assertEqual(sozinha, [dict(saidas[4], line=1)])
+
+    def test_bloco_colunar_com_indice(self):
+        """Linhas de um bloco colunar trazem a posição no bloco"""
+        bloco = {col: [registro[col] for registro in self.registros[:3]] for col in FEATURE_COLUMNS}
+        saidas = self.post_batch([json.dumps(self.registros[0]), json.dumps(bloco)])
+        self.assertEqual([(saida['line'], saida.get('index')) for saida in saidas],
+                         [(1, None), (2, 0), (2, 1), (2, 2)])
+
+    def test_mesma_validacao_do_predict(self):
+        """Um valor tem o mesmo resultado (aceito ou 400) no /predict e na sua linha do /predict/batch"""
+        for valor in (True, None, 'abc', '35', float('inf')):
+            registro = dict(self.registros[0], renda=valor)
+            unitario = self.client.post('/predict', json={col: [v] for col, v in registro.items()})
+            saida, = self.post_batch([json.dumps(registro)])
+            with self.subTest(valor=valor):
+                if unitario.status_code == 200:
+                    self.assertAlmostEqual(saida['probability'], unitario.get_json()[0][0], places=6)
+                else:
+                    self.assertEqual(unitario.status_code, 400)
+                    self.assertEqual(saida['error'], unitario.get_json()['error'])
+
+    def test_log_e_metricas_por_linha(self):
+        """Cada linha vai para o log de predições com o próprio request_id e aparece no /metrics"""
+        linhas = [json.dumps(registro) for registro in self.registros[:3]]
+        resposta = self.client.post('/predict/batch', data='\n'.join(linhas) + '\n',
+                                    content_type='application/x-ndjson', headers={'X-Request-ID': 'lote-teste'})
+        self.assertEqual(len(resposta.get_data(as_text=True).splitlines()), 3)
+
+        api.model_logger.prediction_writer.flush()
+        with open(api.model_logger.predictions_log, encoding='utf-8') as f:
+            entradas = [json.loads(linha) for linha in f if 'lote-teste' in linha]
+        self.assertEqual([entrada['request_id'] for entrada in entradas],
+                         ['lote-teste-1', 'lote-teste-2', 'lote-teste-3'])
+        self.assertTrue(all(entrada['model_version'] == api.artifacts.current.version for entrada in entradas))
+
+        texto = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('prediction_batch_requests_total{status="200"}', texto)
+        for stage in ('decode', 'infer', 'log', 'serialize'):
+            self.assertIn(f'prediction_batch_stage_ms_count{{stage="{stage}"}}', texto)
+
+
+class TestParidadeFlaskAsgi(unittest.TestCase):
+    """Mesmas respostas do /predict no api_improved (Flask) e no api_asgi (Starlette)"""
+
+    def setUp(self):
+        from starlette.testclient import TestClient
+        import api_asgi
+        self.flask = api.app.test_client()
+        self.asgi = TestClient(api_asgi.app)
+        self.payload = {col: valores.tolist() for col, valores in criar_dados(n_samples=2).items()}
+
+    def post(self, payload):
+        flask = self.flask.post('/predict', json=payload)
+        asgi = self.asgi.post('/predict', json=payload)
+        return (flask.status_code, flask.get_json()), (asgi.status_code, asgi.json())
+
+    def test_predicao_valida(self):
+        flask, asgi = self.post(self.payload)
+        self.assertEqual(flask[0], 200)
+        self.assertEqual(flask, asgi)
+
+    def test_numerico_nulo(self):
+        """Um numérico nulo é um payload inválido (400) nos dois servidores"""
+        flask, asgi = self.post(dict(self.payload, renda=[None, 1000.0]))
+        self.assertEqual(flask[0], 400)
+        self.assertEqual(flask, asgi)
+        self.assertIn('renda', flask[1]['error'])
+
+    def test_pool_cheio_responde_503(self):
+        """Com o limite de pendentes atingido, o ASGI recusa com Retry-After em vez de enfileirar"""
+        import asyncio
+        import api_asgi
+        pendentes = api_asgi.pendentes
+        api_asgi.pendentes = asyncio.Semaphore(0)
+        try:
+            resposta = self.asgi.post('/predict', json=self.payload)
+        finally:
+            api_asgi.pendentes = pendentes
+        self.assertEqual(resposta.status_code, 503)
+        self.assertEqual(resposta.headers['retry-after'], str(Config.ASGI_RETRY_AFTER_SECONDS))
+
+
+class TestApiMockMetrics(unittest.TestCase):
+    """Testes para o /metrics do api_mock"""
+
+    def test_metrics_depois_de_uma_predicao(self):
+        """Uma predição de 2 linhas aparece nos contadores e nos histogramas de cada estágio"""
+        client = api_mock.app.test_client()
+        payload = {col: valores.tolist() for col, valores in criar_dados(n_samples=2).items()}
+        resposta = client.post('/predict', json=payload)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(len(resposta.get_json()), 2)
+
+        metricas = client.get('/metrics')
+        self.assertEqual(metricas.status_code, 200)
+        texto = metricas.get_data(as_text=True)
+        self.assertIn('prediction_requests_total{status="200"} 1', texto)
+        self.assertIn('prediction_rows_total 2', texto)
+        for stage in ('decode', 'scale', 'encode', 'select', 'infer', 'log', 'serialize'):
+            self.assertIn(f'prediction_stage_ms_count{{stage="{stage}"}} 1', texto)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,97 @@
+import unittest
+import importlib.util
+import tempfile
+import joblib
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.ensemble import RandomForestClassifier
+from bundle import Bundle, build_serving_bundle, load_bundle_model
+from config import Config
+from forest import FlatForest, export_forest
+from test_preprocessing import criar_dados, criar_artefatos
+
+
+def criar_floresta(n_samples=400, n_features=10, n_estimators=20, seed=0):
+    rng = np.random.RandomState(seed)
+    X = rng.normal(size=(n_samples, n_features)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] * X[:, 2] + rng.normal(scale=0.5, size=n_samples) > 0).astype(int)
+    return RandomForestClassifier(n_estimators=n_estimators, random_state=seed).fit(X, y), rng
+
+
+class TestFlatForest(unittest.TestCase):
+    """Testes para a floresta exportada em arrays planos (percurso em NumPy)"""
+
+    compiled = False
+
+    def flat(self, modelo, **kwargs):
+        return FlatForest(export_forest(modelo), compiled=self.compiled, **kwargs)
+
+    def test_mesmo_predict_proba_do_sklearn(self):
+        """Probabilidades idênticas (bit a bit) às do RandomForestClassifier"""
+        modelo, rng = criar_floresta()
+        floresta = self.flat(modelo)
+        X = rng.normal(size=(300, 10)).astype(np.float32)
+
+        np.testing.assert_array_equal(floresta.predict_proba(X), modelo.predict_proba(X))
+        np.testing.assert_array_equal(floresta.predict_proba(X[:1]), modelo.predict_proba(X[:1]))
+        np.testing.assert_array_equal(floresta.apply(X), modelo.apply(X) + floresta.roots)
+
+    def test_lote_grande_em_blocos(self):
+        """100 mil linhas em blocos de tamanho que não divide o lote: mesmo resultado do sklearn"""
+        modelo, rng = criar_floresta(n_estimators=10)
+        floresta = self.flat(modelo, chunk_rows=1000 - 3)
+        X = rng.normal(size=(100_000, 10)).astype(np.float32)
+        np.testing.assert_array_equal(floresta.predict_proba(X), modelo.predict_proba(X))
+
+    def test_limiares_em_float32(self):
+        """Entradas exatamente nos limiares (e no float32 vizinho) seguem o mesmo caminho do sklearn"""
+        modelo, rng = criar_floresta()
+        floresta = self.flat(modelo)
+        limiares = np.concatenate([e.tree_.threshold[e.tree_.children_left != -1] for e in modelo.estimators_])
+        valores = np.concatenate([limiares.astype(np.float32),
+                                  np.nextafter(limiares.astype(np.float32), np.float32(np.inf))])
+        X = np.tile(valores[:, np.newaxis], (1, 10))
+        np.testing.assert_array_equal(floresta.predict_proba(X), modelo.predict_proba(X))
+
+    def test_valores_ausentes(self):
+        """NaN segue o lado definido pelo sklearn em cada nó (missing_go_to_left)"""
+        modelo, rng = criar_floresta()
+        floresta = self.flat(modelo)
+        X = rng.normal(size=(200, 10)).astype(np.float32)
+        X[rng.rand(*X.shape) < 0.2] = np.nan
+        np.testing.assert_array_equal(floresta.predict_proba(X), modelo.predict_proba(X))
+
+    def test_numero_de_features_invalido(self):
+        modelo, _ = criar_floresta()
+        with self.assertRaises(ValueError):
+            self.flat(modelo).predict_proba(np.zeros((2, 9), dtype=np.float32))
+
+    def test_floresta_mapeada_do_bundle(self):
+        """No serving.bundle as árvores são views somente leitura sobre o arquivo"""
+        with tempfile.TemporaryDirectory() as objects:
+            criar_artefatos(objects, criar_dados())
+            np.save(os.path.join(objects, os.path.basename(Config.SELECTOR_INDICES_PATH)), np.arange(10))
+            modelo, rng = criar_floresta()
+            joblib.dump(modelo, os.path.join(objects, os.path.basename(Config.FOREST_MODEL_PATH)))
+            path = build_serving_bundle(objects, 'forest')
+
+            floresta = load_bundle_model(Bundle(path))
+            self.assertIsInstance(floresta, FlatForest)
+            self.assertFalse(floresta.threshold.flags.writeable)
+            X = rng.normal(size=(50, 10)).astype(np.float32)
+            np.testing.assert_array_equal(floresta.predict_proba(X), modelo.predict_proba(X))
+            np.testing.assert_array_equal(floresta.predict(X)[:, 0], modelo.predict_proba(X)[:, 1].astype(np.float32))
+
+
+@unittest.skipUnless(importlib.util.find_spec('numba'), 'numba não instalado')
+class TestFlatForestCompilado(TestFlatForest):
+    """Os mesmos testes com o percurso compilado pelo numba"""
+
+    compiled = True
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
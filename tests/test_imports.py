@@ -0,0 +1,26 @@
+import unittest
+import subprocess
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from import_profile import HEAVY_PACKAGES
+
+# Módulos usados no caminho de serving da API
+SERVING_MODULES = ['preprocessing', 'inference', 'serialization', 'cache', 'batching', 'logger', 'log_segments']
+
+
+class TestServingImports(unittest.TestCase):
+    """O serving não deve importar bibliotecas de treino na inicialização"""
+
+    def test_sem_bibliotecas_pesadas(self):
+        codigo = (f"import sys; import {', '.join(SERVING_MODULES)}; "
+                  f"print(','.join(p for p in {HEAVY_PACKAGES!r} if p in sys.modules))")
+        resultado = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True,
+                                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(resultado.returncode, 0, resultado.stderr)
+        self.assertEqual(resultado.stdout.strip(), '')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
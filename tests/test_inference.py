@@ -0,0 +1,197 @@
+import unittest
+import tempfile
+import importlib.util
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference import NumpyBackend, load_backend, warmup
+from model_export import save_dense_bundle, export_folded_bundle, check_fold_parity
+from preprocessing import PreprocessingPipeline, FEATURE_COLUMNS
+from test_preprocessing import criar_dados, criar_artefatos
+
+TENSORFLOW_DISPONIVEL = importlib.util.find_spec('tensorflow') is not None
+
+
+def criar_modelo_keras(n_features=10, seed=42):
+    """Mesma arquitetura de modelcreation.py, com pesos aleatórios"""
+    import tensorflow as tf
+    tf.random.set_seed(seed)
+    return tf.keras.Sequential([
+        tf.keras.Input(shape=(n_features,)),
+        tf.keras.layers.Dense(128, activation='relu'),
+        tf.keras.layers.Dropout(0.3),
+        tf.keras.layers.Dense(64, activation='relu'),
+        tf.keras.layers.Dropout(0.3),
+        tf.keras.layers.Dense(32, activation='relu'),
+        tf.keras.layers.Dropout(0.3),
+        tf.keras.layers.Dense(1, activation='sigmoid')
+    ])
+
+
+class TestNumpyBackend(unittest.TestCase):
+    """Testes para o forward pass em NumPy puro"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.X = np.random.RandomState(0).normal(size=(50, 10)).astype(np.float32)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_forward_pass(self):
+        """Bundle salvo e recarregado reproduz a conta densa manual"""
+        rng = np.random.RandomState(1)
+        layers = [
+            (rng.normal(size=(10, 8)), rng.normal(size=8), 'relu'),
+            (rng.normal(size=(8, 1)), rng.normal(size=1), 'sigmoid'),
+        ]
+        path = os.path.join(self.tmpdir.name, 'modelo.npz')
+        save_dense_bundle(layers, path)
+
+        backend = NumpyBackend.from_bundle(path)
+        h = np.maximum(self.X @ layers[0][0] + layers[0][1], 0)
+        esperado = 1 / (1 + np.exp(-(h @ layers[1][0] + layers[1][1])))
+
+        resultado = backend.predict(self.X)
+        self.assertEqual(resultado.shape, (50, 1))
+        np.testing.assert_allclose(resultado, esperado, rtol=1e-4, atol=1e-6)
+
+    def test_backend_desconhecido(self):
+        """Nome de backend inválido gera ValueError"""
+        with self.assertRaises(ValueError):
+            load_backend('inexistente')
+
+    @unittest.skipUnless(TENSORFLOW_DISPONIVEL, 'TensorFlow não instalado')
+    def test_paridade_com_keras(self):
+        """O bundle exportado deve reproduzir model.predict"""
+        from model_export import export_dense_bundle
+        model = criar_modelo_keras()
+        path = os.path.join(self.tmpdir.name, 'modelo.npz')
+        export_dense_bundle(model, path)
+
+        esperado = model.predict(self.X, verbose=0)
+        resultado = NumpyBackend.from_bundle(path).predict(self.X)
+        np.testing.assert_allclose(resultado, esperado, rtol=1e-5, atol=1e-6)
+
+    @unittest.skipUnless(TENSORFLOW_DISPONIVEL, 'TensorFlow não instalado')
+    def test_assinatura_de_serving(self):
+        """A tf.function com lote dinâmico (e com XLA) reproduz model.predict em qualquer tamanho"""
+        from inference import KerasBackend
+        model = criar_modelo_keras()
+        path = os.path.join(self.tmpdir.name, 'modelo.keras')
+        model.save(path)
+
+        for jit_compile in (False, True):
+            backend = KerasBackend(path, jit_compile=jit_compile)
+            tempos = warmup(backend, [1, 4])
+            self.assertEqual(sorted(tempos), [1, 4])
+            for n in (1, 3, 50):
+                np.testing.assert_allclose(backend.predict(self.X[:n]), model.predict(self.X[:n], verbose=0),
+                                           rtol=1e-5, atol=1e-6)
+            self.assertEqual(backend._serve.experimental_get_tracing_count(), 1)
+
+    @unittest.skipUnless(TENSORFLOW_DISPONIVEL, 'TensorFlow não instalado')
+    def test_paridade_tflite(self):
+        """O flatbuffer TFLite reproduz model.predict para lotes de tamanhos variados"""
+        from model_export import export_tflite
+        from inference import TFLiteBackend
+        model = criar_modelo_keras()
+        path = os.path.join(self.tmpdir.name, 'modelo.tflite')
+        export_tflite(model, path)
+
+        backend = TFLiteBackend(path)
+        for n in (1, 7, 50, 1):
+            np.testing.assert_allclose(backend.predict(self.X[:n]), model.predict(self.X[:n], verbose=0),
+                                       rtol=1e-5, atol=1e-6)
+
+    @unittest.skipUnless(TENSORFLOW_DISPONIVEL, 'TensorFlow não instalado')
+    def test_tflite_int8(self):
+        """O flatbuffer quantizado tem pesos int8 por canal, é menor e segue o modelo float"""
+        from model_export import export_tflite
+        model = criar_modelo_keras()
+        rng = np.random.RandomState(2)
+        path_float = os.path.join(self.tmpdir.name, 'modelo.tflite')
+        path_int8 = os.path.join(self.tmpdir.name, 'modelo_int8.tflite')
+        tamanho_float = export_tflite(model, path_float)
+        tamanho_int8 = export_tflite(model, path_int8, calibration=rng.normal(size=(200, 10)))
+        self.assertLess(tamanho_int8, tamanho_float / 2)
+
+        backend = load_backend('tflite-int8', path_int8)
+        self.assertEqual(backend.name, 'tflite-int8')
+        # Uma escala por canal de saída nas três camadas ocultas (a de saída tem um só canal)
+        pesos = [t for t in backend.interpreter.get_tensor_details()
+                 if t['dtype'] == np.int8 and len(t['quantization_parameters']['scales']) > 1]
+        self.assertEqual(sorted(len(t['quantization_parameters']['scales']) for t in pesos), [32, 64, 128])
+
+        X = rng.normal(size=(500, 10)).astype(np.float32)
+        esperado = model.predict(X, verbose=0)
+        resultado = backend.predict(X)
+        np.testing.assert_allclose(resultado, esperado, atol=0.05)
+        # Fora da vizinhança do limiar, a classe é a mesma do modelo float
+        confiantes = np.abs(esperado - 0.5) > 0.05
+        np.testing.assert_array_equal(resultado[confiantes] > 0.5, esperado[confiantes] > 0.5)
+
+
+class TestFoldedScalers(unittest.TestCase):
+    """Testes para a dobra dos StandardScaler na primeira camada"""
+
+    def test_entrada_crua_equivale_ao_pipeline_completo(self):
+        """Modelo dobrado com numéricos crus deve igualar scalers + modelo original"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            df = criar_dados()
+            criar_artefatos(tmpdir, df)
+            pipeline = PreprocessingPipeline.from_objects(tmpdir)
+            support = np.array([True, True, True, False, True, True, True, False, True, True, True, True, False])
+
+            rng = np.random.RandomState(3)
+            layers = [
+                (rng.normal(size=(support.sum(), 16)) * 0.3, rng.normal(size=16) * 0.1, 'relu'),
+                (rng.normal(size=(16, 1)) * 0.3, rng.normal(size=1) * 0.1, 'sigmoid'),
+            ]
+            path = os.path.join(tmpdir, 'folded.npz')
+            export_folded_bundle(layers, pipeline, support, path)
+            folded = NumpyBackend.from_bundle(path)
+            self.assertTrue(folded.folded_scalers)
+
+            payload = {col: df[col].tolist() for col in FEATURE_COLUMNS}
+            X_padronizado, _ = pipeline.transform_columns(payload)
+            X_cru, _ = pipeline.transform_columns(payload, scale_numeric=False)
+
+            esperado = NumpyBackend(layers).predict(X_padronizado[:, support])
+            resultado = folded.predict(X_cru[:, support])
+            np.testing.assert_allclose(resultado, esperado, atol=1e-4)
+
+    def test_checagem_detecta_dobra_errada(self):
+        """Camadas sem a dobra aplicadas à entrada crua divergem do pipeline completo"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            df = criar_dados()
+            criar_artefatos(tmpdir, df)
+            pipeline = PreprocessingPipeline.from_objects(tmpdir)
+            rng = np.random.RandomState(3)
+            layers = [(rng.normal(size=(len(FEATURE_COLUMNS), 1)) * 0.3, np.zeros(1), 'sigmoid')]
+            amostra = {col: df[col].tolist() for col in FEATURE_COLUMNS}
+            with self.assertRaisesRegex(ValueError, 'diverge'):
+                check_fold_parity(pipeline, None, layers, amostra, NumpyBackend(layers).predict)
+
+    @unittest.skipUnless(TENSORFLOW_DISPONIVEL, 'TensorFlow não instalado')
+    def test_paridade_com_pipeline_e_keras(self):
+        """Dobra conferida contra pré-processamento + modelo Keras em uma amostra separada"""
+        from model_export import dense_layers
+        with tempfile.TemporaryDirectory() as tmpdir:
+            criar_artefatos(tmpdir, criar_dados())
+            pipeline = PreprocessingPipeline.from_objects(tmpdir)
+            support = np.array([True, True, True, False, True, True, True, False, True, True, True, True, False])
+            model = criar_modelo_keras(n_features=int(support.sum()))
+
+            separada = criar_dados(n_samples=100, seed=7)
+            diferenca = export_folded_bundle(
+                dense_layers(model), pipeline, support, os.path.join(tmpdir, 'folded.npz'),
+                sample={col: separada[col].tolist() for col in FEATURE_COLUMNS},
+                reference=lambda X: model.predict(X, verbose=0))
+            self.assertLess(diferenca, 1e-4)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
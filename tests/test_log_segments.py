@@ -0,0 +1,95 @@
+import unittest
+import importlib.util
+import json
+import tempfile
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_segments import SegmentRoller, read_manifest, read_predictions, log_summary
+from logger import prediction_log_entry, PREDICTION_LOG_FEATURES
+
+
+@unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow não instalado')
+class TestSegmentRoller(unittest.TestCase):
+    """Testes para os segmentos Parquet do log de predições"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.hot_path = os.path.join(self.tmpdir.name, 'predictions.log')
+        self.segments_dir = os.path.join(self.tmpdir.name, 'predictions')
+        self.roller = SegmentRoller(self.hot_path, self.segments_dir, bucket_seconds=3600)
+        self.inicio = datetime(2025, 1, 10, 8, 0, 0)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def escrever(self, horas):
+        features = [1.0 if i % 2 else 'x' for i in range(len(PREDICTION_LOG_FEATURES))]
+        with open(self.hot_path, 'a', encoding='utf-8') as f:
+            for i, hora in enumerate(horas):
+                entrada = prediction_log_entry('req', i, features, 'Bom', 0.5 + i / 100, 0.001)
+                entrada['timestamp'] = (self.inicio + timedelta(hours=hora)).isoformat()
+                f.write(json.dumps(entrada) + '\n')
+
+    def test_rola_so_na_virada_do_intervalo(self):
+        """O arquivo corrente vira segmento quando o intervalo de tempo muda"""
+        self.escrever([0, 0.5])
+        self.assertIsNone(self.roller.maybe_roll(self.inicio + timedelta(minutes=50)))
+        self.assertEqual(len(self.roller.maybe_roll(self.inicio + timedelta(hours=1))), 1)
+
+        manifest = read_manifest(self.segments_dir)
+        self.assertEqual(manifest[0]['rows'], 2)
+        self.assertEqual(manifest[0]['start'], self.inicio.isoformat())
+        self.assertFalse(os.path.exists(self.hot_path))
+
+    def test_sobras_de_outros_processos(self):
+        """Sobra de processo encerrado vira segmento uma única vez; a de um processo vivo fica intacta"""
+        import subprocess
+        encerrado = subprocess.Popen([sys.executable, '-c', 'pass'])
+        encerrado.wait()
+        self.escrever([0, 0.5])
+        os.replace(self.hot_path, f'{self.hot_path}.{encerrado.pid}.abcd1234.rolling')
+        vivo = f'{self.hot_path}.{os.getppid()}.abcd1234.rolling'
+        self.escrever([1])
+        os.replace(self.hot_path, vivo)
+
+        self.assertEqual(len(self.roller.roll()), 1)
+        self.assertEqual(self.roller.roll(), [])
+        self.assertEqual([segmento['rows'] for segmento in read_manifest(self.segments_dir)], [2])
+        self.assertTrue(os.path.exists(vivo))
+
+    def test_arquivo_removido_durante_a_rolagem(self):
+        """Arquivo que some depois da leitura não impede o segmento nem o manifest"""
+        from unittest import mock
+        import log_segments
+        ler = log_segments.read_entries
+
+        def ler_e_remover(path):
+            entries = ler(path)
+            os.remove(path)
+            return entries
+
+        self.escrever([0, 0.5])
+        with mock.patch.object(log_segments, 'read_entries', side_effect=ler_e_remover):
+            self.assertEqual(len(self.roller.roll()), 1)
+        self.assertEqual(read_manifest(self.segments_dir)[0]['rows'], 2)
+        self.assertEqual(log_segments.read_entries(self.hot_path), [])
+
+    def test_leitura_por_periodo_e_colunas(self):
+        """Segmentos e arquivo corrente são lidos juntos, filtrados por timestamp"""
+        self.escrever([0, 1, 2])
+        self.roller.roll()
+        self.escrever([26])
+
+        df = read_predictions(self.hot_path, self.segments_dir,
+                              start=self.inicio + timedelta(hours=1), end=self.inicio + timedelta(days=2),
+                              columns=['timestamp', 'probability'])
+        self.assertEqual(list(df.columns), ['timestamp', 'probability'])
+        self.assertEqual(len(df), 3)
+        self.assertEqual(log_summary(self.hot_path, self.segments_dir)['rows'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
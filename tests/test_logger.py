@@ -0,0 +1,88 @@
+import unittest
+import json
+import tempfile
+import threading
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logger import AsyncLogWriter, PREDICTION_LOG_FEATURES, row_features, prediction_log_entry, timing_decorator
+
+
+class TestAsyncLogWriter(unittest.TestCase):
+    """Testes para a gravação assíncrona do log de predições"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'logs', 'predictions.log')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def ler(self):
+        with open(self.path, encoding='utf-8') as f:
+            return [json.loads(linha) for linha in f]
+
+    def test_entradas_gravadas_em_ordem_no_close(self):
+        """close() grava tudo que estava na fila, uma linha JSON por entrada"""
+        writer = AsyncLogWriter(self.path, batch_size=4, flush_interval=10)
+        for i in range(10):
+            writer.write({'i': i, 'prediction': 'Bom'})
+        writer.close()
+
+        self.assertEqual([e['i'] for e in self.ler()], list(range(10)))
+        self.assertEqual(writer.stats()['written'], 10)
+
+    def test_fila_cheia_descarta_e_conta(self):
+        """Com overflow='drop' a requisição nunca bloqueia; o excedente é contado"""
+        liberar = threading.Event()
+        writer = AsyncLogWriter(self.path, max_queue=2, batch_size=1, flush_interval=0)
+        gravar = writer._write_batch
+
+        def gravar_lento(lote):
+            liberar.wait()
+            gravar(lote)
+
+        writer._write_batch = gravar_lento
+
+        for i in range(20):
+            writer.write({'i': i})
+        liberar.set()
+        writer.close()
+
+        stats = writer.stats()
+        self.assertGreater(stats['dropped'], 0)
+        self.assertEqual(stats['written'] + stats['dropped'], 20)
+
+    def test_politica_invalida(self):
+        with self.assertRaises(ValueError):
+            AsyncLogWriter(self.path, overflow='ignorar')
+
+
+class TestEntradaDoLog(unittest.TestCase):
+    """Testes para a entrada compacta do predictions.log"""
+
+    def test_so_os_valores_da_linha(self):
+        """Cada entrada traz apenas a sua linha, sem repetir os nomes das colunas"""
+        payload = {col: [f'{col}-0', f'{col}-1'] for col in PREDICTION_LOG_FEATURES}
+        entrada = prediction_log_entry('abc', 1, row_features(payload, 1), 'Bom', 0.9, 0.002)
+
+        self.assertEqual(entrada['features'], [f'{col}-1' for col in PREDICTION_LOG_FEATURES])
+        self.assertEqual((entrada['request_id'], entrada['row']), ('abc', 1))
+        self.assertNotIn('input_data', entrada)
+
+
+class TestTimingDecorator(unittest.TestCase):
+
+    def test_retorno_inalterado(self):
+        """O decorator só mede: a função decorada devolve o mesmo valor (não uma tupla)"""
+        @timing_decorator
+        def resposta():
+            return {'ok': True}, 200
+
+        self.assertEqual(resposta(), ({'ok': True}, 200))
+        self.assertEqual(resposta.__name__, 'resposta')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,55 @@
+import unittest
+import tempfile
+import time
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import PredictionMetrics, StageTimer, PREDICT_STAGES
+from preprocessing import PreprocessingPipeline, FEATURE_COLUMNS
+from test_preprocessing import criar_dados, criar_artefatos
+
+
+class TestStageMetrics(unittest.TestCase):
+    """Testes para os spans por estágio e o texto do /metrics"""
+
+    def test_spans_somam_no_mesmo_estagio(self):
+        timer = StageTimer()
+        for _ in range(2):
+            with timer.span('decode'):
+                time.sleep(0.002)
+        self.assertGreaterEqual(timer.stages['decode'], 4.0)
+        self.assertGreaterEqual(timer.elapsed_ms(), timer.stages['decode'])
+
+    def test_render_com_quantis_e_contadores(self):
+        metrics = PredictionMetrics()
+        for status, ms in [(200, 0.3), (200, 3.0), (400, 0.01)]:
+            timer = metrics.timer()
+            timer.stages['infer'] = ms
+            timer.rows = 2 if status == 200 else 0
+            metrics.record(timer, status)
+
+        texto = metrics.render()
+        self.assertIn('prediction_stage_ms_bucket{stage="infer",le="0.5"} 2', texto)
+        self.assertIn('prediction_stage_ms_bucket{stage="infer",le="+Inf"} 3', texto)
+        self.assertIn('prediction_stage_ms_count{stage="infer"} 3', texto)
+        self.assertIn('prediction_stage_ms_quantile{stage="infer",quantile="0.99"} 5', texto)
+        self.assertIn('prediction_requests_total{status="200"} 2', texto)
+        self.assertIn('prediction_requests_total{status="400"} 1', texto)
+        self.assertIn('prediction_rows_total 4', texto)
+        # Estágio sem observações não tem quantis
+        self.assertNotIn('stage="log",quantile', texto)
+
+    def test_estagios_do_pre_processamento(self):
+        """transform_columns mede decode, scale, encode e select"""
+        with tempfile.TemporaryDirectory() as objects:
+            df = criar_dados()
+            criar_artefatos(objects, df)
+            pipeline = PreprocessingPipeline.from_objects(objects, selected=[0, 1, 2, 4, 5])
+            timer = StageTimer()
+            pipeline.transform_columns({col: df[col].tolist() for col in FEATURE_COLUMNS}, timer=timer)
+        self.assertEqual(set(timer.stages), set(PREDICT_STAGES) - {'infer', 'serialize', 'log'})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,222 @@
+import unittest
+import tempfile
+import pandas as pd
+import numpy as np
+import joblib
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.preprocessing import StandardScaler, LabelEncoder
+from preprocessing import (PreprocessingPipeline, FusedStandardScaler, CategoricalCoder, PayloadError,
+                           save_selected_features, load_selected_features, save_preprocessing_bundle,
+                           NUMERIC_COLUMNS, CATEGORICAL_COLUMNS, FEATURE_COLUMNS)
+
+
+def criar_dados(n_samples=200, seed=42):
+    """Cria dados sintéticos no formato da API"""
+    rng = np.random.RandomState(seed)
+    df = pd.DataFrame({
+        'profissao': rng.choice(['Advogado', 'Médico', 'Engenheiro', 'Contador'], n_samples),
+        'tempoprofissao': rng.randint(0, 30, n_samples),
+        'renda': rng.uniform(2000, 20000, n_samples),
+        'tiporesidencia': rng.choice(['Própria', 'Alugada', 'Outros'], n_samples),
+        'escolaridade': rng.choice(['Superior', 'Pós ou Mais', 'Ens.Médio'], n_samples),
+        'score': rng.choice(['Muito Bom', 'Bom', 'Justo', 'Baixo'], n_samples),
+        'idade': rng.randint(18, 70, n_samples),
+        'dependentes': rng.randint(0, 5, n_samples),
+        'estadocivil': rng.choice(['Casado', 'Solteiro', 'Divorciado'], n_samples),
+        'produto': rng.choice(['EcoPrestige', 'SpeedFury', 'WorkMaster'], n_samples),
+        'valorsolicitado': rng.uniform(10000, 100000, n_samples),
+        'valortotalbem': rng.uniform(20000, 150000, n_samples),
+    })
+    df['proporcaosolicitadototal'] = df['valorsolicitado'] / df['valortotalbem']
+    return df[FEATURE_COLUMNS]
+
+
+def criar_artefatos(diretorio, df):
+    """Ajusta e salva scalers/encoders no mesmo formato de utils.save_scalers/save_encoders"""
+    for col in NUMERIC_COLUMNS:
+        joblib.dump(StandardScaler().fit(df[[col]]), os.path.join(diretorio, f'scaler{col}.joblib'))
+    for col in CATEGORICAL_COLUMNS:
+        joblib.dump(LabelEncoder().fit(df[col]), os.path.join(diretorio, f'labelencoder{col}.joblib'))
+
+
+class TestPreprocessingPipeline(unittest.TestCase):
+    """Testes para o pipeline de pré-processamento em memória"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.df = criar_dados()
+        criar_artefatos(self.tmpdir.name, self.df)
+        self.pipeline = PreprocessingPipeline.from_objects(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def transform_referencia(self, df):
+        """Reproduz o caminho antigo (joblib.load por coluna a cada chamada)"""
+        df = df.copy()
+        for col in NUMERIC_COLUMNS:
+            scaler = joblib.load(os.path.join(self.tmpdir.name, f'scaler{col}.joblib'))
+            df[col] = scaler.transform(df[[col]])
+        for col in CATEGORICAL_COLUMNS:
+            encoder = joblib.load(os.path.join(self.tmpdir.name, f'labelencoder{col}.joblib'))
+            df[col] = encoder.transform(df[col])
+        return df
+
+    def test_mesma_saida_do_caminho_antigo(self):
+        """O pipeline deve reproduzir load_scalers + load_encoders"""
+        esperado = self.transform_referencia(self.df)
+        resultado = self.pipeline.transform(self.df.copy())
+        np.testing.assert_allclose(resultado.values.astype(float), esperado.values.astype(float),
+                                   rtol=1e-5, atol=1e-6)
+
+    def test_sem_acesso_a_disco(self):
+        """Após carregado, o pipeline não depende mais dos arquivos"""
+        self.tmpdir.cleanup()
+        resultado = self.pipeline.transform(self.df.head(1).copy())
+        self.assertEqual(resultado.shape, (1, len(FEATURE_COLUMNS)))
+
+    def test_categoria_desconhecida_afeta_apenas_a_linha(self):
+        """Uma linha inválida não deve zerar a coluna do lote inteiro"""
+        df = self.df.copy()
+        df.loc[3, 'profissao'] = 'Astronauta'
+        esperado = self.transform_referencia(self.df)
+
+        resultado, desconhecidas = self.pipeline.transform(df, return_unknown=True)
+
+        self.assertEqual(desconhecidas.any(axis=1).nonzero()[0].tolist(), [3])
+        self.assertEqual(resultado.loc[3, 'profissao'], 0)
+        outras = resultado.index != 3
+        np.testing.assert_array_equal(resultado.loc[outras, 'profissao'], esperado.loc[outras, 'profissao'])
+
+    def test_transform_columns_sem_pandas(self):
+        """O decodificador colunar deve produzir a mesma matriz do caminho com DataFrame"""
+        esperado = self.transform_referencia(self.df)[FEATURE_COLUMNS].values.astype(float)
+        payload = {col: self.df[col].tolist() for col in FEATURE_COLUMNS}
+
+        X, desconhecidas = self.pipeline.transform_columns(payload)
+
+        self.assertEqual(X.dtype, np.float32)
+        self.assertFalse(desconhecidas.any())
+        np.testing.assert_allclose(X, esperado, rtol=1e-5, atol=1e-5)
+
+    def test_transform_columns_payload_invalido(self):
+        """Colunas ausentes, tamanhos divergentes e tipos errados geram PayloadError"""
+        payload = {col: self.df[col].tolist()[:2] for col in FEATURE_COLUMNS}
+
+        sem_renda = {k: v for k, v in payload.items() if k != 'renda'}
+        with self.assertRaisesRegex(PayloadError, 'renda'):
+            self.pipeline.transform_columns(sem_renda)
+
+        with self.assertRaises(PayloadError):
+            self.pipeline.transform_columns(dict(payload, idade=[30]))
+
+        with self.assertRaises(PayloadError):
+            self.pipeline.transform_columns(dict(payload, idade=['trinta', 'quarenta']))
+
+    def test_transform_columns_categoria_nao_hashable(self):
+        """Lista ou objeto em uma coluna categórica gera PayloadError com o nome da coluna"""
+        payload = {col: self.df[col].tolist()[:2] for col in FEATURE_COLUMNS}
+        for valor in (['Advogado'], {'nome': 'Advogado'}):
+            with self.assertRaisesRegex(PayloadError, 'profissao'):
+                self.pipeline.transform_columns(dict(payload, profissao=['Médico', valor]))
+
+    def test_transform_columns_numerico_nulo_ou_nao_finito(self):
+        """Nulo, NaN, infinito e valores fora do float32 geram PayloadError com o nome da coluna"""
+        payload = {col: self.df[col].tolist()[:2] for col in FEATURE_COLUMNS}
+        for valor in (None, float('nan'), float('inf'), 1e39):
+            with self.assertRaisesRegex(PayloadError, 'renda'):
+                self.pipeline.transform_columns(dict(payload, renda=[1000.0, valor]))
+
+    def test_transform_columns_apenas_colunas_selecionadas(self):
+        """Com o seletor, só as colunas mantidas são calculadas, na ordem do modelo"""
+        selected = np.array([0, 2, 5, 6, 9, 12])
+        pipeline = PreprocessingPipeline.from_objects(self.tmpdir.name, selected=selected)
+        payload = {col: self.df[col].tolist() for col in FEATURE_COLUMNS}
+
+        completo, _ = self.pipeline.transform_columns(payload)
+        resultado, desconhecidas = pipeline.transform_columns(payload)
+
+        self.assertEqual(resultado.shape, (len(self.df), len(selected)))
+        self.assertEqual(desconhecidas.shape[1], 3)  # profissao, score e produto
+        np.testing.assert_array_equal(resultado, completo[:, selected])
+
+    def test_bundle_de_serving(self):
+        """O preprocessing.npz reproduz o pipeline dos .joblib e é preferido enquanto estiver atualizado"""
+        payload = {col: self.df[col].tolist() + ['Desconhecida'] * (col in CATEGORICAL_COLUMNS)
+                   + [1.0] * (col in NUMERIC_COLUMNS) for col in FEATURE_COLUMNS}
+        esperado, esperado_desconhecidas = self.pipeline.transform_columns(payload)
+
+        save_preprocessing_bundle(self.tmpdir.name)
+        pipeline = PreprocessingPipeline.from_objects(self.tmpdir.name)
+        self.assertIsNone(pipeline.scalers)
+        X, desconhecidas = pipeline.transform_columns(payload)
+        np.testing.assert_array_equal(X, esperado)
+        np.testing.assert_array_equal(desconhecidas, esperado_desconhecidas)
+
+        # Scalers mais novos que o bundle: volta para os .joblib
+        caminho = os.path.join(self.tmpdir.name, 'scalerrenda.joblib')
+        os.utime(caminho, (os.path.getmtime(caminho) + 10,) * 2)
+        self.assertIsNotNone(PreprocessingPipeline.from_objects(self.tmpdir.name).scalers)
+
+    def test_indices_do_seletor(self):
+        """O artefato compacto guarda os índices da máscara do RFE"""
+        from sklearn.feature_selection import RFE
+        from sklearn.tree import DecisionTreeClassifier
+
+        X, _ = self.pipeline.transform_columns({col: self.df[col].tolist() for col in FEATURE_COLUMNS})
+        y = (self.df['renda'] > 10000).astype(int)
+        seletor = RFE(DecisionTreeClassifier(random_state=0), n_features_to_select=10).fit(X, y)
+        esperado = np.flatnonzero(seletor.get_support())
+
+        path = os.path.join(self.tmpdir.name, 'selector_indices.npy')
+        save_selected_features(seletor, path)
+        np.testing.assert_array_equal(load_selected_features(path), esperado)
+
+        # Sem o artefato compacto, extrai do selector.joblib completo
+        joblib.dump(seletor, os.path.join(self.tmpdir.name, 'selector.joblib'))
+        fallback = load_selected_features(os.path.join(self.tmpdir.name, 'inexistente.npy'),
+                                          os.path.join(self.tmpdir.name, 'selector.joblib'))
+        np.testing.assert_array_equal(fallback, esperado)
+
+
+class TestFusedStandardScaler(unittest.TestCase):
+    """Testes para a padronização vetorizada das colunas numéricas"""
+
+    def test_equivale_aos_scalers_por_coluna(self):
+        """Uma operação fundida deve igualar os sete StandardScaler.transform"""
+        df = criar_dados()
+        scalers = {col: StandardScaler().fit(df[[col]]) for col in NUMERIC_COLUMNS}
+        fused = FusedStandardScaler.from_scalers(scalers)
+
+        block = np.array(df[NUMERIC_COLUMNS], dtype=np.float32, order='C')
+        resultado = fused.transform(block)
+
+        esperado = np.column_stack([scalers[col].transform(df[[col]])[:, 0] for col in NUMERIC_COLUMNS])
+        self.assertEqual(resultado.dtype, np.float32)
+        np.testing.assert_allclose(resultado, esperado, rtol=1e-5, atol=1e-5)
+
+
+class TestCategoricalCoder(unittest.TestCase):
+    """Testes para a codificação categórica por tabela hash"""
+
+    def test_mesmos_codigos_do_label_encoder(self):
+        """Os códigos devem coincidir com LabelEncoder.transform"""
+        valores = ['Bom', 'Baixo', 'Muito Bom', 'Justo', 'Bom']
+        encoder = LabelEncoder().fit(valores)
+        codes, unknown = CategoricalCoder.from_encoder(encoder).transform(valores)
+        np.testing.assert_array_equal(codes, encoder.transform(valores))
+        self.assertFalse(unknown.any())
+
+    def test_fallback_configuravel(self):
+        """Valores desconhecidos recebem o código de fallback sem exceção"""
+        coder = CategoricalCoder(['A', 'B'], unknown_code=-1)
+        codes, unknown = coder.transform(['B', 'Z', 'A'])
+        self.assertEqual(codes.tolist(), [1, -1, 0])
+        self.assertEqual(unknown.tolist(), [False, True, False])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
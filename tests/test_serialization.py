@@ -0,0 +1,126 @@
+import unittest
+import json
+import importlib.util
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serialization import (iter_ndjson_chunks, coerce_record, decode_request, encode_response, request_format,
+                           response_format)
+from preprocessing import REQUIRED_COLUMNS, PayloadError
+
+
+class TestNdjsonChunks(unittest.TestCase):
+    """Testes para o agrupamento do fluxo NDJSON do /predict/batch"""
+
+    def setUp(self):
+        self.registro = {
+            'profissao': 'Advogado', 'tempoprofissao': 5, 'renda': 10000.0,
+            'tiporesidencia': 'Própria', 'escolaridade': 'Superior', 'score': 'Bom',
+            'idade': 35, 'dependentes': 2, 'estadocivil': 'Casado', 'produto': 'EcoPrestige',
+            'valorsolicitado': 50000.0, 'valortotalbem': 100000.0, 'proporcaosolicitadototal': 0.5
+        }
+
+    def test_registros_agrupados_em_lotes(self):
+        """Registros individuais viram lotes colunares de até chunk_size linhas"""
+        linhas = [json.dumps(dict(self.registro, idade=i)) for i in range(7)]
+        lotes = list(iter_ndjson_chunks(linhas, chunk_size=3))
+
+        self.assertEqual([len(lote['idade']) for lote, _, _ in lotes], [3, 3, 1])
+        self.assertEqual(sum((lote['idade'] for lote, _, _ in lotes), []), [float(i) for i in range(7)])
+        self.assertEqual(set(lotes[0][0]), set(REQUIRED_COLUMNS))
+        self.assertEqual(lotes[2][1], [(7, None)])
+
+    def test_bloco_colunar_fatiado(self):
+        """Um bloco colunar grande é fatiado sem ser materializado em um lote só"""
+        bloco = {col: [valor] * 5 for col, valor in self.registro.items()}
+        lotes = list(iter_ndjson_chunks([json.dumps(bloco)], chunk_size=2))
+        self.assertEqual([len(lote['renda']) for lote, _, _ in lotes], [2, 2, 1])
+        self.assertEqual(lotes[2][1], [(1, 4)])
+
+    def test_linhas_invalidas_nao_interrompem(self):
+        """JSON inválido, colunas ausentes e valores inválidos geram erro apenas para a linha"""
+        linhas = ['{quebrado', json.dumps({'renda': 1.0}), '', json.dumps(self.registro),
+                  json.dumps(dict(self.registro, renda=None)), json.dumps(dict(self.registro, idade='x')),
+                  json.dumps(dict(self.registro, profissao={'nome': 'Advogado'})), json.dumps(self.registro)]
+        resultados = list(iter_ndjson_chunks(linhas, chunk_size=10))
+
+        erros = [(origens[0][0], erro) for _, origens, erro in resultados if erro]
+        self.assertEqual([numero for numero, _ in erros], [1, 2, 5, 6, 7])
+        self.assertIn("'renda'", erros[2][1])
+        lotes = [(lote, origens) for lote, origens, _ in resultados if lote]
+        self.assertEqual(len(lotes), 1)
+        self.assertEqual(lotes[0][1], [(4, None), (8, None)])
+
+    def test_registro_convertido(self):
+        """Numéricos do registro viram float, como no /predict; nulos e não finitos são rejeitados"""
+        registro = coerce_record(dict(self.registro, idade='35'))
+        self.assertEqual(registro['idade'], 35.0)
+        self.assertEqual(coerce_record(dict(self.registro, renda=True))['renda'], 1.0)
+        for valor in (None, float('nan'), 'inf', [1.0]):
+            with self.assertRaises(PayloadError):
+                coerce_record(dict(self.registro, renda=valor))
+
+
+class TestFormatosBinarios(unittest.TestCase):
+    """Testes para os corpos Arrow IPC e MessagePack do /predict"""
+
+    def setUp(self):
+        self.payload = {'profissao': ['Advogado', 'Médico'], 'renda': [10000.0, 5000.0], 'idade': [35, 40]}
+        self.probabilidades = np.array([0.25, 0.75], dtype=np.float32)
+
+    def test_formato_da_resposta(self):
+        """Accept explícito prevalece; senão a resposta segue o formato da requisição"""
+        self.assertEqual(response_format([('application/json', 1)], 'msgpack'), 'json')
+        self.assertEqual(response_format([('*/*', 1)], 'arrow'), 'arrow')
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow não instalado')
+    def test_arrow_ida_e_volta(self):
+        """Colunas numéricas do Arrow chegam como arrays NumPy"""
+        import pyarrow as pa
+        table = pa.table(self.payload)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+
+        decodificado = decode_request(sink.getvalue().to_pybytes(), 'arrow')
+        self.assertIsInstance(decodificado['renda'], np.ndarray)
+        self.assertEqual(decodificado['profissao'], self.payload['profissao'])
+
+        resposta = pa.ipc.open_stream(encode_response(self.probabilidades, 'arrow')).read_all()
+        np.testing.assert_array_equal(resposta.column('probability').to_numpy(), self.probabilidades)
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow não instalado')
+    def test_arrow_file_ida_e_volta(self):
+        """O formato file do Arrow (com footer) é lido e respondido no mesmo formato"""
+        import pyarrow as pa
+        self.assertEqual(request_format('application/vnd.apache.arrow.file'), 'arrow_file')
+        table = pa.table(self.payload)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+        decodificado = decode_request(sink.getvalue().to_pybytes(), 'arrow_file')
+        np.testing.assert_array_equal(decodificado['renda'], self.payload['renda'])
+        self.assertEqual(decodificado['profissao'], self.payload['profissao'])
+
+        resposta = pa.ipc.open_file(encode_response(self.probabilidades, 'arrow_file')).read_all()
+        np.testing.assert_array_equal(resposta.column('probability').to_numpy(), self.probabilidades)
+
+    @unittest.skipUnless(importlib.util.find_spec('msgpack'), 'msgpack não instalado')
+    def test_msgpack_ida_e_volta(self):
+        """Colunas numéricas podem vir como bytes float32 little-endian"""
+        import msgpack
+        corpo = msgpack.packb(dict(self.payload, renda=np.array([1.5, 2.5], dtype='<f4').tobytes()))
+
+        decodificado = decode_request(corpo, 'msgpack')
+        np.testing.assert_array_equal(decodificado['renda'], [1.5, 2.5])
+        self.assertEqual(decodificado['idade'], [35, 40])
+
+        resposta = msgpack.unpackb(encode_response(self.probabilidades, 'msgpack'))
+        np.testing.assert_array_equal(np.float32(resposta['probability']), self.probabilidades)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,14 +1,16 @@
-# Importações de bibliotecas e módulos
-import pandas as pd                 # Manipulação de dados em DataFrames
-from fuzzywuzzy import process       # Biblioteca para comparação aproximada de strings
-from sklearn.preprocessing import StandardScaler, LabelEncoder  # Pré-processamento de dados
-import joblib                       # Serialização de objetos Python (para salvar modelos)
-import yaml                         # Leitura de arquivos de configuração YAML
-import psycopg2                     # Conexão com banco de dados PostgreSQL
+# Funções auxiliares de treino e acesso ao banco de dados
+#
+# As bibliotecas pesadas (pandas, fuzzywuzzy, sklearn, joblib, yaml, psycopg2)
+# são importadas dentro de cada função: o serving usa apenas preprocessing.py
+# e não deve pagar por elas na inicialização.
 import const                       # Módulo personalizado (provavelmente contém constantes e configurações)
 
 # Função para buscar dados do banco de dados
 def fetch_data_from_db(sql_query):
+    import pandas as pd                 # Manipulação de dados em DataFrames
+    import yaml                         # Leitura de arquivos de configuração YAML
+    import psycopg2                     # Conexão com banco de dados PostgreSQL
+    
     try:
         # Lê as configurações de conexão do banco de dados a partir do arquivo config.yaml
         with open('config.yaml', 'r') as file:
@@ -49,6 +51,8 @@ def substitui_nulos(df):
 
 # Função para corrigir erros de digitação em colunas categóricas
 def corrigir_erros_digitacao(df, coluna, lista_valida):
+    import pandas as pd
+    from fuzzywuzzy import process       # Biblioteca para comparação aproximada de strings
     for i, valor in enumerate(df[coluna]):  # Percorre os valores da coluna
         valor_str = str(valor) if pd.notnull(valor) else valor  # Converte para string (se não for nulo)
         if valor_str not in lista_valida and pd.notnull(valor_str):  # Se o valor não estiver na lista válida
@@ -66,6 +70,8 @@ def tratar_outliers(df, coluna, minimo, maximo):
 
 # Função para salvar os objetos StandardScaler após o ajuste
 def save_scalers(df, nome_colunas):
+    import joblib                       # Serialização de objetos Python (para salvar modelos)
+    from sklearn.preprocessing import StandardScaler
     for nome_coluna in nome_colunas:  # Aplica escalonamento em cada coluna
         scaler = StandardScaler()
         df[nome_coluna] = scaler.fit_transform(df[[nome_coluna]])  
@@ -74,6 +80,8 @@ def save_scalers(df, nome_colunas):
 
 # Função para salvar os objetos LabelEncoder após o ajuste
 def save_encoders(df, nome_colunas):
+    import joblib
+    from sklearn.preprocessing import LabelEncoder
     for nome_coluna in nome_colunas:  # Aplica codificação em cada coluna
         label_encoder = LabelEncoder()
         df[nome_coluna] = label_encoder.fit_transform(df[nome_coluna])
@@ -82,6 +90,7 @@ def save_encoders(df, nome_colunas):
 
 # Função para carregar e aplicar os scalers aos dados
 def load_scalers(df, nome_colunas):
+    import joblib
     for nome_coluna in nome_colunas:
         scaler = joblib.load(f"./objects/scaler{nome_coluna}.joblib")
         df[nome_coluna] = scaler.transform(df[[nome_coluna]])
@@ -89,6 +98,7 @@ def load_scalers(df, nome_colunas):
 
 # Função para carregar e aplicar os encoders aos dados
 def load_encoders(df, nome_colunas):
+    import joblib
     for nome_coluna in nome_colunas:
         label_encoder = joblib.load(f"./objects/labelencoder{nome_coluna}.joblib")
         df[nome_coluna] = label_encoder.transform(df[nome_coluna])
@@ -16,6 +16,7 @@ import lime.lime_tabular
 
 from utils import *                 # Funções auxiliares personalizadas
 import const                       # Constantes (provavelmente a consulta SQL)
+from preprocessing import PreprocessingPipeline  # Scalers e encoders em memória
 
 # Reprodutibilidade (garantindo que os resultados sejam consistentes)
 seed = 41  # Alterado para 41
@@ -82,11 +83,13 @@ model.evaluate(X_test, y_test)
 print("\nRelatório de Classificação:")
 print(classification_report(y_test, y_pred))
 
+# Pipeline carregado uma única vez (o LIME chama model_predict milhares de vezes)
+preprocessamento = PreprocessingPipeline.from_objects()
+
 # Função para Previsões com Pré-processamento (para LIME)
 def model_predict(data_asarray):  
     data_asframe = pd.DataFrame(data_asarray, columns=X_train.columns)  
-    data_asframe = load_scalers(data_asframe, ['tempoprofissao', 'renda', 'idade', 'dependentes', 'valorsolicitado', 'valortotalbem', 'proporcaosolicitadototal'])
-    data_asframe = load_encoders(data_asframe, ['profissao', 'tiporesidencia', 'escolaridade', 'score', 'estadocivil', 'produto'])
+    data_asframe = preprocessamento.transform(data_asframe)
     predictions = model.predict(data_asframe)
     return np.hstack((1-predictions, predictions))  # Retorna probabilidades para ambas as classes
 